@@ -7,7 +7,8 @@ import time
 from rich import print
 
 from shared.tool_runner import call_tool
-from services.game_director.logic import evolve_human_genome
+from services.game_director.async_director import run_director
+from shared.ollama_client import get_client
 from shared.db.evolution_logger import init_db, log_evolution_to_db
 
 def load_yaml(path: str):
@@ -52,6 +53,9 @@ def launch_manual_game():
         db_path = os.path.join(config["paths"]["data"], "evolution.db")
         init_db(db_path)
 
+        # Cliente Ollama partilhado (keep-alive, timeouts e retries do config.yaml)
+        get_client(config["ollama"]["host"], config)
+
         # Caminhos de dados da Build
         campaign_path = os.path.join(proj_abs, "Builds", "level_genome.json")
         roster_path = os.path.join(proj_abs, "Builds", "roster.json")
@@ -131,6 +135,10 @@ def launch_manual_game():
 
     current_session = f"Human_Run_{now_id()}"
 
+    # Todos os níveis jogados são pedidos ao AI Director em paralelo (ou num só pedido no modo "campaign")
+    print(f"[magenta]O AI Director está a moldar os níveis que jogaste para a tua próxima tentativa...[/magenta]")
+    level_evolutions = run_director(config, metrics_data, campaign, current_player_save, current_roster, is_human=True)["levels"]
+
     for rep in level_reports:
         played_level_id = rep.get("level_id")
         lives_lost = rep.get("lives_lost", 0)
@@ -146,9 +154,9 @@ def launch_manual_game():
 
         if level_index == -1: continue
 
-        print(f"[magenta]O AI Director está a moldar o Nível {played_level_id} para a tua próxima tentativa...[/magenta]")
-
-        evolved_data = evolve_human_genome(config, metrics_data, campaign[level_index], current_player_save, current_roster)
+        if played_level_id not in level_evolutions:
+            continue
+        evolved_data = level_evolutions.pop(played_level_id)
 
         if evolved_data and "new_genome" in evolved_data:
             new_level = evolved_data["new_genome"]
@@ -165,7 +173,8 @@ def launch_manual_game():
                 report=report_text,
                 is_human=True,
                 session_id=current_session,
-                current_roster=current_roster
+                current_roster=current_roster,
+                player_save=current_player_save
             )
             print(f"[bold green]✅ Nível {played_level_id} Evoluído![/bold green]")
         else:
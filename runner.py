@@ -5,6 +5,8 @@ from rich import print
 
 # Importamos o main limpo do orchestrator
 from scripts.orchestrator import main as run_orchestrator
+from shared.ollama_client import get_client
+from services.game_director.pipeline import GenerationPipeline, get_pipeline_settings
 
 def main_runner():
     # 1. Carregar Configuração
@@ -20,19 +22,35 @@ def main_runner():
     # Vamos fazer 10 simulações seguidas por defeito
     total_runs = run_section.get('num_runs', 5)
     overview_flag = run_section.get('overview', True)
+    # Modo silencioso para batches longos: os logs do Unity só vão para os ficheiros em logs/sim_runs
+    quiet_flag = run_section.get('quiet', False) or "--quiet" in sys.argv
+    # Pipeline: os níveis já decididos são pré-simulados enquanto o LLM ainda analisa os restantes
+    pipeline = None
+    if get_pipeline_settings(config)["enabled"] or "--pipeline" in sys.argv:
+        pipeline = GenerationPipeline(config)
     print("=" * 60)
     print(f" 🏃 RUNNER DE CAMPANHA INICIADO (FASE 4)")
     print(f" O Bot vai jogar e testar a Campanha com os modos originais!")
     print(f" Total de simulações: {total_runs}")
     print("=" * 60 + "\n")
 
+    # 3. Aquecer o modelo: o keep_alive mantém-no carregado entre gerações (e durante as simulações longas)
+    ollama_config = config.get("ollama", {})
+    try:
+        client = get_client(ollama_config["host"], config)
+        print(f"[cyan]🔥 A carregar o modelo {ollama_config['model']} no Ollama (keep_alive: {client.keep_alive})...[/cyan]")
+        elapsed = client.warm_up(ollama_config["model"])
+        print(f"[green]Modelo pronto em {elapsed:.1f}s.[/green]\n")
+    except Exception as e:
+        print(f"[yellow]Aviso: não foi possível aquecer o modelo ({e}). A continuar...[/yellow]\n")
+
     for i in range(1, total_runs + 1):
         print(f"\n>>> GERAÇÃO {i}/{total_runs} (Avaliação de Campanha) <<<")
 
         try:
             # O Orquestrador executa a Simulação e a Evolução
             # O Bot vai simplesmente jogar a campanha até morrer e a IA conserta o gargalo!
-            run_orchestrator(visible_run=overview_flag)
+            run_orchestrator(visible_run=overview_flag, quiet=quiet_flag, pipeline=pipeline)
         except Exception as e:
             erro_msg = str(e)
             print(f"\n[bold red][ERRO NA GERAÇÃO] Falha na execução:[/bold red] {erro_msg}")
@@ -46,8 +64,12 @@ def main_runner():
                 print("\n[bold red]🚨 Erro fatal desconhecido. A interromper o Runner por segurança.[/bold red]")
                 sys.exit(1)
 
-        # Pausa para o sistema respirar
-        time.sleep(2)
+        # Pausa para o sistema respirar (no pipeline as pré-simulações já estão a correr)
+        if pipeline is None:
+            time.sleep(2)
+
+    if pipeline is not None:
+        pipeline.close()
 
     print("\n" + "=" * 60)
     print(f" 🎉 AVALIAÇÃO DE CAMPANHA CONCLUÍDA: {total_runs} GERAÇÕES PROCESSADAS")
@@ -0,0 +1,41 @@
+import argparse
+import json
+import time
+
+from rich import print
+
+from services.game_director.headless_sim import simulate_campaign, verify_layouts
+
+# Uso (na raiz do projeto): python -m scripts.check_headless_layouts [--campaign caminho.json] [--seeds 16] [--episodes 64]
+# Confirma que o simulador headless joga exatamente os layouts do gridworld.py (port do GridWorld.Build
+# e do LevelSpawner) e mede o custo de uma avaliação da campanha com o número de rondas pedido.
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara os layouts do simulador headless com o gridworld.py.")
+    parser.add_argument("--campaign", default="templates/json/level_genome.json", help="JSON da campanha")
+    parser.add_argument("--seeds", type=int, default=16, help="Sementes verificadas por nível")
+    parser.add_argument("--episodes", type=int, default=0, help="Se > 0, mede também uma simulação com estas rondas")
+    args = parser.parse_args()
+
+    with open(args.campaign, "r", encoding="utf-8") as f:
+        campaign = json.load(f)
+    campaign = [campaign] if isinstance(campaign, dict) else list(campaign)
+
+    problems = verify_layouts(campaign, args.seeds)
+    for problem in problems[:20]:
+        print(f"[red]  ❌ {problem}[/red]")
+    if problems:
+        print(f"[bold red]❌ {len(problems)} diferenças entre o simulador headless e o gridworld.py.[/bold red]")
+        return 1
+    print(f"[bold green]✅ Layouts iguais em {len(campaign)} níveis x {args.seeds} sementes "
+          f"(paredes, spawn, saída, inimigos, moedas, power-ups e armadilhas).[/bold green]")
+
+    if args.episodes > 0:
+        started = time.perf_counter()
+        simulate_campaign(campaign, args.episodes, rng_seed=0)
+        print(f"[dim]⏱️ {len(campaign)} níveis x {args.episodes} rondas em {time.perf_counter() - started:.1f}s.[/dim]")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
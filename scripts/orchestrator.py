@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Optional
 
 import json
 import os
+import threading
 import time
 import random
 import yaml
@@ -12,8 +14,17 @@ from rich import print
 
 from shared.db.economy_logger import log_economy_snapshot, init_economy_db
 from shared.tool_runner import call_tool
-from shared.db.evolution_logger import init_db, log_evolution_to_db
-from services.game_director.logic import evolve_bot_genome, evolve_economy
+from shared.db.evolution_logger import init_db, EvolutionWriter
+from services.game_director.async_director import run_director
+from services.game_director.evaluators import make_evaluator, make_batch_simulator
+from shared.db.llm_cache import get_cache_settings, get_cache_stats
+from shared.ollama_client import get_client
+from services.game_director.headless_sim import run_headless_simulation
+from services.game_director.gridworld import find_reachable_seed, layout_cache_dir
+from services.game_director.level_analyzer import genome_hash, get_level_features, structural_difficulty
+from services.game_director.memo import (get_memo_settings, memo_keys, cached_reports, plan_headless_episodes,
+                                         record_and_merge, record_reports, metrics_from_cache)
+from services.game_director.scheduler import get_scheduler_settings, run_sequential_schedule
 
 
 def load_yaml(path: str):
@@ -31,284 +42,559 @@ def save_state(path: str, state):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(state, f, ensure_ascii=False, indent=2)
 
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _save_json(path: str, data):
+    # Escrita atómica: quem lê os JSONs da Builds (Unity, pipeline) nunca apanha um ficheiro a meio
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 def now_id():
     return time.strftime("%Y%m%d-%H%M%S")
 
 
-def main(visible_run=False):
-    config = load_yaml("config.yaml")
-    state_path = config["paths"]["state"]
-    db_path = os.path.join(config["paths"]["data"], "evolution.db")
-    init_db(db_path)
-    init_economy_db(db_path)
-
-    state = load_state(state_path)
-
-    print("[cyan]A inicializar o AI Director (Campaign Workflow)...[/cyan]")
-
-    # 1. DEFINIÇÃO DE CAMINHOS
-    pn = "game_001"
-
-    projects_dir = config.get("paths", {}).get("projects", "workspace/projects")
-    proj_abs = os.path.abspath(os.path.join(projects_dir, pn))
-
-    exe_path = os.path.join(proj_abs, "Builds", "Game001.exe")
-    metrics_path = os.path.join(proj_abs, "Builds", "metrics.json")
-
-    # Os Caminhos VERDADEIROS para a IA ler (Na Build)
-    campaign_path = os.path.join(proj_abs, "Builds", "level_genome.json")
-    roster_path = os.path.join(proj_abs, "Builds", "roster.json")
-    safe_room_path = os.path.join(proj_abs, "Builds", "safe_room_items.json")
-    player_save_path = os.path.join(proj_abs, "Builds", "player_save.json") # 🚨 NOVO: Caminho do Save
-
-    # Caminhos dos Templates Originais
-    template_campaign_path = os.path.join("templates", "json", "level_genome.json")
-    template_roster_path = os.path.join("templates", "json", "roster.json")
-    template_safe_room_path = os.path.join("templates", "json", "safe_room_items.json")
-
-    tool_context = {
-        "project_name": pn,
-        "project_path": proj_abs
-    }
-
-    # 2. SETUP DO PROJETO E BUILD (ESTÁTICO)
-    if not os.path.exists(exe_path):
-        print(f"[yellow]Build não encontrada em {exe_path}. A iniciar Setup Inicial...[/yellow]")
-
-        res_unity = call_tool("find_unity_editor", {}, config, tool_context=tool_context)
-        if res_unity.get("ok") and res_unity.get("data"):
-            tool_context["unity_path"] = res_unity["data"].get("unity_path")
-
-        res_create = call_tool("unity_create_project", {"project_name": pn}, config, tool_context=tool_context)
-        if not res_create.get("ok"):
-            print(f"[red]Erro ao criar o projeto: {res_create.get('output')}[/red]")
-            return
-
-        print("[yellow]A compilar o Unity (isto pode demorar alguns minutos)...[/yellow]")
-        res_build = call_tool("unity_run_execute_method", {
-            "method": "BuildScript.MakeBuild"
-        }, config, tool_context=tool_context)
-
-        if not res_build.get("ok"):
-            print(f"[red]Erro fatal na Build: {res_build.get('output')}[/red]")
-            return
-
-        print("[green]Setup e Build concluídos com sucesso![/green]")
-    else:
-        print("[green]Projeto e Build encontrados! A saltar fase de compilação.[/green]")
-
-
-    # 2.5 GARANTIR QUE OS JSONS EXISTEM NA BUILD ANTES DE JOGAR
-    for tpl_path, target_path, name in [
-        (template_campaign_path, campaign_path, "Campanha"),
-        (template_roster_path, roster_path, "Roster"),
-        (template_safe_room_path, safe_room_path, "Safe Room")
-    ]:
-        if not os.path.exists(target_path):
-            print(f"[yellow]{name} não encontrado na Build. A copiar do Template...[/yellow]")
-            if os.path.exists(tpl_path):
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                shutil.copy2(tpl_path, target_path)
-                print(f"[green]{name} copiado do template com sucesso![/green]")
-            else:
-                print(f"[red]Aviso: Template de {name} não encontrado em {tpl_path}![/red]")
-
-    # 3. FASE DE SIMULAÇÃO
-    print("\n[green]A iniciar Simulação QA (Bot)...[/green]")
-
-    sim_args = ["-botMode"]
-    if not visible_run:
-        sim_args.extend(["-batchmode", "-nographics"])
-
-    sim_res = call_tool("run_game_simulation", {
-        "exe_path": exe_path,
-        "metrics_path": metrics_path,
-        "args": sim_args
-    }, config)
-
-    if not sim_res.get("ok"):
-        print(f"[red]Erro na simulação: {sim_res.get('output')}[/red]")
-        return
-
-    metrics_data = sim_res["data"]["metrics"]
-    campaign_completed = metrics_data.get("campaign_completed", False)
-    is_human_run = False
-    level_reports = metrics_data.get("level_reports", [])
-
-    print(f"[cyan]Simulação concluída. Foram jogados {len(level_reports)} níveis. A iniciar análise profunda...[/cyan]")
-
-    # 4. CARREGAR OS DADOS ATUAIS PARA MEMÓRIA (DA BUILD!)
-    with open(campaign_path, "r", encoding="utf-8") as f:
-        campaign = json.load(f)
-    if isinstance(campaign, dict):
-        campaign = [campaign]
-
-    current_roster = None
-    if os.path.exists(roster_path):
-        with open(roster_path, "r", encoding="utf-8") as f:
-            current_roster = json.load(f)
-
-    safe_room_data = None
-    if os.path.exists(safe_room_path):
-        with open(safe_room_path, "r", encoding="utf-8") as f:
-            safe_room_data = json.load(f)
-
-    # 🚨 LER O PLAYER SAVE DA BUILD!
-    current_player_save = {}
-    if os.path.exists(player_save_path):
-        with open(player_save_path, "r", encoding="utf-8") as f:
-            current_player_save = json.load(f)
-
-    current_session = f"Bot_Run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-
-    # =========================================================
-    # 5. PROCESSAR TODOS OS NÍVEIS JOGADOS NESTA RUN!
-    # =========================================================
-    for rep in level_reports:
-        played_level_id = rep.get("level_id")
-        win_rate = rep.get("win_rate", 0.0)
-        print(f"\n[bold blue]=======================================[/bold blue]")
-        print(f"[bold blue]🔍 A AVALIAR NÍVEL {played_level_id} (Win Rate: {win_rate})[/bold blue]")
-
-        current_level = None
-        level_index = -1
-        for i, level in enumerate(campaign):
-            if level.get("level_id") == played_level_id:
-                current_level = level
-                level_index = i
-                break
-
-        if current_level is None:
-            continue
-
-        print(f"[magenta]A pedir ao AI Director para EVOLUIR o Nível {played_level_id}...[/magenta]")
-        evolved_data = evolve_bot_genome(config, metrics_data, current_level, current_player_save, current_roster)
-
-        if evolved_data and "new_genome" in evolved_data:
-            new_level = evolved_data["new_genome"]
-
-            # 🛡️ BLINDAGEM: Garante que a IA não altera dados essenciais
-            new_level["level_id"] = played_level_id
-            new_level["theme"] = current_level.get("theme", "Cyberpunk Neon")
-            new_level["seed"] = random.randint(10000, 99999)
-
-            campaign[level_index] = new_level
-            report_text = evolved_data.get('report', 'Sem relatório.')
-
-            log_evolution_to_db(
-                db_path=db_path,
-                metrics=metrics_data,
-                new_genome=new_level,
-                report=report_text,
-                is_human=is_human_run,
-                session_id=current_session,
-                current_roster=current_roster
-            )
-
-            print(f"[bold green]✅ Nível {played_level_id} Evoluído com sucesso![/bold green]")
+def _finalize_level(config: dict, new_level: dict, current_level: dict, evolved_data: dict):
+    """Blindagem e seed do genoma evoluído (é este o genoma que vai ser gravado e simulado)."""
+    # 🛡️ BLINDAGEM: Garante que a IA não altera dados essenciais
+    new_level["level_id"] = current_level.get("level_id")
+    new_level["theme"] = current_level.get("theme", "Cyberpunk Neon")
+    if evolved_data.get("reseed", True):
+        # Só sementes cujo layout (port do GridWorld) tem saída e moedas alcançáveis
+        seed = None
+        if config.get("director", {}).get("layout_check", True):
+            seed = find_reachable_seed(new_level, random, 10000, 99999, cache_dir=layout_cache_dir(config))
+        new_level["seed"] = seed if seed is not None else random.randint(10000, 99999)
+    evolved_data["finalized"] = True
+
+
+class JsonFileCache:
+    """JSONs da Builds em memória entre gerações; um ficheiro só é relido quando o mtime ou o tamanho mudam."""
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path: str, default):
+        # Os objetos devolvidos são partilhados: alterações só valem depois de save() (ou forget())
+        stamp = _file_stamp(path)
+        if stamp is None:
+            self.entries.pop(path, None)
+            return default
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        data = _load_json(path, default)
+        self.entries[path] = (stamp, data)
+        return data
+
+    def save(self, path: str, data):
+        _save_json(path, data)
+        self.entries[path] = (_file_stamp(path), data)
+
+    def forget(self, *paths: str):
+        for path in paths:
+            self.entries.pop(path, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class OrchestratorService:
+    """
+    Orquestrador residente: o config.yaml já lido, o esquema da BD, o cliente do Ollama e os JSONs da
+    Builds ficam em memória entre gerações. Usado pelo runner.py (main) e pela rota POST /director/generation.
+    """
+
+    def __init__(self, config_path: str = "config.yaml", base_dir: Optional[str] = None):
+        self.config_path = os.path.abspath(config_path)
+        self.base_dir = os.path.abspath(base_dir or os.path.dirname(self.config_path))
+        self.files = JsonFileCache()
+        self.lock = threading.Lock()
+        self.config = None
+        self.paths = {}
+        self.db_path = None
+        self.client = None
+        self._config_stamp = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.generations = 0
+        self.last_result = None
+
+    def refresh(self) -> dict:
+        """Relê o config.yaml só se mudou; o esquema da BD só é criado quando o caminho da BD muda."""
+        stamp = _file_stamp(self.config_path)
+        if self.config is not None and stamp == self._config_stamp:
+            return self.config
+
+        if self.config is not None:
+            print("[dim]⚙️ config.yaml mudou: a recarregar a configuração.[/dim]")
+        config = load_yaml(self.config_path)
+        # Caminhos absolutos: o servidor pode correr noutra pasta
+        paths = config.setdefault("paths", {})
+        for key, value in paths.items():
+            if isinstance(value, str) and not os.path.isabs(value):
+                paths[key] = os.path.join(self.base_dir, value)
+
+        db_path = os.path.join(paths["data"], "evolution.db")
+        if db_path != self.db_path:
+            init_db(db_path)
+            init_economy_db(db_path)
+            self.db_path = db_path
+
+        # Cliente Ollama partilhado (keep-alive, timeouts e retries do config.yaml)
+        self.client = get_client(config["ollama"]["host"], config)
+
+        pn = "game_001"
+        proj_abs = os.path.join(paths.get("projects", os.path.join(self.base_dir, "workspace", "projects")), pn)
+        builds = os.path.join(proj_abs, "Builds")
+        templates = os.path.join(self.base_dir, "templates", "json")
+        self.paths = {
+            "project_name": pn,
+            "project": proj_abs,
+            "exe": os.path.join(builds, "Game001.exe"),
+            "metrics": os.path.join(builds, "metrics.json"),
+            # Os Caminhos VERDADEIROS para a IA ler (Na Build)
+            "campaign": os.path.join(builds, "level_genome.json"),
+            "roster": os.path.join(builds, "roster.json"),
+            "safe_room": os.path.join(builds, "safe_room_items.json"),
+            "player_save": os.path.join(builds, "player_save.json"),
+            # Caminhos dos Templates Originais
+            "templates": tuple(os.path.join(templates, name) for name in
+                               ("level_genome.json", "roster.json", "safe_room_items.json")),
+        }
+        self.config = config
+        self._config_stamp = stamp
+        return config
+
+    def run_generation(self, visible_run: bool = False, quiet: bool = False, pipeline=None) -> dict:
+        """Uma geração completa (simulação, análise, gravação). Uma de cada vez por processo."""
+        with self.lock:
+            started = time.monotonic()
+            try:
+                result = self._run_generation(visible_run, quiet, pipeline)
+            except Exception:
+                # Uma geração a meio pode ter deixado objetos da cache alterados sem gravar
+                self.files.clear()
+                raise
+            self.generations += 1
+            self.last_result = {**result, "seconds": round(time.monotonic() - started, 2), "finished_at": now_id()}
+            print(f"[dim]♨️ Orquestrador residente: geração {self.generations}, JSONs da Builds "
+                  f"{self.files.hits} reutilizados / {self.files.misses} lidos do disco.[/dim]")
+            return self.last_result
+
+    def start_generation(self, visible_run: bool = False, quiet: bool = True) -> bool:
+        """Lança run_generation numa thread (para a API não ficar presa); False se já há uma a correr."""
+        with self._worker_lock:
+            if self.lock.locked() or (self._worker is not None and self._worker.is_alive()):
+                return False
+            self._worker = threading.Thread(target=self._run_in_background, args=(visible_run, quiet),
+                                            name="generation", daemon=True)
+            self._worker.start()
+            return True
+
+    def _run_in_background(self, visible_run: bool, quiet: bool):
+        try:
+            self.run_generation(visible_run=visible_run, quiet=quiet)
+        except Exception as e:
+            print(f"[bold red][ERRO NA GERAÇÃO] {e}[/bold red]")
+            self.last_result = {"ok": False, "error": str(e), "finished_at": now_id()}
+
+    def status(self) -> dict:
+        running = self.lock.locked() or (self._worker is not None and self._worker.is_alive())
+        return {"running": running, "generations": self.generations, "last_result": self.last_result,
+                "cached_files": len(self.files.entries), "config_path": self.config_path}
+
+    def _run_generation(self, visible_run: bool, quiet: bool, pipeline) -> dict:
+        config = self.refresh()
+        if quiet:
+            # Batch do runner.py: nada de logs do Unity linha a linha nem resumos periódicos na consola
+            sim_section = config.get("simulation", {})
+            config = {**config, "simulation": {**sim_section, "log": {**sim_section.get("log", {}), "console": "quiet"}}}
+        db_path = self.db_path
+        state_path = config["paths"]["state"]
+        state = load_state(state_path)
+
+        print("[cyan]A inicializar o AI Director (Campaign Workflow)...[/cyan]")
+
+        # 1. CAMINHOS (calculados uma vez por versão do config.yaml, em refresh())
+        pn = self.paths["project_name"]
+        proj_abs = self.paths["project"]
+        exe_path, metrics_path = self.paths["exe"], self.paths["metrics"]
+        campaign_path, roster_path = self.paths["campaign"], self.paths["roster"]
+        safe_room_path, player_save_path = self.paths["safe_room"], self.paths["player_save"]
+        template_campaign_path, template_roster_path, template_safe_room_path = self.paths["templates"]
+
+        tool_context = {
+            "project_name": pn,
+            "project_path": proj_abs
+        }
+
+        # "unity" corre a Build real; "headless" usa o simulador NumPy (não precisa de Build)
+        sim_config = config.get("simulation", {})
+        sim_engine = sim_config.get("engine", "unity")
+
+        # 2. SETUP DO PROJETO E BUILD (ESTÁTICO)
+        if sim_engine == "headless":
+            print("[green]Motor Headless ativo! A saltar a verificação da Build do Unity.[/green]")
+        elif not os.path.exists(exe_path):
+            print(f"[yellow]Build não encontrada em {exe_path}. A iniciar Setup Inicial...[/yellow]")
+
+            res_unity = call_tool("find_unity_editor", {}, config, tool_context=tool_context)
+            if res_unity.get("ok") and res_unity.get("data"):
+                tool_context["unity_path"] = res_unity["data"].get("unity_path")
+
+            res_create = call_tool("unity_create_project", {"project_name": pn}, config, tool_context=tool_context)
+            if not res_create.get("ok"):
+                print(f"[red]Erro ao criar o projeto: {res_create.get('output')}[/red]")
+                return {"ok": False, "error": res_create.get("output")}
+
+            print("[yellow]A compilar o Unity (isto pode demorar alguns minutos)...[/yellow]")
+            res_build = call_tool("unity_run_execute_method", {
+                "method": "BuildScript.MakeBuild"
+            }, config, tool_context=tool_context)
+
+            if not res_build.get("ok"):
+                print(f"[red]Erro fatal na Build: {res_build.get('output')}[/red]")
+                return {"ok": False, "error": res_build.get("output")}
+
+            print("[green]Setup e Build concluídos com sucesso![/green]")
         else:
-            print(f"[red]Erro da IA ao gerar genoma para o Nível {played_level_id}.[/red]")
-
-    # =========================================================
-    # 8. GRAVAR A CAMPANHA COMPLETA COM AS MUTAÇÕES DESTA RUN
-    # =========================================================
-    with open(campaign_path, "w", encoding="utf-8") as f:
-        json.dump(campaign, f, indent=2)
-    print(f"\n[bold cyan]💾 Campanha atualizada e guardada! Pronta para a próxima simulação.[/bold cyan]")
-
-    # =========================================================
-    # 9. AVALIAÇÃO DA ECONOMIA (O GESTOR FINANCEIRO IA)
-    # =========================================================
-    print("\n[magenta]A chamar o Diretor de Economia para ajustar o Mercado...[/magenta]")
-
-    if current_player_save and current_roster and safe_room_data:
-        economy_result = evolve_economy(config, metrics_data, current_player_save, current_roster, safe_room_data)
-
-        # Grava o Roster (Cofre)
-        current_roster = economy_result.get("new_roster", current_roster)
-        with open(roster_path, "w", encoding="utf-8") as f:
-            json.dump(current_roster, f, indent=2)
-
-        # Grava o Catálogo (Safe Room)
-        safe_room_data = economy_result.get("new_safe_room", safe_room_data)
-        with open(safe_room_path, "w", encoding="utf-8") as f:
-            json.dump(safe_room_data, f, indent=2)
-
-        print(f"[bold green]📈 {economy_result.get('report', 'Inflação ajustada!')}[/bold green]")
-
-        # Tira uma "Fotografia" aos preços atuais
-        prices_snapshot = {}
-        for item in current_roster.get("items", []): prices_snapshot[item["id"]] = item["cost"]
-        for item in safe_room_data.get("safeRoomItems", []): prices_snapshot[item["id"]] = item["cost"]
-
-        player_coins = current_player_save.get("wallet", {}).get("totalCoins", 0)
-        player_crystals = current_player_save.get("wallet", {}).get("timeCrystals", 0)
-
-        log_economy_snapshot(db_path, current_session, player_coins, player_crystals, prices_snapshot)
-
-        print(f"[cyan]📊 Histórico da inflação guardado na Base de Dados (tabela 'economy_history')![/cyan]")
-    else:
-        print("[yellow]Ficheiros de Save ou Lojas em falta. A saltar o ajuste económico.[/yellow]")
-
-    # =========================================================
-    # 10. O VERDADEIRO HALL OF FAME (CAMPANHA COMPLETA VENCEDORA)
-    # =========================================================
-    if campaign_completed:
-        total_deaths = sum(rep.get("lives_lost", 0) for rep in level_reports)
-        lives_remaining = current_player_save.get("stats", {}).get("currentLives", 0)
-
-        is_masterpiece = True
-        rejection_reason = ""
-
-        # 🚨 Regra 1: O jogo não pode ser um passeio no parque (Tem de ter morrido pelo menos 5 vezes na campanha)
-        if total_deaths < 5:
-            is_masterpiece = False
-            rejection_reason = f"Demasiado fácil. O Bot só perdeu {total_deaths} vidas ao longo de todos os testes."
-
-        # 🚨 Regra 2: O Boss Final tem de deixar o jogador a suar (Não podem sobrar muitas vidas)
-        elif lives_remaining > 3:
-            is_masterpiece = False
-            rejection_reason = f"Sobraram demasiadas vidas ({lives_remaining}) no fim do jogo. Falta tensão dramática!"
-
-        hall_of_fame_dir = config.get("paths", {}).get("hall_of_fame", "workspace/hall_of_fame")
-        target_dir = os.path.abspath(hall_of_fame_dir)
-        os.makedirs(target_dir, exist_ok=True)
-
-        if is_masterpiece:
-            hof_filename = os.path.join(target_dir, f"campaign_masterpiece_{now_id()}.json")
-            with open(hof_filename, "w", encoding="utf-8") as hof_file:
-                json.dump(campaign, hof_file, indent=2)
-            shutil.copy2(roster_path, os.path.join(target_dir, "roster.json"))
-            shutil.copy2(safe_room_path, os.path.join(target_dir, "safe_room_items.json"))
-
-            print(f"\n[bold yellow]🏆 THE TRUE HALL OF FAME! Masterpiece Validada![/bold yellow]")
-            print(f"[bold yellow]👑 Campanha e Economia de Ouro guardadas com rigor na pasta Hall of Fame![/bold yellow]")
+            print("[green]Projeto e Build encontrados! A saltar fase de compilação.[/green]")
+
+
+        # 2.5 GARANTIR QUE OS JSONS EXISTEM NA BUILD ANTES DE JOGAR
+        for tpl_path, target_path, name in [
+            (template_campaign_path, campaign_path, "Campanha"),
+            (template_roster_path, roster_path, "Roster"),
+            (template_safe_room_path, safe_room_path, "Safe Room")
+        ]:
+            if not os.path.exists(target_path):
+                print(f"[yellow]{name} não encontrado na Build. A copiar do Template...[/yellow]")
+                if os.path.exists(tpl_path):
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    shutil.copy2(tpl_path, target_path)
+                    print(f"[green]{name} copiado do template com sucesso![/green]")
+                else:
+                    print(f"[red]Aviso: Template de {name} não encontrado em {tpl_path}![/red]")
+
+        # 3. FASE DE SIMULAÇÃO
+        if pipeline is not None:
+            # Regra 3 do pipeline: as pré-simulações da geração anterior acabam antes de esta simular
+            pipeline.wait_idle()
+
+        # Memorização: níveis cujo genoma já foi jogado com esta Build e este save/roster não voltam a ser simulados
+        memo_settings = get_memo_settings(config)
+        scheduler_settings = get_scheduler_settings(config)
+        played_campaign = self.files.load(campaign_path, [])
+        if isinstance(played_campaign, dict):
+            played_campaign = [played_campaign]
+        played_save, played_roster = self.files.load(player_save_path, {}), self.files.load(roster_path, {})
+
+        memo, cached, episodes_by_level = None, {}, None
+        if memo_settings["enabled"]:
+            memo = memo_keys(config, sim_engine, exe_path, played_save, played_roster)
+            cached = cached_reports(db_path, played_campaign, memo)
+        batch_keys = memo
+
+        if sim_engine == "headless":
+            episodes = sim_config.get("headless_episodes", 64)
+            if scheduler_settings["enabled"]:
+                # Com o escalonador, a run principal é só o lote inicial; o resto vai para os níveis indecisos
+                episodes = min(episodes, int(scheduler_settings["initial_rounds"]))
+            episodes_by_level = plan_headless_episodes(cached, played_campaign, episodes, int(memo_settings["min_episodes"])) if memo else None
+            if episodes_by_level:
+                skipped = sorted(level_id for level_id, n in episodes_by_level.items() if n == 0)
+                shortened = sorted(level_id for level_id, n in episodes_by_level.items() if 0 < n < episodes)
+                if skipped or shortened:
+                    print(f"[dim]♻️ Memo: níveis {skipped} já têm {episodes} rondas; níveis {shortened} só simulam as que faltam.[/dim]")
+            print(f"\n[green]A iniciar Simulação Headless (NumPy, {episodes} rondas por nível)...[/green]")
+            sim_res = run_headless_simulation(campaign_path, roster_path, player_save_path, episodes=episodes,
+                                              episodes_by_level=episodes_by_level)
+        elif memo and cached and len(cached) == len(played_campaign) and \
+                all(rep["total_rounds"] >= int(memo_settings["min_rounds"]) for rep in cached.values()):
+            # A campanha do Unity é sequencial: só se salta a run inteira, quando todos os níveis já têm amostras suficientes
+            print(f"[green]♻️ Memo: todos os níveis já têm ≥ {memo_settings['min_rounds']} rondas com esta Build e este save. A saltar o Unity.[/green]")
+            sim_res = {"ok": True, "output": "memo", "data": {"metrics": metrics_from_cache(cached)}}
+            memo = None
+        else:
+            print("\n[green]A iniciar Simulação QA (Bot)...[/green]")
+
+            sim_args = ["-botMode"]
+            if not visible_run:
+                sim_args.extend(["-batchmode", "-nographics"])
+
+            # Várias instâncias em paralelo só fazem sentido sem janela (batchmode)
+            workers = 1 if visible_run else int(sim_config.get("workers", 1))
+
+            sim_res = call_tool("run_game_simulation", {
+                "exe_path": exe_path,
+                "metrics_path": metrics_path,
+                "args": sim_args,
+                "workers": workers
+            }, config)
+
+        if not sim_res.get("ok"):
+            print(f"[red]Erro na simulação: {sim_res.get('output')}[/red]")
+            return {"ok": False, "error": sim_res.get("output")}
+
+        metrics_data = sim_res["data"]["metrics"]
+        if metrics_data.get("recovered_from_log") or metrics_data.get("recovered_instances"):
+            print("[yellow]⚠️ O Unity não gerou o metrics.json: os relatórios foram reconstruídos a partir da telemetria do log.[/yellow]")
+        if memo:
+            # As amostras novas juntam-se às memorizadas (estatísticas acumuladas, nunca substituídas)
+            skipped_reports = {k: v for k, v in cached.items() if episodes_by_level and episodes_by_level.get(k) == 0}
+            metrics_data = record_and_merge(db_path, played_campaign, metrics_data, memo, skipped_reports)
+
+        if scheduler_settings["enabled"] and played_campaign:
+            # Mais rondas só para os níveis cujo intervalo de confiança ainda cruza a banda alvo
+            simulate_batch = make_batch_simulator(config, played_campaign, exe_path, played_save, played_roster, visible_run,
+                                                  {rep["level_id"]: rep for rep in metrics_data.get("level_reports", [])})
+            on_batch = (lambda reports: record_reports(db_path, played_campaign, reports, batch_keys)) if batch_keys else None
+            metrics_data = run_sequential_schedule(config, metrics_data, simulate_batch, on_batch)
+        campaign_completed = metrics_data.get("campaign_completed", False)
+        is_human_run = False
+        level_reports = metrics_data.get("level_reports", [])
+
+        print(f"[cyan]Simulação concluída. Foram jogados {len(level_reports)} níveis. A iniciar análise profunda...[/cyan]")
+
+        # 4. CARREGAR OS DADOS ATUAIS PARA MEMÓRIA (DA BUILD!)
+        # Só voltam a ser lidos do disco os ficheiros que mudaram (ex.: o save que o Unity acabou de gravar)
+        campaign = self.files.load(campaign_path, [])
+        campaign = [campaign] if isinstance(campaign, dict) else list(campaign)
+        current_roster = self.files.load(roster_path, None)
+        safe_room_data = self.files.load(safe_room_path, None)
+
+        # 🚨 LER O PLAYER SAVE DA BUILD!
+        current_player_save = self.files.load(player_save_path, {})
+
+        current_session = f"Bot_Run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        # =========================================================
+        # 5. PROCESSAR TODOS OS NÍVEIS JOGADOS NESTA RUN!
+        # =========================================================
+        # Níveis e economia são pedidos ao AI Director em paralelo (director.concurrency pedidos em voo).
+        # Modo "campaign": um único pedido ao LLM para todos os níveis jogados (fallback individual por nível)
+        director_mode = config.get("director", {}).get("mode", "per_level")
+        print(f"[magenta]A pedir ao AI Director para evoluir os níveis jogados e a economia (modo: {director_mode})...[/magenta]")
+        evaluator = None
+        if director_mode == "population":
+            evaluator = make_evaluator(config, None if sim_engine == "headless" else exe_path, current_player_save, current_roster, visible_run)
+
+        on_level = None
+        if pipeline is not None:
+            # Cada nível decidido é finalizado logo e pré-simulado enquanto o LLM trata dos restantes
+            pipeline.begin(config, sim_engine, exe_path, db_path, current_player_save, current_roster)
+            genomes_by_id = {lvl.get("level_id"): lvl for lvl in campaign}
+
+            def on_level(level_id, evolved_data):
+                if level_id in genomes_by_id and "new_genome" in evolved_data:
+                    _finalize_level(config, evolved_data["new_genome"], genomes_by_id[level_id], evolved_data)
+                    if not evolved_data.get("frozen"):
+                        # Um nível congelado já tem os resultados memorizados com este mesmo genoma
+                        pipeline.submit(evolved_data["new_genome"])
+
+        director_results = run_director(config, metrics_data, campaign, current_player_save, current_roster, safe_room_data,
+                                        evaluator=evaluator, on_level=on_level)
+        level_evolutions = director_results["levels"]
+
+        cache_stats = get_cache_stats(get_cache_settings(config)["db_path"])
+        print(f"[dim]Cache LLM: {cache_stats['hits']} hits / {cache_stats['misses']} misses (hit rate {cache_stats['hit_rate']:.0%}, {cache_stats['entries']} entradas)[/dim]")
+
+        # Todas as linhas desta sessão vão para a BD numa só transação (executemany) no fim do ciclo
+        evolution_writer = EvolutionWriter(db_path)
+        for rep in level_reports:
+            played_level_id = rep.get("level_id")
+            win_rate = rep.get("win_rate", 0.0)
+            print(f"\n[bold blue]=======================================[/bold blue]")
+            print(f"[bold blue]🔍 A AVALIAR NÍVEL {played_level_id} (Win Rate: {win_rate})[/bold blue]")
+
+            current_level = None
+            level_index = -1
+            for i, level in enumerate(campaign):
+                if level.get("level_id") == played_level_id:
+                    current_level = level
+                    level_index = i
+                    break
+
+            if current_level is None:
+                continue
+
+            # Níveis repetidos na mesma run só são evoluídos uma vez
+            if played_level_id not in level_evolutions:
+                continue
+            evolved_data = level_evolutions.pop(played_level_id)
+
+            if evolved_data and "new_genome" in evolved_data:
+                new_level = evolved_data["new_genome"]
+                if not evolved_data.get("finalized"):
+                    _finalize_level(config, new_level, current_level, evolved_data)
+
+                campaign[level_index] = new_level
+                report_text = evolved_data.get('report', 'Sem relatório.')
+
+                evolution_writer.log(
+                    metrics=metrics_data,
+                    new_genome=new_level,
+                    report=report_text,
+                    is_human=is_human_run,
+                    session_id=current_session,
+                    current_roster=current_roster,
+                    player_save=current_player_save
+                )
+
+                if evolved_data.get("frozen"):
+                    print(f"[cyan]🧊 Nível {played_level_id} congelado: genoma e seed mantidos.[/cyan]")
+                else:
+                    print(f"[bold green]✅ Nível {played_level_id} Evoluído com sucesso![/bold green]")
+            else:
+                print(f"[red]Erro da IA ao gerar genoma para o Nível {played_level_id}.[/red]")
+
+        evolution_writer.flush()
+
+        # =========================================================
+        # 8. GRAVAR A CAMPANHA COMPLETA COM AS MUTAÇÕES DESTA RUN
+        # =========================================================
+        self.files.save(campaign_path, campaign)
+        print(f"\n[bold cyan]💾 Campanha atualizada e guardada! Pronta para a próxima simulação.[/bold cyan]")
+
+        # Análise estrutural dos layouts novos (fica na tabela level_analysis para os prompts e o Hall of Fame)
+        structure = get_level_features(db_path, campaign, layout_cache_dir(config))
+        for level in campaign:
+            features = structure[genome_hash(level)]
+            print(f"[dim]🧭 Nível {level.get('level_id')}: rota {features['coin_tour_length']} células, "
+                  f"{features['chokepoints']} estrangulamentos, becos {features['dead_end_density']:.2f}, "
+                  f"área {features['reachable_ratio']:.0%}, dificuldade {structural_difficulty(level, features)}[/dim]")
+
+        # =========================================================
+        # 9. AVALIAÇÃO DA ECONOMIA (O GESTOR FINANCEIRO IA)
+        # =========================================================
+        print("\n[magenta]A chamar o Diretor de Economia para ajustar o Mercado...[/magenta]")
+
+        economy_result = director_results.get("economy")
+
+        if current_player_save and current_roster and safe_room_data and economy_result:
+
+            # Grava o Roster (Cofre)
+            current_roster = economy_result.get("new_roster", current_roster)
+            self.files.save(roster_path, current_roster)
+
+            # Grava o Catálogo (Safe Room)
+            safe_room_data = economy_result.get("new_safe_room", safe_room_data)
+            self.files.save(safe_room_path, safe_room_data)
+
+            print(f"[bold green]📈 {economy_result.get('report', 'Inflação ajustada!')}[/bold green]")
+
+            # Tira uma "Fotografia" aos preços atuais
+            prices_snapshot = {}
+            for item in current_roster.get("items", []): prices_snapshot[item["id"]] = item["cost"]
+            for item in safe_room_data.get("safeRoomItems", []): prices_snapshot[item["id"]] = item["cost"]
+
+            player_coins = current_player_save.get("wallet", {}).get("totalCoins", 0)
+            player_crystals = current_player_save.get("wallet", {}).get("timeCrystals", 0)
+
+            log_economy_snapshot(db_path, current_session, player_coins, player_crystals, prices_snapshot)
+
+            print(f"[cyan]📊 Histórico da inflação guardado na Base de Dados (tabelas 'economy_snapshots' e 'economy_prices')![/cyan]")
         else:
-            print(f"\n[bold red]🚫 O Bot concluiu a Campanha, mas NÃO é uma Masterpiece![/bold red]")
-            print(f"[yellow]Motivo: {rejection_reason}[/yellow]")
-            print(f"[yellow]A apagar o Save do Bot para o forçar a treinar esta campanha com novas mutações...[/yellow]")
-
-            # Apaga o save do Bot para o obrigar a recomeçar a escalar a dificuldade
-            if os.path.exists(player_save_path):
-                os.remove(player_save_path)
-
-    state["last_result"] = "ok"
-    state["history"].append({"ts": now_id(), "result": "ok"})
-    save_state(state_path, state)
-
-    # =========================================================
-    # 11. SINCRONIZAÇÃO COM A RAIZ DO PROJETO (VISIBILIDADE)
-    # =========================================================
-    print("\n[cyan]🔄 A sincronizar os ficheiros evoluídos com a raiz do projeto...[/cyan]")
-
-    root_campaign_path = os.path.join(proj_abs, "level_genome.json")
-    root_roster_path = os.path.join(proj_abs, "roster.json")
-    root_safe_room_path = os.path.join(proj_abs, "safe_room_items.json")
-    root_player_save_path = os.path.join(proj_abs, "player_save.json")
-
-    if os.path.exists(campaign_path): shutil.copy2(campaign_path, root_campaign_path)
-    if os.path.exists(roster_path): shutil.copy2(roster_path, root_roster_path)
-    if os.path.exists(safe_room_path): shutil.copy2(safe_room_path, root_safe_room_path)
-    if os.path.exists(player_save_path): shutil.copy2(player_save_path, root_player_save_path)
-
-    print("[bold green]👀 Ficheiros atualizados na raiz do projeto! Já podes abrir os JSONs e confirmar as mutações.[/bold green]")
\ No newline at end of file
+            # O Diretor de Economia altera o roster e a loja no sítio: sem gravação, a cópia em memória deixa de valer
+            self.files.forget(roster_path, safe_room_path)
+            print("[yellow]Ficheiros de Save ou Lojas em falta. A saltar o ajuste económico.[/yellow]")
+
+        # =========================================================
+        # 10. O VERDADEIRO HALL OF FAME (CAMPANHA COMPLETA VENCEDORA)
+        # =========================================================
+        if campaign_completed:
+            total_deaths = sum(rep.get("lives_lost", 0) for rep in level_reports)
+            lives_remaining = current_player_save.get("stats", {}).get("currentLives", 0)
+
+            is_masterpiece = True
+            rejection_reason = ""
+
+            # 🚨 Regra 1: O jogo não pode ser um passeio no parque (Tem de ter morrido pelo menos 5 vezes na campanha)
+            if total_deaths < 5:
+                is_masterpiece = False
+                rejection_reason = f"Demasiado fácil. O Bot só perdeu {total_deaths} vidas ao longo de todos os testes."
+
+            # 🚨 Regra 2: O Boss Final tem de deixar o jogador a suar (Não podem sobrar muitas vidas)
+            elif lives_remaining > 3:
+                is_masterpiece = False
+                rejection_reason = f"Sobraram demasiadas vidas ({lives_remaining}) no fim do jogo. Falta tensão dramática!"
+
+            hall_of_fame_dir = config.get("paths", {}).get("hall_of_fame", "workspace/hall_of_fame")
+            target_dir = os.path.abspath(hall_of_fame_dir)
+            os.makedirs(target_dir, exist_ok=True)
+
+            if is_masterpiece:
+                hof_filename = os.path.join(target_dir, f"campaign_masterpiece_{now_id()}.json")
+                with open(hof_filename, "w", encoding="utf-8") as hof_file:
+                    json.dump(campaign, hof_file, indent=2)
+                shutil.copy2(roster_path, os.path.join(target_dir, "roster.json"))
+                shutil.copy2(safe_room_path, os.path.join(target_dir, "safe_room_items.json"))
+
+                print(f"\n[bold yellow]🏆 THE TRUE HALL OF FAME! Masterpiece Validada![/bold yellow]")
+                print(f"[bold yellow]👑 Campanha e Economia de Ouro guardadas com rigor na pasta Hall of Fame![/bold yellow]")
+            else:
+                print(f"\n[bold red]🚫 O Bot concluiu a Campanha, mas NÃO é uma Masterpiece![/bold red]")
+                print(f"[yellow]Motivo: {rejection_reason}[/yellow]")
+                print(f"[yellow]A apagar o Save do Bot para o forçar a treinar esta campanha com novas mutações...[/yellow]")
+
+                # Apaga o save do Bot para o obrigar a recomeçar a escalar a dificuldade
+                if os.path.exists(player_save_path):
+                    os.remove(player_save_path)
+
+        state["last_result"] = "ok"
+        state["history"].append({"ts": now_id(), "result": "ok"})
+        save_state(state_path, state)
+
+        # =========================================================
+        # 11. SINCRONIZAÇÃO COM A RAIZ DO PROJETO (VISIBILIDADE)
+        # =========================================================
+        print("\n[cyan]🔄 A sincronizar os ficheiros evoluídos com a raiz do projeto...[/cyan]")
+
+        root_campaign_path = os.path.join(proj_abs, "level_genome.json")
+        root_roster_path = os.path.join(proj_abs, "roster.json")
+        root_safe_room_path = os.path.join(proj_abs, "safe_room_items.json")
+        root_player_save_path = os.path.join(proj_abs, "player_save.json")
+
+        if os.path.exists(campaign_path): shutil.copy2(campaign_path, root_campaign_path)
+        if os.path.exists(roster_path): shutil.copy2(roster_path, root_roster_path)
+        if os.path.exists(safe_room_path): shutil.copy2(safe_room_path, root_safe_room_path)
+        if os.path.exists(player_save_path): shutil.copy2(player_save_path, root_player_save_path)
+
+        print("[bold green]👀 Ficheiros atualizados na raiz do projeto! Já podes abrir os JSONs e confirmar as mutações.[/bold green]")
+
+        return {"ok": True, "session_id": current_session, "levels_played": len(level_reports),
+                "campaign_completed": campaign_completed}
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_service(config_path: str = "config.yaml", base_dir: Optional[str] = None) -> OrchestratorService:
+    """Instância única por processo (o runner.py e o servidor FastAPI reutilizam-na entre gerações)."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None or _SERVICE.config_path != os.path.abspath(config_path):
+            _SERVICE = OrchestratorService(config_path, base_dir)
+        return _SERVICE
+
+
+def main(visible_run=False, quiet=False, pipeline=None):
+    return get_service().run_generation(visible_run=visible_run, quiet=quiet, pipeline=pipeline)
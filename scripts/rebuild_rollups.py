@@ -0,0 +1,35 @@
+import argparse
+import os
+import time
+
+import yaml
+from rich import print
+
+from shared.db.rollups import get_totals, rebuild_rollups
+
+# Uso (na raiz do projeto): python -m scripts.rebuild_rollups [--db caminho/evolution.db]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Recalcula os rollups da tabela evolution a partir do histórico.")
+    parser.add_argument("--db", help="Caminho do evolution.db (por omissão: paths.data do config.yaml)")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        db_path = os.path.join(config.get("paths", {}).get("data", "workspace/data"), "evolution.db")
+
+    if not os.path.exists(db_path):
+        print(f"[red]❌ BD não encontrada: {db_path}[/red]")
+        return 1
+
+    started = time.monotonic()
+    rows = rebuild_rollups(db_path)
+    totals = get_totals(db_path)
+    print(f"[bold green]✅ Rollups recalculados: {rows} linhas agregadas em {time.monotonic() - started:.1f}s "
+          f"(última linha {totals['last_id']}, último nível {totals['last_level_id']}).[/bold green]")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,10 @@
 import os
 import json
 import yaml
-import sqlite3
 from pathlib import Path
 from fastapi import APIRouter
+from shared.db.rollups import get_totals
+from shared.db.economy_query import get_inflation, get_item_series, get_snapshots
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
@@ -12,7 +13,7 @@ CONFIG_PATH = BASE_DIR / "config.yaml"
 
 def get_paths():
     """Lê as pastas dinâmicas do config.yaml"""
-    paths = {"releases": "workspace/releases", "logs": "workspace/logs", "hof": "workspace/hall_of_fame"}
+    paths = {"releases": "workspace/releases", "logs": "workspace/logs", "data": "workspace/data", "hof": "workspace/hall_of_fame"}
     if CONFIG_PATH.exists():
         with open(CONFIG_PATH, "r", encoding="utf-8") as f:
             config = yaml.safe_load(f)
@@ -21,6 +22,7 @@ def get_paths():
     return {
         "releases": BASE_DIR / paths["releases"],
         "logs": BASE_DIR / paths["logs"],
+        "data": BASE_DIR / paths["data"],
         "hof": BASE_DIR / paths["hof"] # hof = Hall of Fame
     }
 
@@ -45,24 +47,16 @@ def get_summary():
 
     # 2. Dados da Evolução (A ler do SQLite)
     evo_data = {"total_generations": 0, "latest_level": 1}
-    db_path = paths["logs"] / "evolution.db"
+    # O evolution.db vive em paths.data (ao lado das outras BDs do orchestrator)
+    db_path = paths["data"] / "evolution.db"
 
     if db_path.exists():
         try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            # Conta o total de simulações feitas
-            cursor.execute("SELECT COUNT(*) FROM evolution")
-            evo_data["total_generations"] = cursor.fetchone()[0]
-
-            # Vê qual foi o último nível em que a IA esteve a trabalhar
-            cursor.execute("SELECT level_id FROM evolution ORDER BY id DESC LIMIT 1")
-            last_row = cursor.fetchone()
-            if last_row:
-                evo_data["latest_level"] = last_row[0]
-
-            conn.close()
+            # Rollups: uma linha lida, sem COUNT(*) à tabela inteira
+            totals = get_totals(str(db_path))
+            evo_data["total_generations"] = totals["runs"]
+            if totals["last_level_id"] is not None:
+                evo_data["latest_level"] = totals["last_level_id"]
         except Exception as e:
             print(f"Erro ao ler DB: {e}")
 
@@ -75,4 +69,48 @@ def get_summary():
         "player": player_data,
         "evolution": evo_data,
         "hall_of_fame": hof_count
-    }
\ No newline at end of file
+    }
+
+@router.get("/economy")
+def get_economy(last: int = 30):
+    """Séries de preços por item, índice de preços por fotografia e inflação face à sessão anterior."""
+    db_path = get_paths()["data"] / "evolution.db"
+    if not db_path.exists():
+        return {"snapshots": [], "items": {}, "inflation": None}
+
+    try:
+        last = max(2, min(int(last), 500))
+        return {
+            "snapshots": get_snapshots(str(db_path), last=last),
+            "items": get_item_series(str(db_path), last=last),
+            "inflation": get_inflation(str(db_path))
+        }
+    except Exception as e:
+        print(f"Erro ao ler a economia: {e}")
+        return {"snapshots": [], "items": {}, "inflation": None}
+
+@router.get("/llm-progress")
+def get_llm_progress():
+    """Progresso dos pedidos ao LLM em streaming (gravado pelo orquestrador em logs/llm_progress.json)"""
+    progress_file = get_paths()["logs"] / "llm_progress.json"
+    if not progress_file.exists():
+        return {"requests": {}}
+
+    try:
+        with open(progress_file, "r", encoding="utf-8") as f:
+            return {"requests": json.load(f)}
+    except Exception as e:
+        return {"requests": {}, "error": str(e)}
+
+@router.get("/sim-progress")
+def get_sim_progress():
+    """Estado das simulações Unity em curso (eventos da telemetria gravados em logs/sim_progress.json)"""
+    progress_file = get_paths()["logs"] / "sim_progress.json"
+    if not progress_file.exists():
+        return {"runs": {}}
+
+    try:
+        with open(progress_file, "r", encoding="utf-8") as f:
+            return {"runs": json.load(f)}
+    except Exception as e:
+        return {"runs": {}, "error": str(e)}
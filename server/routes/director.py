@@ -1,12 +1,60 @@
-from fastapi import APIRouter
-from shared.models import GameEvolutionRequest
-from services.game_director.logic import evolve_bot_genome, evolve_human_genome
+import yaml
+from pathlib import Path
+from fastapi import APIRouter, HTTPException
+from shared.models import GameEvolutionRequest, SurrogatePredictRequest
+from services.game_director.logic import evolve_bot_genome, evolve_human_genome, get_target_band
+from services.game_director.surrogate import get_surrogate_settings, predict_genome, screen_genome
+from scripts.orchestrator import get_service
 
 router = APIRouter(prefix="/director", tags=["Director"])
 
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+CONFIG_PATH = BASE_DIR / "config.yaml"
+
+def load_config() -> dict:
+    """Lê o config.yaml com o paths.data absoluto (o servidor pode correr noutra pasta)"""
+    config = {}
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    paths = config.setdefault("paths", {})
+    paths["data"] = str(BASE_DIR / paths.get("data", "workspace/data"))
+    return config
+
 @router.post("/evolve")
 async def evolve(request: GameEvolutionRequest):
     genome_dict = request.current_genome.dict()
     if request.is_human:
         return evolve_human_genome(request.config, request.metrics, genome_dict)
-    return evolve_bot_genome(request.config, request.metrics, genome_dict, current_roster)
\ No newline at end of file
+    return evolve_bot_genome(request.config, request.metrics, genome_dict, current_roster)
+
+@router.post("/predict")
+def predict(request: SurrogatePredictRequest):
+    """Previsão do surrogate (win_rate, lives_lost, timeouts com desvio padrão) para um genoma candidato."""
+    config = load_config()
+    level_id = int(request.genome.get("level_id", 1))
+    prediction = predict_genome(config, request.genome, request.is_human, request.agent_speed)
+    verdict = screen_genome(config, request.genome, request.is_human, request.agent_speed)
+    target_min, target_max = get_target_band(level_id)
+
+    return {
+        "level_id": level_id,
+        "target_band": [target_min, target_max],
+        "prediction": prediction,
+        "accepted": verdict["ok"],
+        "reason": verdict["reason"],
+        "min_samples": get_surrogate_settings(config)["min_samples"],
+    }
+
+@router.post("/generation")
+def start_generation(visible_run: bool = False, quiet: bool = True):
+    """Corre uma geração no orquestrador residente deste processo (config, BD e JSONs já em memória)."""
+    service = get_service(str(CONFIG_PATH), str(BASE_DIR))
+    if not service.start_generation(visible_run=visible_run, quiet=quiet):
+        raise HTTPException(status_code=409, detail="Já há uma geração a correr.")
+    return {"started": True, "generation": service.generations + 1}
+
+@router.get("/generation")
+def generation_status():
+    """Estado da geração em curso e resultado da última (GET para acompanhar o POST acima)."""
+    return get_service(str(CONFIG_PATH), str(BASE_DIR)).status()
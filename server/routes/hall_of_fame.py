@@ -3,19 +3,24 @@ import json
 import yaml
 from pathlib import Path
 from fastapi import APIRouter, HTTPException
+from services.game_director.level_analyzer import genome_hash, get_level_features, structural_difficulty
 
 router = APIRouter(prefix="/hall_of_fame", tags=["Hall of Fame"])
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 CONFIG_PATH = BASE_DIR / "config.yaml"
 
-def get_hof_path() -> Path:
-    hof_dir = "workspace/hall_of_fame"
+def _load_paths() -> dict:
     if CONFIG_PATH.exists():
         with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-            hof_dir = config.get("paths", {}).get("hall_of_fame", "workspace/hall_of_fame")
-    return BASE_DIR / hof_dir
+            return (yaml.safe_load(f) or {}).get("paths", {})
+    return {}
+
+def get_hof_path() -> Path:
+    return BASE_DIR / _load_paths().get("hall_of_fame", "workspace/hall_of_fame")
+
+def get_analysis_db_path() -> str:
+    return str(BASE_DIR / _load_paths().get("data", "workspace/data") / "evolution.db")
 
 @router.get("/compare")
 def compare_campaigns():
@@ -33,27 +38,29 @@ def compare_campaigns():
                 with open(filepath, "r", encoding="utf-8") as f:
                     genome_list = json.load(f)
 
-                # Vamos calcular a curva de dificuldade da campanha
+                # Curva de dificuldade a partir da análise estrutural (tabela level_analysis, só calcula layouts novos)
+                structure = get_level_features(get_analysis_db_path(), genome_list)
                 level_stats = []
                 total_difficulty = 0
 
                 for level in genome_list:
+                    features = structure[genome_hash(level)]
                     enemies = level.get("rules", {}).get("enemyCount", 0)
                     speed = level.get("rules", {}).get("enemySpeed", 0.0)
-                    obstacles = level.get("obstacles", {}).get("count", 0)
-                    time_limit = level.get("rules", {}).get("timeLimit", 30.0)
 
-                    # Fórmula de Dificuldade simples: (Ameaça) / (Tempo)
-                    # Quanto mais inimigos e mais rápidos, com menos tempo, mais difícil é.
-                    threat = (enemies * speed) + (obstacles * 0.1)
-                    level_diff = float((threat / max(time_limit, 1.0)) * 100)
+                    # Pressão de tempo da rota mínima + ameaça agravada por estrangulamentos e becos sem saída
+                    level_diff = structural_difficulty(level, features) or 0.0
 
                     total_difficulty += level_diff
                     level_stats.append({
                         "level": f"Lvl {level.get('level_id', 0)}",
                         "difficulty": round(level_diff, 1),
                         "enemies": enemies,
-                        "speed": round(speed, 1)
+                        "speed": round(speed, 1),
+                        "tour_length": features["coin_tour_length"],
+                        "chokepoints": features["chokepoints"],
+                        "dead_end_density": features["dead_end_density"],
+                        "reachable_ratio": features["reachable_ratio"]
                     })
 
                 campaigns.append({
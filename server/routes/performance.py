@@ -1,10 +1,11 @@
-import json
 import yaml
 from pathlib import Path
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 
-# 🎯 Importamos a função diretamente do teu ficheiro central de base de dados!
-from shared.db.evolution_logger import get_all_metrics_for_api
+# 🎯 Consultas paginadas por cursor (sem carregar a tabela inteira para o Pandas)
+from shared.db.metrics_query import MAX_PAGE_SIZE, query_metrics_page
+from shared.db.rollups import get_level_stats, get_session_stats
 
 router = APIRouter(prefix="/performance", tags=["Performance"])
 
@@ -19,52 +20,65 @@ def get_db_path() -> str:
             config = yaml.safe_load(f)
             logs_dir = config.get("paths", {}).get("data", "workspace/logs")
 
-    # Devolve o caminho como string porque o Pandas/SQLite prefere strings em vez de objetos Path
+    # Devolve o caminho como string porque o SQLite prefere strings em vez de objetos Path
     return str(BASE_DIR / logs_dir / "evolution.db")
 
+# Só as colunas que o React mostra
+METRICS_COLUMNS = ("session_id", "timestamp", "level_id", "is_human", "win_rate", "enemy_speed", "enemy_count",
+                   "obstacles_count", "report")
+
 @router.get("/metrics")
-def get_metrics():
+def get_metrics(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+                cursor: Optional[int] = None,
+                level_id: Optional[int] = None,
+                is_human: Optional[bool] = None,
+                session_id: Optional[str] = None,
+                since: Optional[str] = None,
+                until: Optional[str] = None):
+    """
+    Mais recentes primeiro. Para a página seguinte, repetir o pedido com cursor=next_cursor
+    (next_cursor é None na última página).
+    """
     db_path = get_db_path()
 
     try:
-        # 1. Vamos buscar o Pandas DataFrame usando a tua função nativa!
-        df = get_all_metrics_for_api(db_path)
-
-        if df.empty:
-            return {"data": []}
-
-        # 2. Limitamos aos últimos 50 registos para o React não "engasgar"
-        df = df.head(50)
-
-        # 3. Convertemos o DataFrame do Pandas para uma lista de dicionários Python
-        records = df.to_dict(orient="records")
+        page = query_metrics_page(db_path, METRICS_COLUMNS, limit=limit, cursor=cursor, level_id=level_id,
+                                  is_human=is_human, session_id=session_id, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        data = []
-        for entry in records:
-            # 4. Traduzimos os nomes das colunas da BD para o formato que o React espera
-            mapped_entry = {
-                "id": entry["id"],
-                "session_id": entry["session_id"],
-                "timestamp": entry["timestamp"],
-                "level_id": entry["level_id"],
-                "win_rate": entry["win_rate"],
-                "enemy_speed": entry["enemy_speed"],
-                "raw_metrics": entry["metrics_json"],
-                "is_human": bool(entry.get("is_human", 0)),
-                "report": entry["ai_report"] # Na BD é ai_report
-            }
+    data = []
+    for entry in page["data"]:
+        # Traduzimos os nomes das colunas da BD para o formato que o React espera
+        data.append({
+            "id": entry["id"],
+            "session_id": entry["session_id"],
+            "timestamp": entry["timestamp"],
+            "level_id": entry["level_id"],
+            "win_rate": entry["win_rate"],
+            "enemy_speed": entry["enemy_speed"],
+            "enemy_count": entry["enemy_count"],
+            "obstacles": entry["obstacles_count"],
+            "is_human": entry["is_human"],
+            "report": entry["report"]
+        })
 
-            # 5. Extraímos a contagem de inimigos e obstáculos do JSON do genoma
-            try:
-                genome = json.loads(entry["genome_json"]) # Na BD é genome_json
-                mapped_entry["enemy_count"] = genome.get("rules", {}).get("enemyCount", 0)
-                mapped_entry["obstacles"] = genome.get("obstacles", {}).get("count", 0)
-            except:
-                mapped_entry["enemy_count"] = "N/A"
-                mapped_entry["obstacles"] = "N/A"
+    return {"data": data, "next_cursor": page["next_cursor"], "limit": limit}
 
-            data.append(mapped_entry)
+@router.get("/levels")
+def get_levels(is_human: Optional[bool] = None, include_genome: bool = False):
+    """Estatísticas por nível (contagem, média e variância) lidas dos rollups."""
+    try:
+        return {"data": get_level_stats(get_db_path(), is_human=is_human, include_genome=include_genome)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return {"data": data}
+@router.get("/sessions")
+def get_sessions(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[int] = None):
+    """Resumo por sessão, mais recentes primeiro (cursor = next_cursor da página anterior)."""
+    try:
+        return get_session_stats(get_db_path(), limit=limit, cursor=cursor)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,213 @@
+import asyncio
+import copy
+import os
+import random
+from rich import print
+
+from shared.metrics import merge_level_reports
+from shared.db.controller_store import load_controller_state, save_controller_state
+from services.game_director.controller import controller_step
+from services.game_director.convergence import update_convergence
+from services.game_director.curve import get_curve_settings, run_curve_solver
+from services.game_director.population import run_population_search
+from services.game_director.surrogate import get_surrogate_settings, load_surrogate, screen_genome, roster_agent_speed
+from services.game_director.gridworld import check_layout, find_reachable_seed, layout_cache_dir
+from services.game_director.logic import evolve_bot_genome, evolve_human_genome, evolve_campaign_genomes, evolve_economy
+
+# ==========================================
+# 🚨 DIRETOR ASSÍNCRONO: NÍVEIS E ECONOMIA EM PARALELO
+# ==========================================
+async def _limited(semaphore: asyncio.Semaphore, fn, *args, **kwargs):
+    """Corre uma evolução bloqueante (requests ao Ollama) numa thread, respeitando o limite de pedidos em voo."""
+    async with semaphore:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+async def evolve_all_async(config: dict, metrics: dict, campaign: list, player_save: dict, current_roster: dict,
+                           safe_room_data: dict = None, is_human: bool = False, evaluator=None, on_level=None) -> dict:
+    """
+    Lança as evoluções de todos os níveis jogados e a da economia em simultâneo.
+    Devolve {"levels": {level_id: evolved_data}, "economy": economy_result | None}.
+    No modo "population" os níveis são evoluídos pela procura populacional com o avaliador dado.
+    on_level(level_id, evolved_data) é chamado assim que a evolução de um nível fica decidida
+    (surrogate e layout já verificados), sem esperar pelos outros níveis nem pela economia.
+    """
+    director_config = config.get("director", {})
+    semaphore = asyncio.Semaphore(max(1, int(director_config.get("concurrency", 4))))
+    mode = director_config.get("mode", "per_level")
+    use_surrogate = mode != "population" and get_surrogate_settings(config).get("enabled", True)
+
+    genomes_by_id = {lvl.get("level_id"): lvl for lvl in campaign}
+    played_reports = [rep for rep in merge_level_reports(metrics.get("level_reports", [])) if rep["level_id"] in genomes_by_id]
+
+    def commit(levels: dict) -> dict:
+        if director_config.get("layout_check", True):
+            levels = validate_layouts(config, levels)
+        if on_level:
+            for level_id in sorted(levels):
+                if levels[level_id]:
+                    on_level(level_id, levels[level_id])
+        return levels
+
+    # Níveis convergidos (K gerações seguidas na banda) ficam como estão: nem controlador, nem LLM, nem seed nova
+    frozen = commit(update_convergence(config, played_reports, genomes_by_id, current_roster, safe_room_data, is_human))
+    active_reports = [rep for rep in played_reports if rep["level_id"] not in frozen]
+
+    # Controlador numérico primeiro: o LLM só recebe os níveis em que o controlador oscilou/estagnou.
+    # Com a curva ligada, o solver da campanha inteira substitui o controlador nível a nível.
+    controlled = {}
+    controller_config = director_config.get("controller", {})
+    if get_curve_settings(config)["enabled"] and mode != "population":
+        controlled = commit(run_curve_solver(config, active_reports, genomes_by_id, is_human))
+    elif controller_config.get("enabled", False) and mode != "population":
+        controlled = commit(run_controller(config, active_reports, genomes_by_id, is_human))
+    played_ids = [rep["level_id"] for rep in active_reports if rep["level_id"] not in controlled]
+
+    # A economia recebe cópias: os níveis continuam a ler o roster original enquanto os preços mudam
+    economy_task = None
+    if not is_human and player_save and current_roster and safe_room_data:
+        economy_task = asyncio.ensure_future(_limited(semaphore, evolve_economy, config, metrics, player_save,
+                                                      copy.deepcopy(current_roster), copy.deepcopy(safe_room_data)))
+
+    def screen(levels: dict) -> dict:
+        if use_surrogate and levels:
+            levels = prescreen_llm_genomes(config, levels, played_reports, genomes_by_id, current_roster, is_human,
+                                           player_save)
+        return commit(levels)
+
+    if not played_ids:
+        levels = {}
+    elif mode == "population" and evaluator is not None:
+        search_campaign = [lvl for lvl in campaign if lvl.get("level_id") not in frozen]
+        levels = commit(await asyncio.to_thread(run_population_search, config, metrics, search_campaign, evaluator, is_human,
+                                                None, roster_agent_speed(current_roster, player_save)))
+    elif mode == "campaign":
+        llm_campaign = [genomes_by_id[level_id] for level_id in played_ids]
+        levels = screen(await _limited(semaphore, evolve_campaign_genomes, config, metrics, llm_campaign, player_save,
+                                       current_roster, is_human))
+    else:
+        evolve_fn = evolve_human_genome if is_human else evolve_bot_genome
+
+        async def evolve_one(level_id: int) -> dict:
+            # Cada nível é verificado e entregue (on_level) mal chega, sem esperar pelos mais lentos
+            try:
+                res = await _limited(semaphore, evolve_fn, config, metrics, genomes_by_id[level_id], player_save, current_roster)
+            except Exception as e:
+                print(f"[red]Erro da IA ao evoluir o Nível {level_id}: {e}[/red]")
+                return {}
+            return screen({level_id: res})
+
+        levels = {}
+        for res in await asyncio.gather(*[evolve_one(level_id) for level_id in played_ids]):
+            levels.update(res)
+
+    economy = None
+    if economy_task is not None:
+        try:
+            economy = await economy_task
+        except Exception as e:
+            print(f"[red]Erro do Diretor de Economia: {e}[/red]")
+
+    levels.update(controlled)
+    levels.update(frozen)
+
+    # Ordem determinística (por level_id), independente da ordem de chegada das respostas
+    return {"levels": {k: levels[k] for k in sorted(levels)}, "economy": economy}
+
+def run_controller(config: dict, played_reports: list, genomes_by_id: dict, is_human: bool = False) -> dict:
+    """
+    Aplica o controlador PID/bandit a cada nível jogado (milissegundos, sem Ollama).
+    Devolve {level_id: evolved_data} só para os níveis que o controlador resolveu.
+    """
+    controller_config = config.get("director", {}).get("controller", {})
+    db_path = os.path.join(config["paths"]["data"], "evolution.db")
+    player_type = "Human" if is_human else "Bot"
+
+    controlled = {}
+    for rep in played_reports:
+        level_id = rep["level_id"]
+        state = load_controller_state(db_path, level_id, is_human)
+        result = controller_step(genomes_by_id[level_id], rep, state, controller_config, player_type)
+        save_controller_state(db_path, level_id, result.pop("state"), is_human)
+
+        if "escalate" in result:
+            print(f"[yellow]🎛️ Controlador do Nível {level_id}: {result['escalate']} -> a consultar o LLM.[/yellow]")
+            continue
+        controlled[level_id] = result
+
+    return controlled
+
+def prescreen_llm_genomes(config: dict, levels: dict, played_reports: list, genomes_by_id: dict,
+                          current_roster: dict, is_human: bool = False, player_save: dict = None) -> dict:
+    """
+    Passa os genomas propostos pelo LLM pelo surrogate. Os que são, com confiança, previstos fora da banda
+    são trocados por um passo do controlador numérico a partir do genoma atual (sem gastar uma simulação).
+    """
+    state = load_surrogate(config)
+    agent_speed = roster_agent_speed(current_roster, player_save)
+    reports_by_id = {rep["level_id"]: rep for rep in played_reports}
+    controller_config = config.get("director", {}).get("controller", {})
+    player_type = "Human" if is_human else "Bot"
+
+    for level_id, evolved in list(levels.items()):
+        genome = evolved.get("new_genome") if evolved else None
+        if not genome:
+            continue
+
+        verdict = screen_genome(config, genome, is_human, agent_speed, state)
+        if verdict["ok"]:
+            continue
+
+        fallback = controller_step(genomes_by_id[level_id], reports_by_id.get(level_id, {}), {}, controller_config, player_type)
+        if "escalate" in fallback:
+            continue
+
+        print(f"[yellow]🔮 Surrogate rejeitou o genoma do LLM para o Nível {level_id}: {verdict['reason']}. A usar o controlador.[/yellow]")
+        fallback.pop("state", None)
+        fallback["report"] = f"Genoma do LLM rejeitado pelo surrogate ({verdict['reason']}). | " + fallback["report"]
+        levels[level_id] = fallback
+
+    return levels
+
+def run_director(config: dict, metrics: dict, campaign: list, player_save: dict, current_roster: dict,
+                 safe_room_data: dict = None, is_human: bool = False, evaluator=None, on_level=None) -> dict:
+    """Ponto de entrada síncrono para o orchestrator.py e o play.py."""
+    return asyncio.run(evolve_all_async(config, metrics, campaign, player_save, current_roster, safe_room_data, is_human,
+                                        evaluator, on_level))
+
+def validate_layouts(config: dict, levels: dict) -> dict:
+    """
+    Decide a semente de cada genoma novo com o port do GridWorld (milissegundos): com reseed sorteia
+    já aqui uma semente com saída e moedas alcançáveis; sem reseed valida a atual e troca-a se a saída
+    ou alguma moeda ficarem inalcançáveis. A semente escolhida fica marcada (reseed=False) para o
+    _finalize_level do orchestrator não a voltar a sortear.
+    """
+    cache_dir = layout_cache_dir(config)
+
+    for level_id, evolved in levels.items():
+        genome = evolved.get("new_genome") if evolved else None
+        if not genome:
+            continue
+
+        if evolved.get("reseed", True):
+            seed = find_reachable_seed(genome, random, 10000, 99999, cache_dir=cache_dir)
+            if seed is not None:
+                genome["seed"] = seed
+                evolved["reseed"] = False
+                continue
+
+        verdict = check_layout(genome, cache_dir=cache_dir)
+        if verdict["ok"]:
+            evolved["reseed"] = False
+            continue
+
+        seed = find_reachable_seed(genome, cache_dir=cache_dir)
+        if seed is None:
+            print(f"[yellow]🧱 Nível {level_id}: {verdict['reason']} e nenhuma semente alternativa serviu.[/yellow]")
+            continue
+
+        print(f"[yellow]🧱 Nível {level_id}: semente {verdict['seed']} rejeitada ({verdict['reason']}) -> {seed}.[/yellow]")
+        genome["seed"] = seed
+        evolved["reseed"] = False
+        evolved["report"] = f"Semente {verdict['seed']} rejeitada ({verdict['reason']}). | " + evolved.get("report", "")
+
+    return levels
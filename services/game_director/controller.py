@@ -0,0 +1,157 @@
+import copy
+import math
+from typing import Optional
+
+from services.game_director.logic import get_progressive_boundaries, get_target_band, _apply_genome_bounds
+
+# ==========================================
+# 🚨 CONTROLADOR NUMÉRICO DE DIFICULDADE (PID + BANDIT)
+# ==========================================
+# Knob -> (secção do genoma, chave, bound mínimo, bound máximo, sentido, tipo, passo mínimo)
+# sentido +1: aumentar o valor torna o nível mais difícil; -1: mais fácil (mais tempo)
+KNOBS = {
+    "enemyCount": ("rules", "enemyCount", "min_enemies", "max_enemies", 1, int, 1),
+    "enemySpeed": ("rules", "enemySpeed", "min_speed", "max_speed", 1, float, 0.1),
+    "trapCount": ("rules", "trapCount", "min_traps", "max_traps", 1, int, 1),
+    "obstacles.count": ("obstacles", "count", "min_obstacles", "max_obstacles", 1, int, 1),
+    "timeLimit": ("rules", "timeLimit", "min_time", "max_time", -1, float, 5.0),
+}
+
+DEFAULT_CONTROLLER = {"kp": 0.8, "ki": 0.2, "kd": 0.3, "max_step": 0.15, "patience": 3, "ucb_c": 0.5, "deadband": 0.02}
+
+
+def band_error(win_rate: float, level_id: int, deadband: float = 0.0) -> float:
+    """Erro contra a banda alvo: > 0 nível demasiado fácil, < 0 demasiado difícil, 0 dentro da banda (+ deadband)."""
+    target_min, target_max = get_target_band(level_id)
+    if win_rate > target_max + deadband:
+        return win_rate - target_max
+    if win_rate < target_min - deadband:
+        return win_rate - target_min
+    return 0.0
+
+def _knob_position(genome: dict, knob: str, bounds: dict) -> float:
+    """Posição normalizada [0, 1] do knob dentro dos bounds do nível."""
+    section, key, lo_key, hi_key, _, _, _ = KNOBS[knob]
+    lo, hi = float(bounds[lo_key]), float(bounds[hi_key])
+    value = float(genome.get(section, {}).get(key, lo))
+    return 0.0 if hi <= lo else min(1.0, max(0.0, (value - lo) / (hi - lo)))
+
+def _set_knob(genome: dict, knob: str, bounds: dict, position: float):
+    section, key, lo_key, hi_key, _, cast, _ = KNOBS[knob]
+    lo, hi = float(bounds[lo_key]), float(bounds[hi_key])
+    value = lo + min(1.0, max(0.0, position)) * (hi - lo)
+    genome.setdefault(section, {})[key] = int(round(value)) if cast is int else round(value, 1)
+
+def _can_move(genome: dict, knob: str, bounds: dict, harder: bool) -> bool:
+    direction = KNOBS[knob][4] * (1 if harder else -1)
+    pos = _knob_position(genome, knob, bounds)
+    return pos < 1.0 if direction > 0 else pos > 0.0
+
+def _choose_knob(state: dict, candidates: list, ucb_c: float) -> str:
+    """UCB1 sobre os knobs: prefere o que mais reduziu o erro no passado, explorando os pouco usados."""
+    counts = state.setdefault("counts", {})
+    rewards = state.setdefault("rewards", {})
+    total = sum(counts.get(k, 0) for k in candidates) + 1
+
+    def score(knob):
+        n = counts.get(knob, 0)
+        if n == 0:
+            return float("inf")
+        return rewards.get(knob, 0.0) / n + ucb_c * math.sqrt(math.log(total) / n)
+
+    return max(candidates, key=score)
+
+def _should_escalate(history: list, patience: int) -> Optional[str]:
+    """Deteta oscilação (erro a trocar de sinal) ou estagnação (|erro| sem descer) nas últimas K gerações."""
+    if len(history) < patience:
+        return None
+
+    recent = history[-patience:]
+    if any(e == 0.0 for e in recent):
+        return None
+
+    flips = sum(1 for a, b in zip(recent, recent[1:]) if (a > 0) != (b > 0))
+    if flips >= patience - 1:
+        return "oscilação"
+
+    if all(abs(b) >= abs(a) - 0.01 for a, b in zip(recent, recent[1:])):
+        return "estagnação"
+
+    return None
+
+def controller_step(genome: dict, report: dict, state: dict, controller_config: dict = None, player_type: str = "Bot") -> dict:
+    """
+    Um passo do controlador para um nível. Devolve {"new_genome", "report", "state"} ou,
+    quando o controlador oscilou/estagnou durante K gerações, {"escalate": motivo, "state"}
+    para o Director chamar o LLM.
+    """
+    cfg = {**DEFAULT_CONTROLLER, **(controller_config or {})}
+    state = copy.deepcopy(state or {})
+    level_id = genome.get("level_id", 1)
+    bounds = get_progressive_boundaries(level_id)
+
+    win_rate = float(report.get("win_rate", 0.0))
+    error = band_error(win_rate, level_id, float(cfg["deadband"]))
+
+    # Recompensa do bandit: quanto o último knob mexido reduziu o |erro|
+    last_knob, last_error = state.get("last_knob"), state.get("last_error")
+    if last_knob and last_error:
+        improvement = (abs(last_error) - abs(error)) / abs(last_error)
+        state.setdefault("counts", {})[last_knob] = state.get("counts", {}).get(last_knob, 0) + 1
+        state.setdefault("rewards", {})[last_knob] = state.get("rewards", {}).get(last_knob, 0.0) + improvement
+
+    history = state.setdefault("history", [])
+    history.append(round(error, 4))
+    del history[:-max(cfg["patience"] * 2, 6)]
+
+    escalate = _should_escalate(history, int(cfg["patience"]))
+    if escalate:
+        # O LLM assume este nível; o controlador recomeça do zero na geração seguinte
+        state.update({"history": [], "integral": 0.0, "last_error": None, "last_knob": None})
+        return {"escalate": escalate, "state": state}
+
+    new_genome = copy.deepcopy(genome)
+
+    if error == 0.0:
+        state.update({"integral": state.get("integral", 0.0) * 0.5, "last_error": 0.0, "last_knob": None})
+        result = _apply_genome_bounds(new_genome, level_id, bounds, player_type)
+        result["report"] = f"Controlador Lvl {level_id}: win rate {win_rate:.2f} dentro da banda, sem alterações. | " + result["report"]
+        result["state"] = state
+        return result
+
+    # PID sobre o erro, com anti-windup no integral
+    integral = max(-1.0, min(1.0, state.get("integral", 0.0) + error))
+    derivative = error - last_error if last_error is not None else 0.0
+    u = cfg["kp"] * error + cfg["ki"] * integral + cfg["kd"] * derivative
+    step = min(cfg["max_step"], max(0.02, abs(u)))
+    harder = error > 0
+
+    candidates = [k for k in KNOBS if _can_move(new_genome, k, bounds, harder)]
+    if not candidates:
+        state.update({"integral": integral, "last_error": error, "last_knob": None})
+        return {"escalate": "knobs saturados", "state": state}
+
+    # Regra do Director: timeouts num nível difícil resolvem-se com mais tempo
+    if not harder and int(report.get("timeouts", 0)) > 0 and "timeLimit" in candidates:
+        knob = "timeLimit"
+    else:
+        knob = _choose_knob(state, candidates, cfg["ucb_c"])
+
+    section, key, lo_key, hi_key, direction, cast, min_unit = KNOBS[knob]
+    before = new_genome.get(section, {}).get(key)
+    position = _knob_position(new_genome, knob, bounds) + direction * (step if harder else -step)
+    _set_knob(new_genome, knob, bounds, position)
+
+    # Garante que o knob mexe pelo menos um passo mínimo (arredondamentos), sem sair dos bounds
+    if before is not None and abs(float(new_genome[section][key]) - float(before)) < min_unit:
+        nudged = float(before) + min_unit * (direction if harder else -direction)
+        nudged = min(float(bounds[hi_key]), max(float(bounds[lo_key]), nudged))
+        new_genome[section][key] = int(round(nudged)) if cast is int else round(nudged, 1)
+
+    state.update({"integral": integral, "last_error": error, "last_knob": knob})
+
+    result = _apply_genome_bounds(new_genome, level_id, bounds, player_type)
+    result["report"] = (f"Controlador Lvl {level_id}: win rate {win_rate:.2f} (erro {error:+.2f}), "
+                        f"{knob} {before} -> {new_genome[section][key]}. | " + result["report"])
+    result["state"] = state
+    return result
@@ -0,0 +1,129 @@
+import copy
+import hashlib
+import json
+import os
+
+from rich import print
+
+from shared.db.convergence_store import load_convergence_states, save_convergence_states
+from shared.db.results_store import genome_fingerprint
+from services.game_director.controller import band_error
+
+# ==========================================
+# 🚨 CONVERGÊNCIA: NÍVEIS ESTÁVEIS FICAM CONGELADOS
+# ==========================================
+# Um nível que fica dentro da banda alvo durante freeze_after gerações seguidas é congelado:
+# deixa de ir ao controlador e ao LLM e mantém o genoma e a seed (com a memorização, nem volta a ser simulado).
+# Só conta uma geração com evidência nova (genoma diferente ou mais rondas no relatório acumulado):
+# uma repetição memorizada devolve o mesmo relatório e não pode fazer crescer o streak.
+# Descongela quando:
+#   - o roster muda (stats das classes ou efeitos dos itens; os preços não contam aqui),
+#   - o nível de preços da economia se afasta mais do que economy_tolerance do que era ao congelar,
+#   - o genoma deixou de ser o congelado (editado fora do Director),
+#   - o win rate medido sai da banda por mais de thaw_margin (histerese: as amostras acumuladas pela
+#     memorização mexem a estimativa e um nível encostado à margem não deve oscilar entre estados),
+#     ou o intervalo de confiança do escalonador já a exclui.
+DEFAULT_CONVERGENCE = {"enabled": True, "freeze_after": 3, "deadband": 0.0, "thaw_margin": 0.05, "economy_tolerance": 0.25}
+
+# Campos do roster que não mudam a jogabilidade (os preços entram pelo índice de preços)
+ROSTER_IGNORED_FIELDS = {"cost", "name", "description", "spriteName"}
+
+
+def get_convergence_settings(config: dict) -> dict:
+    return {**DEFAULT_CONVERGENCE, **config.get("director", {}).get("convergence", {})}
+
+def _strip_fields(value):
+    if isinstance(value, dict):
+        return {k: _strip_fields(v) for k, v in value.items() if k not in ROSTER_IGNORED_FIELDS}
+    if isinstance(value, list):
+        return [_strip_fields(v) for v in value]
+    return value
+
+def roster_hash(roster: dict) -> str:
+    """Hash das stats das classes e dos efeitos dos itens (sem preços nem textos)."""
+    data = json.dumps(_strip_fields(roster or {}), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:20]
+
+def price_index(roster: dict, safe_room: dict) -> float:
+    """Preço médio dos itens do roster e da Safe Room (0 sem itens)."""
+    costs = [float(item.get("cost", 0)) for item in (roster or {}).get("items", [])]
+    costs += [float(item.get("cost", 0)) for item in (safe_room or {}).get("safeRoomItems", [])]
+    return round(sum(costs) / len(costs), 4) if costs else 0.0
+
+def _thaw_reason(state: dict, report: dict, genome: dict, current_roster_hash: str, current_prices: float,
+                 settings: dict) -> str:
+    if state.get("roster_hash") != current_roster_hash:
+        return "roster mudou"
+    frozen_prices = float(state.get("price_index") or 0.0)
+    if frozen_prices > 0 and abs(current_prices - frozen_prices) / frozen_prices > float(settings["economy_tolerance"]):
+        return f"preços mudaram {frozen_prices:.1f} -> {current_prices:.1f}"
+    if state.get("genome_fp") != genome_fingerprint(genome):
+        return "genoma alterado fora do Director"
+    if not _in_band(report, float(settings["deadband"]) + float(settings["thaw_margin"])):
+        return f"win rate {float(report.get('win_rate', 0.0)):.2f} fora da banda"
+    return ""
+
+def _in_band(report: dict, deadband: float) -> bool:
+    if report.get("band_decision") in ("above", "below"):
+        return False
+    return band_error(float(report.get("win_rate", 0.0)), report["level_id"], deadband) == 0.0
+
+def _new_evidence(state: dict, report: dict, genome_fp: str) -> bool:
+    """Genoma diferente do último contado ou relatório acumulado com mais rondas (não é repetição memorizada)."""
+    return state.get("genome_fp") != genome_fp or int(report.get("total_rounds", 0)) > int(state.get("total_rounds") or 0)
+
+def update_convergence(config: dict, played_reports: list, genomes_by_id: dict, current_roster: dict,
+                       safe_room_data: dict = None, is_human: bool = False) -> dict:
+    """
+    Atualiza o estado de convergência com os relatórios desta geração e devolve
+    {level_id: evolved_data} para os níveis congelados (genoma atual, sem seed nova).
+    """
+    settings = get_convergence_settings(config)
+    if not settings["enabled"] or not played_reports:
+        return {}
+
+    db_path = os.path.join(config["paths"]["data"], "evolution.db")
+    states = load_convergence_states(db_path, is_human)
+    current_roster_hash = roster_hash(current_roster)
+    current_prices = price_index(current_roster, safe_room_data)
+    freeze_after = max(1, int(settings["freeze_after"]))
+
+    frozen, changed = {}, {}
+    for rep in played_reports:
+        level_id = rep["level_id"]
+        genome = genomes_by_id[level_id]
+        state = dict(states.get(level_id) or {"streak": 0, "frozen": False, "total_rounds": 0})
+        genome_fp = genome_fingerprint(genome)
+        fresh = _new_evidence(state, rep, genome_fp)
+
+        if state["frozen"]:
+            reason = _thaw_reason(state, rep, genome, current_roster_hash, current_prices, settings)
+            if reason:
+                print(f"[yellow]🧊 Nível {level_id} descongelado: {reason}.[/yellow]")
+                state.update({"frozen": False, "streak": 0, "reason": reason})
+            elif fresh:
+                state["streak"] = int(state["streak"]) + 1
+        elif fresh:
+            state["streak"] = int(state["streak"]) + 1 if _in_band(rep, float(settings["deadband"])) else 0
+            if state["streak"] >= freeze_after:
+                print(f"[cyan]🧊 Nível {level_id} congelado: {state['streak']} gerações seguidas dentro da banda.[/cyan]")
+                state.update({"frozen": True, "roster_hash": current_roster_hash,
+                              "price_index": current_prices, "reason": f"{state['streak']} gerações na banda"})
+
+        # Congelado e sem descongelar, o genoma é o congelado; nos outros casos passa a ser a referência
+        state["genome_fp"] = genome_fp
+        if fresh:
+            state["total_rounds"] = int(rep.get("total_rounds", 0))
+
+        changed[level_id] = state
+        if state["frozen"]:
+            frozen[level_id] = {
+                "new_genome": copy.deepcopy(genome),
+                "report": f"Nível congelado ({state['streak']} gerações dentro da banda, win rate "
+                          f"{float(rep.get('win_rate', 0.0)):.2f}). Sem alterações nem seed nova.",
+                "reseed": False,
+                "frozen": True,
+            }
+
+    save_convergence_states(db_path, changed, is_human)
+    return frozen
@@ -0,0 +1,181 @@
+import copy
+from typing import Optional
+
+import numpy as np
+
+from services.game_director.controller import KNOBS
+from services.game_director.logic import get_progressive_boundaries, get_target_band, _apply_genome_bounds
+
+# ==========================================
+# 🚨 CURVA DE DIFICULDADE DA CAMPANHA INTEIRA (SOLVER MONÓTONO)
+# ==========================================
+# Em vez de afinar cada nível isolado, ajusta todos os níveis jogados numa só passagem:
+#   1. dificuldade efetiva medida e = -logit(win rate) por nível (prior Beta(½,½) para 0% e 100%);
+#      "dentro da banda" decide-se pela medição do próprio nível (win rate cru), nunca pela curva agregada:
+#      um nível dentro da banda não mexe e nunca vai para o LLM;
+#   2. sensibilidade β (logit por unidade de dificuldade D dos knobs) estimada na campanha toda;
+#   3. D alvo dos níveis fora da banda para passarem no centro dela (a partir da medição de cada um),
+#      limitado pelos bounds do nível;
+#   4. regressão isotónica (PAVA, pesos = rondas) só entre os níveis fora da banda, sobre a curva prevista:
+#      resolve as inversões que os bounds deixam (nível 5 mais difícil que o 7) sem agregar a medição
+#      de um nível bem afinado com a dos vizinhos;
+#   5. D -> knobs: todos os knobs do nível mexem a mesma fração dos seus bounds (bissecção vetorizada).
+# D é a média dos knobs normalizados pelo intervalo global dos bounds da campanha (timeLimit invertido),
+# por isso é comparável entre níveis. Tudo em arrays NumPy: escala para campanhas de centenas de níveis.
+DEFAULT_CURVE = {"enabled": False, "sensitivity": 6.0, "min_sensitivity": 1.0, "max_sensitivity": 30.0,
+                 "min_change": 0.01, "bisection_steps": 40}
+
+KNOB_NAMES = list(KNOBS)
+
+
+def get_curve_settings(config: dict) -> dict:
+    return {**DEFAULT_CURVE, **config.get("director", {}).get("curve", {})}
+
+def isotonic_increasing(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Regressão isotónica não-decrescente (pool adjacent violators), O(n)."""
+    means, totals, sizes = [], [], []
+    for value, weight in zip(values.astype(float), np.maximum(weights.astype(float), 1e-9)):
+        means.append(value)
+        totals.append(weight)
+        sizes.append(1)
+        while len(means) > 1 and means[-2] > means[-1]:
+            weight_sum = totals[-2] + totals[-1]
+            means[-2] = (means[-2] * totals[-2] + means[-1] * totals[-1]) / weight_sum
+            totals[-2] = weight_sum
+            sizes[-2] += sizes[-1]
+            means.pop(), totals.pop(), sizes.pop()
+    return np.repeat(np.array(means), sizes)
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-4, 1 - 1e-4)
+    return np.log(p / (1 - p))
+
+def _knob_arrays(genomes: list) -> tuple:
+    """(valores N×K, bound mínimo N×K, bound máximo N×K, sentido K, é inteiro K)"""
+    values = np.zeros((len(genomes), len(KNOB_NAMES)))
+    lo = np.zeros_like(values)
+    hi = np.zeros_like(values)
+    for i, genome in enumerate(genomes):
+        bounds = get_progressive_boundaries(int(genome.get("level_id", 1)))
+        for k, knob in enumerate(KNOB_NAMES):
+            section, key, lo_key, hi_key, _, _, _ = KNOBS[knob]
+            lo[i, k], hi[i, k] = float(bounds[lo_key]), float(bounds[hi_key])
+            values[i, k] = float(genome.get(section, {}).get(key, lo[i, k]))
+    direction = np.array([KNOBS[knob][4] for knob in KNOB_NAMES], dtype=float)
+    is_int = np.array([KNOBS[knob][5] is int for knob in KNOB_NAMES])
+    return np.clip(values, lo, hi), lo, hi, direction, is_int
+
+def _difficulty(values: np.ndarray, g_lo: np.ndarray, g_span: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """Índice D ∈ [0, 1] por nível: média dos knobs normalizados no intervalo global (mais alto = mais difícil)."""
+    normalized = (values - g_lo) / g_span
+    return np.where(direction > 0, normalized, 1.0 - normalized).mean(axis=1)
+
+def _move_knobs(values, lo, hi, direction, step):
+    """Todos os knobs de cada nível andam step (fração dos bounds do próprio nível) no sentido de ficar mais difícil."""
+    return np.clip(values + step[:, None] * direction[None, :] * (hi - lo), lo, hi)
+
+def solve_campaign_curve(genomes: list, reports: list, settings: Optional[dict] = None) -> dict:
+    """
+    genomes e reports alinhados (mesma ordem, por level_id crescente). Devolve arrays com a curva
+    medida e a prevista, D atual/novo, os valores novos dos knobs (N×K) e os níveis saturados.
+    in_band vem do win rate de cada nível; só os níveis fora da banda são agregados e mexidos.
+    """
+    settings = {**DEFAULT_CURVE, **(settings or {})}
+    level_ids = np.array([int(g.get("level_id", 1)) for g in genomes])
+    wins = np.array([float(r.get("wins", 0)) for r in reports])
+    rounds = np.array([float(r.get("total_rounds", 0)) for r in reports])
+    reported = np.array([float(r.get("win_rate", 0.5)) for r in reports])
+    raw_rate = np.where(rounds > 0, wins / np.maximum(rounds, 1.0), reported)
+    win_rate = np.where(rounds > 0, (wins + 0.5) / (rounds + 1.0), reported)
+    weights = np.maximum(rounds, 1.0)
+    bands = np.array([get_target_band(int(level_id)) for level_id in level_ids])
+    in_band = (raw_rate >= bands[:, 0]) & (raw_rate <= bands[:, 1])
+    out = ~in_band
+
+    values, lo, hi, direction, is_int = _knob_arrays(genomes)
+    g_lo, g_hi = lo.min(axis=0), hi.max(axis=0)
+    g_span = np.where(g_hi > g_lo, g_hi - g_lo, 1.0)
+    current_d = _difficulty(values, g_lo, g_span, direction)
+    d_min = _difficulty(np.where(direction > 0, lo, hi), g_lo, g_span, direction)
+    d_max = _difficulty(np.where(direction > 0, hi, lo), g_lo, g_span, direction)
+
+    # 1. Dificuldade efetiva medida de cada nível
+    measured = -_logit(win_rate)
+
+    # 2. Sensibilidade β: declive da dificuldade efetiva em D (mínimos quadrados ponderados)
+    beta = float(settings["sensitivity"])
+    if len(genomes) >= 3 and np.ptp(current_d) > 1e-6:
+        d_mean = np.average(current_d, weights=weights)
+        e_mean = np.average(measured, weights=weights)
+        cov = np.average((current_d - d_mean) * (measured - e_mean), weights=weights)
+        var = np.average((current_d - d_mean) ** 2, weights=weights)
+        if cov > 0 and var > 0:
+            beta = cov / var
+    beta = float(np.clip(beta, settings["min_sensitivity"], settings["max_sensitivity"]))
+
+    # 3-4. Alvo: centro da banda para os níveis fora dela; os que já estão dentro ficam com o D atual
+    target = -_logit(bands.mean(axis=1))
+    new_d = current_d.copy()
+    if out.any():
+        new_d[out] = np.clip(current_d[out] + (target[out] - measured[out]) / beta, d_min[out], d_max[out])
+        predicted_out = isotonic_increasing(measured[out] + beta * (new_d[out] - current_d[out]), weights[out])
+        new_d[out] = np.clip(current_d[out] + (predicted_out - measured[out]) / beta, d_min[out], d_max[out])
+    predicted = measured + beta * (new_d - current_d)
+
+    # 5. D -> knobs: bissecção vetorizada no passo comum de cada nível
+    low = np.full(len(genomes), -1.0)
+    high = np.full(len(genomes), 1.0)
+    for _ in range(int(settings["bisection_steps"])):
+        mid = (low + high) / 2
+        too_hard = _difficulty(_move_knobs(values, lo, hi, direction, mid), g_lo, g_span, direction) > new_d
+        high = np.where(too_hard, mid, high)
+        low = np.where(too_hard, low, mid)
+    new_values = _move_knobs(values, lo, hi, direction, (low + high) / 2)
+    new_values = np.where(is_int[None, :], np.round(new_values), np.round(new_values, 1))
+    new_values = np.where(in_band[:, None], values, new_values)
+
+    predicted_wr = 1.0 / (1.0 + np.exp(predicted))
+    saturated = ~((predicted_wr >= bands[:, 0] - 1e-6) & (predicted_wr <= bands[:, 1] + 1e-6)) & out
+    return {"level_ids": level_ids, "win_rate": win_rate, "measured_win_rate": raw_rate,
+            "predicted_win_rate": predicted_wr, "current_d": current_d, "new_d": new_d, "beta": beta,
+            "values": values, "new_values": new_values, "in_band": in_band, "saturated": saturated}
+
+def run_curve_solver(config: dict, played_reports: list, genomes_by_id: dict, is_human: bool = False) -> dict:
+    """
+    Ajuste coordenado de todos os níveis jogados. Devolve {level_id: evolved_data} para os níveis que o
+    solver resolve; os saturados (nem nos bounds chegam à banda) ficam de fora para o LLM.
+    """
+    settings = get_curve_settings(config)
+    reports = sorted((rep for rep in played_reports if rep["level_id"] in genomes_by_id), key=lambda rep: rep["level_id"])
+    if not reports:
+        return {}
+
+    genomes = [genomes_by_id[rep["level_id"]] for rep in reports]
+    solution = solve_campaign_curve(genomes, reports, settings)
+    player_type = "Human" if is_human else "Bot"
+
+    levels = {}
+    for i, level_id in enumerate(solution["level_ids"].tolist()):
+        if solution["saturated"][i]:
+            continue
+
+        new_genome = copy.deepcopy(genomes[i])
+        changes = []
+        if abs(solution["new_d"][i] - solution["current_d"][i]) >= float(settings["min_change"]):
+            for k, knob in enumerate(KNOB_NAMES):
+                section, key, _, _, _, cast, _ = KNOBS[knob]
+                value = solution["new_values"][i, k]
+                value = int(value) if cast is int else float(value)
+                if value != solution["values"][i, k]:
+                    changes.append(f"{knob} {new_genome.get(section, {}).get(key)} -> {value}")
+                new_genome.setdefault(section, {})[key] = value
+
+        result = _apply_genome_bounds(new_genome, level_id, get_progressive_boundaries(level_id), player_type)
+        band = "dentro da banda" if solution["in_band"][i] else "fora da banda"
+        result["report"] = (f"Curva Lvl {level_id}: win rate {solution['measured_win_rate'][i]:.2f} ({band}) "
+                            f"-> previsto {solution['predicted_win_rate'][i]:.2f}, "
+                            f"D {solution['current_d'][i]:.3f} -> {solution['new_d'][i]:.3f} (β {solution['beta']:.1f}). "
+                            f"{', '.join(changes) or 'Sem alterações.'} | " + result["report"])
+        levels[level_id] = result
+
+    return levels
@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from shared.metrics import merge_level_reports
+from shared.log_sink import log_sink_settings
+from shared.telemetry import telemetry_settings
+from shared.watchdog import watchdog_settings
+
+# ==========================================
+# 🚨 AVALIADORES DE GENOMAS (PLUGGABLE)
+# ==========================================
+# Um avaliador é um callable: evaluate(genomes: list[dict]) -> list[dict | None]
+# Recebe genomas de nível (com level_id) e devolve um LevelReport por genoma, pela mesma ordem
+# (None quando a avaliação falhou). As avaliações correm em paralelo dentro do avaliador.
+Evaluator = Callable[[List[dict]], List[Optional[dict]]]
+
+
+def _headless_eval(job: tuple) -> Optional[dict]:
+    from services.game_director.headless_sim import simulate_level
+
+    genome, episodes, player_save, roster, rng_seed = job
+    try:
+        return simulate_level(genome, episodes, player_save, roster, rng_seed)
+    except Exception:
+        return None
+
+def make_headless_evaluator(player_save: dict = None, roster: dict = None, episodes: int = 128,
+                            workers: int = 4, rng_seed: Optional[int] = None) -> Evaluator:
+    """Avalia cada genoma com o simulador NumPy (headless_sim), um processo por worker."""
+    def evaluate(genomes: List[dict]) -> List[Optional[dict]]:
+        jobs = [(g, episodes, player_save, roster, rng_seed) for g in genomes]
+        if workers <= 1 or len(jobs) <= 1:
+            return [_headless_eval(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return list(pool.map(_headless_eval, jobs))
+
+    return evaluate
+
+def make_unity_evaluator(exe_path: str, args: list = None, workers: int = 2, timeout: int = 120,
+                         log_dir: str = "workspace/logs", telemetry: Optional[dict] = None,
+                         watchdog: Optional[dict] = None, log: Optional[dict] = None, slot_prefix: str = "eval") -> Evaluator:
+    """
+    Avalia cada genoma com o Unity QA Bot: cada worker tem a sua cópia da pasta Builds (ver run_simulation_pool)
+    e joga uma campanha de um só nível com o genoma candidato.
+    slot_prefix separa as pastas de avaliadores que correm ao mesmo tempo (ex.: pré-simulação do pipeline).
+    """
+    from shared.tools.local_tools import run_game_simulation, _prepare_worker_dir, POOL_DIRNAME
+
+    builds_dir = os.path.dirname(os.path.abspath(exe_path))
+    exe_name = os.path.basename(exe_path)
+
+    def evaluate(genomes: List[dict]) -> List[Optional[dict]]:
+        slots = max(1, min(workers, len(genomes)))
+        slot_dirs = []
+        for i in range(slots):
+            slot_dir = os.path.join(builds_dir, POOL_DIRNAME, f"{slot_prefix}_{i}")
+            _prepare_worker_dir(builds_dir, slot_dir)
+            slot_dirs.append(slot_dir)
+
+        def run_slot(slot: int) -> list:
+            slot_dir = slot_dirs[slot]
+            results = []
+            for idx in range(slot, len(genomes), slots):
+                genome = genomes[idx]
+                with open(os.path.join(slot_dir, "level_genome.json"), "w", encoding="utf-8") as f:
+                    json.dump([genome], f, indent=2)
+                # Cada avaliação começa do save original (o bot não pode herdar progresso da anterior)
+                save_src = os.path.join(builds_dir, "player_save.json")
+                if os.path.exists(save_src):
+                    shutil.copy2(save_src, os.path.join(slot_dir, "player_save.json"))
+
+                res = run_game_simulation(os.path.join(slot_dir, exe_name), os.path.join(slot_dir, "metrics.json"),
+                                          args, log_dir, timeout, worker_id=slot, telemetry=telemetry,
+                                          watchdog=watchdog, log=log)
+                report = None
+                if res.ok:
+                    reports = [r for r in res.data["metrics"].get("level_reports", []) if r.get("level_id") == genome.get("level_id")]
+                    merged = merge_level_reports(reports)
+                    report = merged[0] if merged else None
+                results.append((idx, report))
+            return results
+
+        reports: List[Optional[dict]] = [None] * len(genomes)
+        with ThreadPoolExecutor(max_workers=slots) as pool:
+            for slot_results in pool.map(run_slot, range(slots)):
+                for idx, report in slot_results:
+                    reports[idx] = report
+        return reports
+
+    return evaluate
+
+def make_evaluator(config: dict, exe_path: str = None, player_save: dict = None, roster: dict = None,
+                   visible_run: bool = False) -> Evaluator:
+    """Escolhe o avaliador a partir de simulation.engine no config.yaml."""
+    sim_config = config.get("simulation", {})
+    search_config = config.get("director", {}).get("population", {})
+    workers = int(search_config.get("workers", sim_config.get("workers", 1)))
+
+    if sim_config.get("engine", "unity") == "headless" or not exe_path:
+        return make_headless_evaluator(player_save, roster, episodes=int(search_config.get("episodes", 128)),
+                                       workers=max(1, workers))
+
+    args = ["-botMode"] if visible_run else ["-botMode", "-batchmode", "-nographics"]
+    return make_unity_evaluator(exe_path, args, workers=max(1, workers),
+                                log_dir=config.get("paths", {}).get("logs", "workspace/logs"),
+                                telemetry=telemetry_settings(config), watchdog=watchdog_settings(config),
+                                log=log_sink_settings(config))
+
+# ==========================================
+# SIMULADORES EM LOTE PARA O ESCALONADOR SEQUENCIAL
+# ==========================================
+# simulate_batch({level_id: rondas}) -> lista de LevelReports (ver scheduler.py)
+def make_batch_simulator(config: dict, campaign: list, exe_path: str = None, player_save: dict = None, roster: dict = None,
+                         visible_run: bool = False, current_reports: dict = None):
+    sim_config = config.get("simulation", {})
+    genomes_by_id = {lvl.get("level_id"): lvl for lvl in campaign}
+
+    if sim_config.get("engine", "unity") == "headless" or not exe_path:
+        from services.game_director.headless_sim import simulate_campaign
+
+        def simulate_headless(plan: dict) -> list:
+            levels = [genomes_by_id[level_id] for level_id in plan if level_id in genomes_by_id]
+            return simulate_campaign(levels, 0, player_save, roster, episodes_by_level=plan)["level_reports"]
+
+        return simulate_headless
+
+    # Unity: cada avaliação de um nível joga tentativas até vencer (~1 / win_rate rondas)
+    evaluate = make_evaluator(config, exe_path, player_save, roster, visible_run)
+    current_reports = current_reports or {}
+
+    def simulate_unity(plan: dict) -> list:
+        genomes = []
+        for level_id, rounds in plan.items():
+            win_rate = float(current_reports.get(level_id, {}).get("win_rate", 0.5))
+            evaluations = max(1, math.ceil(rounds * max(win_rate, 0.1)))
+            genomes.extend([genomes_by_id[level_id]] * evaluations)
+        return [rep for rep in evaluate(genomes) if rep]
+
+    return simulate_unity
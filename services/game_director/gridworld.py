@@ -0,0 +1,379 @@
+"""
+Port bit-exato da geração de níveis do Unity (GridWorld.Build + LevelSpawner).
+
+O System.Random do .NET/Mono (algoritmo subtrativo de Knuth, o mesmo do `new System.Random(seed)`)
+é reproduzido em Python puro, pelo que a mesma semente dá exatamente a mesma grelha e os mesmos spawns
+que o Unity. As grelhas ficam numa cache LRU em memória (e opcionalmente em disco), guardadas como
+bits empacotados (np.packbits), indexadas por (seed, largura, altura, obstáculos).
+"""
+from __future__ import annotations
+
+import math
+import os
+import random
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# ==========================================
+# 🚨 SYSTEM.RANDOM (.NET / Mono) BIT-EXATO
+# ==========================================
+_MBIG = 2147483647
+_MSEED = 161803398
+
+
+def _to_int32(value: int) -> int:
+    return ((int(value) + 2 ** 31) % 2 ** 32) - 2 ** 31
+
+
+@lru_cache(maxsize=4096)
+def _seed_table(seed: int) -> tuple:
+    """Tabela inicial do System.Random(seed). Cada episódio constrói o RNG duas vezes com a
+    mesma semente (grelha e spawns), por isso fica em cache."""
+    seed = _to_int32(seed)
+    subtraction = _MBIG if seed == -2 ** 31 else abs(seed)
+    # Aritmética int32 sem verificação (unchecked) como no C#: sementes > MSEED dão mj negativo
+    mj = _MSEED - subtraction
+    seed_array = [0] * 56
+    seed_array[55] = mj
+    mk = 1
+    for i in range(1, 55):
+        ii = (21 * i) % 55
+        seed_array[ii] = mk
+        mk = _to_int32(mj - mk)
+        if mk < 0:
+            mk += _MBIG
+        mj = seed_array[ii]
+
+    # _to_int32 em linha: é o ciclo mais quente da geração de níveis
+    for _ in range(1, 5):
+        for i in range(1, 56):
+            value = (seed_array[i] - seed_array[1 + (i + 30) % 55] + 2 ** 31) % 2 ** 32 - 2 ** 31
+            seed_array[i] = value + _MBIG if value < 0 else value
+    return tuple(seed_array)
+
+
+class DotNetRandom:
+    """Espelho do System.Random(seed): mesma tabela de 56 entradas, mesmo Next(min, max) / Next(max)."""
+
+    def __init__(self, seed: int):
+        self._seed_array = list(_seed_table(int(seed)))
+        self._inext = 0
+        self._inextp = 21
+
+    def _internal_sample(self) -> int:
+        inext = self._inext + 1
+        if inext >= 56:
+            inext = 1
+        inextp = self._inextp + 1
+        if inextp >= 56:
+            inextp = 1
+
+        value = self._seed_array[inext] - self._seed_array[inextp]
+        if value == _MBIG:
+            value -= 1
+        if value < 0:
+            value += _MBIG
+
+        self._seed_array[inext] = value
+        self._inext, self._inextp = inext, inextp
+        return value
+
+    def sample(self) -> float:
+        return self._internal_sample() * (1.0 / _MBIG)
+
+    def next(self, min_value: int, max_value: int) -> int:
+        if min_value > max_value:
+            raise ValueError(f"min_value ({min_value}) > max_value ({max_value})")
+        # Os intervalos do jogo cabem sempre num int32 (o ramo GetSampleForLargeRange nunca é usado)
+        return int(self.sample() * (max_value - min_value)) + min_value
+
+    def next_max(self, max_value: int) -> int:
+        if max_value < 0:
+            raise ValueError(f"max_value ({max_value}) < 0")
+        return int(self.sample() * max_value)
+
+
+# ==========================================
+# GRIDWORLD.BUILD
+# ==========================================
+def build_grid(width: int, height: int, obstacle_count: int, seed: int, rng_factory=DotNetRandom) -> np.ndarray:
+    """Gera a grelha de obstáculos indexada como no Unity (grid[x, y] == True é parede)."""
+    # bytearray plano (x * height + y): muito mais rápido que indexar o NumPy célula a célula
+    grid = bytearray(width * height)
+
+    # 1. PAREDES EXTERIORES
+    for x in range(width):
+        grid[x * height] = 1
+        grid[x * height + height - 1] = 1
+    for y in range(height):
+        grid[y] = 1
+        grid[(width - 1) * height + y] = 1
+
+    # 2. GERADOR DE LABIRINTO INTERIOR
+    rng = rng_factory(seed)
+    placed = 0
+    attempts = 0
+
+    while placed < obstacle_count and attempts < 10000:
+        attempts += 1
+
+        rx = rng.next(2, width - 2)
+        ry = rng.next(2, height - 2)
+        # width / 2 em C# é divisão inteira (truncada)
+        if abs(rx - width // 2) < 2 and abs(ry - height // 2) < 2:
+            continue
+        if not grid[rx * height + ry]:
+            length = rng.next(1, 5)
+            horizontal = rng.next(0, 2) == 0
+
+            for i in range(length):
+                nx = rx + i if horizontal else rx
+                ny = ry if horizontal else ry + i
+
+                if nx < width - 2 and ny < height - 2 and not grid[nx * height + ny]:
+                    grid[nx * height + ny] = 1
+                    placed += 1
+                    if placed >= obstacle_count:
+                        break
+    return np.frombuffer(bytes(grid), dtype=np.uint8).reshape(width, height).astype(bool)
+
+
+def pack_grid_bits(grid: np.ndarray) -> np.ndarray:
+    """Grelha bool (width, height) -> bits empacotados (uint8, 1/8 da memória)."""
+    return np.packbits(grid, axis=None)
+
+
+def unpack_grid_bits(packed: np.ndarray, width: int, height: int) -> np.ndarray:
+    return np.unpackbits(packed, count=width * height).reshape(width, height).astype(bool)
+
+
+# ==========================================
+# CACHE DE GRELHAS (LRU em memória + disco opcional)
+# ==========================================
+LAYOUT_CACHE_SIZE = 512
+
+_GRID_CACHE: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_GRID_LOCK = threading.Lock()
+_GRID_STATS = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def _disk_path(cache_dir: str, key: tuple) -> str:
+    seed, width, height, obstacles = key
+    return os.path.join(cache_dir, f"{width}x{height}_o{obstacles}_s{seed}.npy")
+
+
+def get_packed_grid(width: int, height: int, obstacle_count: int, seed: int, cache_dir: Optional[str] = None) -> np.ndarray:
+    """Grelha do nível em bits empacotados (só leitura) via cache: memória -> disco (cache_dir) -> GridWorld.Build."""
+    key = (int(seed), int(width), int(height), int(obstacle_count))
+
+    with _GRID_LOCK:
+        packed = _GRID_CACHE.get(key)
+        if packed is not None:
+            _GRID_CACHE.move_to_end(key)
+            _GRID_STATS["hits"] += 1
+            return packed
+
+    path = _disk_path(cache_dir, key) if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            packed = np.load(path)
+            _GRID_STATS["disk_hits"] += 1
+        except (OSError, ValueError):
+            packed = None
+
+    if packed is None:
+        packed = pack_grid_bits(build_grid(width, height, obstacle_count, seed))
+        _GRID_STATS["misses"] += 1
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, packed)
+            os.replace(tmp_path, path)
+
+    packed.setflags(write=False)
+    with _GRID_LOCK:
+        _GRID_CACHE[key] = packed
+        _GRID_CACHE.move_to_end(key)
+        while len(_GRID_CACHE) > LAYOUT_CACHE_SIZE:
+            _GRID_CACHE.popitem(last=False)
+    return packed
+
+
+def get_grid(width: int, height: int, obstacle_count: int, seed: int, cache_dir: Optional[str] = None) -> np.ndarray:
+    """Grelha do nível (bool, grid[x, y]) a partir da cache."""
+    return unpack_grid_bits(get_packed_grid(width, height, obstacle_count, seed, cache_dir), width, height)
+
+
+def get_grid_cache_stats() -> dict:
+    return {**_GRID_STATS, "entries": len(_GRID_CACHE)}
+
+
+def layout_cache_dir(config: dict) -> Optional[str]:
+    """Pasta da cache em disco (simulation.layout_cache no config.yaml); None se desligada."""
+    if not config.get("simulation", {}).get("layout_cache", True):
+        return None
+    return os.path.join(config.get("paths", {}).get("data", "workspace/data"), "layouts")
+
+
+# ==========================================
+# LEVELSPAWNER (mesma sequência de rng.Next do GameManager.StartNewRun)
+# ==========================================
+def _float32(value: float) -> float:
+    return float(np.float32(value))
+
+
+class _Spawner:
+    """Estado do LevelSpawner (células ocupadas e área alcançável) para um episódio."""
+
+    def __init__(self, grid: np.ndarray, rng):
+        self.width, self.height = grid.shape
+        self.blocked = grid.astype(np.uint8).tobytes()
+        self.rng = rng
+        self.occupied = set()
+        self.reachable = []
+
+    def random_free_cell(self):
+        for _ in range(2000):
+            x = self.rng.next(1, self.width - 1)
+            y = self.rng.next(1, self.height - 1)
+            if not self.blocked[x * self.height + y]:
+                return (x, y)
+        return (self.width // 2, self.height // 2)
+
+    def calculate_reachable_area(self, start):
+        # Índices planos (x * height + y); as paredes exteriores garantem vizinhos válidos
+        h = self.height
+        blocked = self.blocked
+        visited = bytearray(blocked)
+        first = start[0] * h + start[1]
+        visited[first] = 1
+        queue = [first]
+        for i in queue:
+            # Mesma ordem do Unity: up (+y), down (-y), left (-x), right (+x)
+            for j in (i + 1, i - 1, i - h, i + h):
+                if not visited[j]:
+                    visited[j] = 1
+                    queue.append(j)
+        self.reachable = [divmod(i, h) for i in queue]
+
+    def unique_position(self):
+        if len(self.reachable) > 10:
+            for _ in range(100):
+                pos = self.reachable[self.rng.next_max(len(self.reachable))]
+                if pos not in self.occupied:
+                    self.occupied.add(pos)
+                    return pos
+
+        for _ in range(100):
+            pos = self.random_free_cell()
+            if pos not in self.occupied:
+                self.occupied.add(pos)
+                return pos
+        return self.random_free_cell()
+
+    def unique_position_far_from(self, target, min_distance: float):
+        # Vector2Int.Distance devolve float (32 bits): compara com a mesma precisão do Unity
+        tx, ty = target
+        if len(self.reachable) > 10:
+            for _ in range(200):
+                pos = self.reachable[self.rng.next_max(len(self.reachable))]
+                if pos not in self.occupied and _float32(math.hypot(pos[0] - tx, pos[1] - ty)) >= min_distance:
+                    self.occupied.add(pos)
+                    return pos
+
+        for _ in range(200):
+            pos = self.random_free_cell()
+            if pos not in self.occupied and _float32(math.hypot(pos[0] - tx, pos[1] - ty)) >= min_distance:
+                self.occupied.add(pos)
+                return pos
+        return self.unique_position()
+
+
+def spawn_level(grid: np.ndarray, seed: int, enemies: int, coins: int, powerups: int, traps: int, rng_factory=DotNetRandom) -> dict:
+    """Replica a ordem de spawns do GameManager.StartNewRun com um RNG novo da mesma semente."""
+    width, height = grid.shape
+    spawner = _Spawner(grid, rng_factory(seed))
+
+    agent = spawner.unique_position()
+    spawner.calculate_reachable_area(agent)
+
+    min_goal_distance = _float32(np.float32(max(width, height)) * np.float32(0.4))
+    min_enemy_safe_distance = _float32(np.float32(max(width, height)) * np.float32(0.3))
+
+    enemy_cells = [spawner.unique_position_far_from(agent, min_enemy_safe_distance) for _ in range(enemies)]
+    goal = spawner.unique_position_far_from(agent, min_goal_distance)
+    coin_cells = [spawner.unique_position() for _ in range(coins)]
+
+    powerup_cells, powerup_types = [], []
+    for _ in range(powerups):
+        powerup_cells.append(spawner.unique_position())
+        # 0 = Time, 1 = Speed (igual ao enum PowerUpType)
+        powerup_types.append(0 if spawner.rng.next(0, 2) == 0 else 1)
+
+    trap_cells = [spawner.unique_position() for _ in range(traps)]
+
+    return {
+        "agent": agent,
+        "goal": goal,
+        "enemies": enemy_cells,
+        "coins": coin_cells,
+        "powerups": powerup_cells,
+        "powerup_types": powerup_types,
+        "traps": trap_cells,
+        "reachable_count": len(spawner.reachable),
+        "reachable": spawner.reachable,
+    }
+
+
+# ==========================================
+# VALIDAÇÃO DE ALCANÇABILIDADE (antes de gastar uma run do Unity)
+# ==========================================
+def genome_arena(genome: dict) -> tuple:
+    """(largura, altura, obstáculos) como o GameManager: (int)(halfSize * 2)."""
+    size = int(float(genome.get("arena", {}).get("halfSize", 12.0)) * 2)
+    return size, size, int(genome.get("obstacles", {}).get("count", 0))
+
+
+def check_layout(genome: dict, seed: Optional[int] = None, cache_dir: Optional[str] = None) -> dict:
+    """
+    Gera o layout da 1ª tentativa do nível (a que usa a semente do genoma) e verifica se a saída e
+    todas as moedas são alcançáveis a partir da spawn do agente. Os power-ups e as armadilhas são
+    gerados depois das moedas, por isso não mexem nestas posições e não são necessários aqui.
+    """
+    seed = int(genome.get("seed", 0)) if seed is None else int(seed)
+    width, height, obstacles = genome_arena(genome)
+    rules = genome.get("rules", {})
+
+    grid = get_grid(width, height, obstacles, seed, cache_dir)
+    layout = spawn_level(grid, seed, int(rules.get("enemyCount", 0)), int(rules.get("targetCount", 0)), 0, 0)
+
+    reachable = set(layout["reachable"])
+    goal_ok = layout["goal"] in reachable
+    unreachable_coins = sum(1 for cell in layout["coins"] if cell not in reachable)
+    ok = goal_ok and unreachable_coins == 0
+
+    if ok:
+        reason = "saída e moedas alcançáveis"
+    elif not goal_ok:
+        reason = "saída inalcançável"
+    else:
+        reason = f"{unreachable_coins} moeda(s) inalcançável(is)"
+
+    return {"ok": ok, "seed": seed, "reason": reason, "goal_reachable": goal_ok, "unreachable_coins": unreachable_coins,
+            "reachable_cells": layout["reachable_count"], "free_cells": int((~grid).sum())}
+
+
+def find_reachable_seed(genome: dict, rng: Optional[random.Random] = None, low: int = 1000, high: int = 99999,
+                        max_tries: int = 50, cache_dir: Optional[str] = None) -> Optional[int]:
+    """Sorteia sementes até encontrar um layout com saída e moedas alcançáveis (None se nenhuma servir)."""
+    rng = rng or random.Random()
+    for _ in range(max_tries):
+        seed = rng.randint(low, high)
+        if check_layout(genome, seed, cache_dir)["ok"]:
+            return seed
+    return None
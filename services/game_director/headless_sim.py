@@ -0,0 +1,640 @@
+"""
+Simulador Headless da Campanha (NumPy, sem Unity).
+
+Usa o port bit-exato do GridWorld.Build e do LevelSpawner (gridworld.py, System.Random do .NET)
+e reproduz o ChaserAI (perseguição por BFS) e o SimpleAgent em modo Bot. Cada episódio é UMA
+ronda de um nível (da spawn até à vitória, ao Timeout ou à última vida). Os episódios de TODOS os
+níveis correm num único lote: as grelhas são bitboards (uma linha = um uint64, níveis mais baixos
+com linhas vazias a mais) e cada passo de tempo expande uma só fronteira de BFS para o lote inteiro.
+
+Relatório (mesma semântica do GameManager): o Unity emite um LevelReport por tentativa com as
+contagens em bruto dessa tentativa (vitória: wins=1; derrota: wins=0) e o merge_level_reports
+soma-os. Aqui cada episódio é uma dessas tentativas e o relatório do nível é exatamente essa soma:
+total_rounds = episódios, wins = vitórias, lives_lost/timeouts/powerups_used/collected_coins somados
+em todos os episódios, collected_crystals = floor(tempo restante) somado nas vitórias e
+time_to_win = média das vitórias. Juntar relatórios headless e do Unity dá portanto o mesmo total.
+
+Custo medido (campanha de 10 níveis dos templates, um core): ~3s com 32 rondas por nível, ~5s com 64 e
+~10s com 256. O piso é o ciclo de tempo do episódio mais longo (um Timeout corre o relógio todo, um passo
+de dt de cada vez), não o número de episódios; por isso o headless_episodes por omissão é 64 e as rondas
+seguintes vêm da memorização (e, se ligado, do escalonador).
+
+Simplificações conscientes face ao Unity:
+- O movimento é discreto (uma célula por passo, acumulando velocidade * dt).
+- A repulsão entre inimigos e a física não são simuladas.
+- O Timeout termina a ronda como derrota (no Unity o bot continua sem relógio).
+- As vidas não passam de um nível para o seguinte (cada nível começa com as vidas da classe).
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from services.game_director.gridworld import get_grid, spawn_level
+
+# Ordem do Unity: Vector2Int.up, down, left, right
+DIRS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+_ONE = np.uint64(1)
+
+TIME_BOOST_AMOUNT = 5.0
+SPEED_BOOST_MULTIPLIER = 1.5
+SPEED_BOOST_DURATION = 3.0
+DANGER_RADIUS = 4.0
+# Acima deste raio o agente segue o campo estático (a rota segura só difere perto de inimigos)
+SAFE_RADIUS = 8.0
+
+FIELD_BITS = 10
+UNREACHABLE = 1 << FIELD_BITS
+
+DEFAULT_CLASS_STATS = {"speed": 6.0, "trapResistance": 1.0, "baseLives": 3}
+
+
+# ==========================================
+# BITBOARDS E BFS EM LOTE
+# ==========================================
+def pack_grid(grid: np.ndarray) -> np.ndarray:
+    """Converte grid[x, y] num vetor de linhas uint64 (bit x da linha y)."""
+    width = grid.shape[0]
+    if width > 64:
+        raise ValueError(f"Arena demasiado larga para bitboards de 64 bits: {width}")
+    weights = np.left_shift(_ONE, np.arange(width, dtype=np.uint64))
+    return (grid.T.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+
+def _cell_bits(xs: np.ndarray) -> np.ndarray:
+    return np.left_shift(_ONE, xs.astype(np.uint64))
+
+
+def _expand(front: np.ndarray) -> np.ndarray:
+    nb = (front << _ONE) | (front >> _ONE)
+    nb[:, 1:] |= front[:, :-1]
+    nb[:, :-1] |= front[:, 1:]
+    return nb
+
+
+def _point_board(n: int, height: int, xs: np.ndarray, ys: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    board = np.zeros((n, height), dtype=np.uint64)
+    if valid is None:
+        board[np.arange(n), ys] = _cell_bits(xs)
+    else:
+        board[np.flatnonzero(valid), ys[valid]] = _cell_bits(xs[valid])
+    return board
+
+
+def _bfs(sources: np.ndarray, passable: np.ndarray, qx: np.ndarray, qy: np.ndarray, need: np.ndarray) -> np.ndarray:
+    """
+    BFS em lote a partir de `sources`. Devolve a profundidade de cada célula de consulta (qx, qy),
+    -1 se ficar por alcançar. Os episódios saem do lote quando as suas consultas necessárias
+    (`need`) tiverem distância, por isso a fronteira encolhe em vez de esperar pelo mais lento.
+    As consultas não necessárias podem ficar a -1 se estiverem mais longe do que as necessárias.
+    """
+    n = sources.shape[0]
+    rows = np.arange(n)[:, None]
+    q_bits = _cell_bits(qx)
+    depth = np.full(qx.shape, -1, dtype=np.int64)
+
+    hit = (sources[rows, qy] & q_bits) != 0
+    depth[hit] = 0
+    pending = need & ~hit
+
+    live = np.flatnonzero(pending.any(axis=1))
+    frontier, unvisited = sources[live], (passable & ~sources)[live]
+    q_y, q_bits, pending, live_depth = qy[live], q_bits[live], pending[live], depth[live]
+    d = 0
+    while live.size:
+        frontier = _expand(frontier) & unvisited
+        d += 1
+        unvisited ^= frontier
+        hit = (frontier[rows[:live.size], q_y] & q_bits) != 0
+        live_depth[hit] = d
+        pending &= ~hit
+
+        # Compactar custa mais do que expandir linhas já resolvidas: só quando metade tiver acabado
+        keep = pending.any(axis=1) & frontier.any(axis=1)
+        if 2 * np.count_nonzero(keep) <= live.size:
+            depth[live[~keep]] = live_depth[~keep]
+            live, frontier, unvisited = live[keep], frontier[keep], unvisited[keep]
+            q_y, q_bits, pending, live_depth = q_y[keep], q_bits[keep], pending[keep], live_depth[keep]
+    return depth
+
+
+def _clamp(values: np.ndarray, upper: int) -> np.ndarray:
+    # np.clip pesa demasiado em vetores pequenos chamados a cada passo
+    return np.minimum(np.maximum(values, 0), upper)
+
+
+def _with_neighbours(xs: np.ndarray, ys: np.ndarray, height: int):
+    """Consultas (..., 5): a própria célula e as vizinhas pela ordem do Unity (presas à grelha)."""
+    qx = np.stack([xs] + [_clamp(xs + dx, 63) for dx, _ in DIRS], axis=-1)
+    qy = np.stack([ys] + [_clamp(ys + dy, height - 1) for _, dy in DIRS], axis=-1)
+    return qx, qy
+
+
+def _step_towards(depth: np.ndarray, xs: np.ndarray, ys: np.ndarray, height: int):
+    """
+    Avança uma célula para a vizinha um passo mais perto da origem do BFS (desempate pela ordem
+    do Unity). depth (..., 5) vem do _bfs sobre as consultas do _with_neighbours.
+    """
+    d0 = depth[..., 0]
+    new_x, new_y = xs.copy(), ys.copy()
+    pending = d0 > 0
+
+    for j, (dx, dy) in enumerate(DIRS, start=1):
+        ok = pending & (depth[..., j] == d0 - 1)
+        # Uma vizinha presa à grelha é a própria célula (profundidade d0), nunca a escolhida
+        new_x = np.where(ok, xs + dx, new_x)
+        new_y = np.where(ok, ys + dy, new_y)
+        pending &= ~ok
+    return new_x, new_y
+
+
+def distance_field(sources: np.ndarray, passable: np.ndarray) -> np.ndarray:
+    """
+    BFS completo em lote com a distância guardada em bit-planes: o plano p tem o bit p da
+    distância de cada célula e o último plano marca as células alcançáveis. Evita desempacotar
+    a grelha em cada iteração (a camada d só é escrita nos planos dos bits a 1 de d).
+    """
+    planes = np.zeros((FIELD_BITS + 1,) + sources.shape, dtype=np.uint64)
+    # Só os episódios com origem entram; saem (aos lotes) quando a fronteira se esgota
+    live = np.flatnonzero(sources.any(axis=1))
+    visited, passable = sources[live], passable[live]
+    live_planes = planes[:FIELD_BITS, live]
+    frontier = visited
+    d = 0
+    while live.size:
+        frontier = _expand(frontier) & passable & ~visited
+        d += 1
+        keep = frontier.any(axis=1)
+        if 2 * np.count_nonzero(keep) <= live.size:
+            planes[:FIELD_BITS, live[~keep]] = live_planes[:, ~keep]
+            planes[FIELD_BITS, live[~keep]] = visited[~keep]
+            live, frontier, visited, passable = live[keep], frontier[keep], visited[keep], passable[keep]
+            live_planes = live_planes[:, keep]
+        for p in range(FIELD_BITS):
+            if (d >> p) & 1:
+                live_planes[p] |= frontier
+        visited |= frontier
+    return planes
+
+
+def _field_value(fields: np.ndarray, target: np.ndarray, rows: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Lê a distância em (xs, ys) no campo `target` de cada episódio (UNREACHABLE se fechado)."""
+    bits = (fields[:, target, rows, ys] >> xs.astype(np.uint64)) & _ONE
+    value = (bits[:FIELD_BITS].astype(np.int64) << np.arange(FIELD_BITS)[:, None]).sum(axis=0)
+    return np.where(bits[FIELD_BITS] == _ONE, value, UNREACHABLE)
+
+
+# ==========================================
+# PARÂMETROS DO NÍVEL (Genome + Save + Roster)
+# ==========================================
+def _resolve_class_stats(player_save: dict, roster: dict) -> dict:
+    selected_id = (player_save or {}).get("loadout", {}).get("selectedClassID")
+    for char in (roster or {}).get("classes", []):
+        if char.get("id") == selected_id:
+            return {**DEFAULT_CLASS_STATS, **char.get("stats", {})}
+    return dict(DEFAULT_CLASS_STATS)
+
+
+def level_parameters(genome: dict, player_save: Optional[dict] = None, roster: Optional[dict] = None) -> dict:
+    """Traduz o genoma para os valores efetivos que o GameManager usa numa ronda."""
+    player_save = player_save or {}
+    rules = genome.get("rules", {})
+    upgrades = player_save.get("purchasedUpgrades", {}) or {}
+    stats = player_save.get("stats", {}) or {}
+    class_stats = _resolve_class_stats(player_save, roster)
+
+    size = int(float(genome.get("arena", {}).get("halfSize", 12.0)) * 2)
+
+    time_limit = float(rules.get("timeLimit", 30.0))
+    if time_limit <= 0.1:
+        time_limit = 30.0
+    time_limit += upgrades.get("startExtraTimeLvl", 0) * 10.0
+
+    trap_multiplier = min(1.0, max(0.0, 1.0 - upgrades.get("trapReductionLvl", 0) * 0.05))
+    level_id = int(genome.get("level_id", 1))
+
+    if level_id >= 8:
+        greed = 0.25
+    elif level_id >= 5:
+        greed = 0.50
+    elif level_id >= 3:
+        greed = 0.75
+    else:
+        greed = 1.0
+    target_count = int(rules.get("targetCount", 0))
+
+    return {
+        "level_id": level_id,
+        "seed": int(genome.get("seed", 0)),
+        "width": size,
+        "height": size,
+        "obstacles": int(genome.get("obstacles", {}).get("count", 0)),
+        "time_limit": time_limit,
+        "coins": target_count,
+        "greed_coins": int(round(target_count * greed)),
+        "enemies": int(rules.get("enemyCount", 0)),
+        "enemy_speed": float(rules.get("enemySpeed", 2.0)),
+        "traps": int(round(int(rules.get("trapCount", 0)) * trap_multiplier)),
+        "trap_penalty": float(rules.get("trapPenalty", 2.0)),
+        "powerups": int(stats.get("basePowerUpCount", 3)) + int(upgrades.get("morePowerUpsLvl", 0)),
+        "agent_speed": float(class_stats["speed"]) + upgrades.get("permSpeedLvl", 0) * 0.5,
+        "trap_resistance": float(class_stats.get("trapResistance", 1.0)),
+        "lives": int(class_stats.get("baseLives", 3)) + max(0, int(stats.get("maxLives", 3)) - 3),
+    }
+
+
+def episode_seeds(base_seed: int, episodes: int, rng: np.random.Generator) -> list:
+    """A 1ª tentativa usa a semente do genoma; as seguintes somam um offset como o Unity."""
+    offsets = rng.integers(1000, 99999, size=max(0, episodes - 1))
+    return [base_seed] + [base_seed + int(o) for o in offsets]
+
+
+def _layouts_to_arrays(params: dict, seeds: list) -> dict:
+    width, height = params["width"], params["height"]
+    free_rows, agent, goal = [], [], []
+    enemies, coins, powerups, powerup_types, traps = [], [], [], [], []
+
+    for seed in seeds:
+        grid = get_grid(width, height, params["obstacles"], seed)
+        layout = spawn_level(grid, seed, params["enemies"], params["coins"], params["powerups"], params["traps"])
+        free_rows.append(pack_grid(~grid))
+        agent.append(layout["agent"])
+        goal.append(layout["goal"])
+        enemies.append(layout["enemies"])
+        coins.append(layout["coins"])
+        powerups.append(layout["powerups"])
+        powerup_types.append(layout["powerup_types"])
+        traps.append(layout["traps"])
+
+    def _xy(cells, k):
+        arr = np.asarray(cells, dtype=np.int64).reshape(len(seeds), k, 2)
+        return arr[..., 0], arr[..., 1]
+
+    return {
+        "free": np.stack(free_rows),
+        "agent": np.asarray(agent, dtype=np.int64),
+        "goal": np.asarray(goal, dtype=np.int64),
+        "enemies": _xy(enemies, params["enemies"]),
+        "coins": _xy(coins, params["coins"]),
+        "powerups": _xy(powerups, params["powerups"]),
+        "powerup_types": np.asarray(powerup_types, dtype=np.int64).reshape(len(seeds), params["powerups"]),
+        "traps": _xy(traps, params["traps"]),
+    }
+
+
+def _pad_slots(arrays: list, width: int, fill: int = 0) -> np.ndarray:
+    """Junta (n_i, k_i) de vários níveis num (soma n_i, width); as colunas a mais ficam com `fill`."""
+    return np.concatenate([np.pad(arr, ((0, 0), (0, width - arr.shape[1])), constant_values=fill)
+                           for arr in arrays])
+
+
+def _batch_layouts(level_params: list, level_seeds: list) -> dict:
+    """
+    Layouts de todos os níveis num só lote. As grelhas mais baixas ganham linhas vazias (bloqueadas)
+    até à altura máxima e as entidades em falta ficam em slots mortos (máscara *_valid a False).
+    """
+    layouts = [_layouts_to_arrays(params, seeds) for params, seeds in zip(level_params, level_seeds)]
+    height = max(params["height"] for params in level_params)
+    batch = {
+        "height": height,
+        "free": np.concatenate([np.pad(lay["free"], ((0, 0), (0, height - lay["free"].shape[1])))
+                                for lay in layouts]),
+        "agent": np.concatenate([lay["agent"] for lay in layouts]),
+        "goal": np.concatenate([lay["goal"] for lay in layouts]),
+    }
+    for key in ("enemies", "coins", "powerups", "traps"):
+        slots = max(lay[key][0].shape[1] for lay in layouts)
+        batch[key] = (_pad_slots([lay[key][0] for lay in layouts], slots),
+                      _pad_slots([lay[key][1] for lay in layouts], slots))
+        batch[f"{key}_valid"] = _pad_slots([np.ones(lay[key][0].shape, dtype=bool) for lay in layouts], slots, False)
+    batch["powerup_types"] = _pad_slots([lay["powerup_types"] for lay in layouts], batch["powerups"][0].shape[1], -1)
+    return batch
+
+
+def verify_layouts(genomes: list, seeds_per_level: int = 8, rng_seed: int = 0) -> list:
+    """
+    Compara o lote que o simulador usa (bitboards, linhas e slots de padding) com o gridworld.py
+    (build_grid + spawn_level sem cache) para as sementes de cada nível: paredes, spawn do agente,
+    saída, inimigos, moedas, power-ups (e tipo) e armadilhas. Devolve a lista de diferenças (vazia = iguais).
+    """
+    from services.game_director import gridworld
+
+    level_params = [level_parameters(genome) for genome in genomes]
+    level_seeds = [episode_seeds(params["seed"], seeds_per_level, np.random.default_rng(rng_seed + i))
+                   for i, params in enumerate(level_params)]
+    lay = _batch_layouts(level_params, level_seeds)
+    bits = np.left_shift(_ONE, np.arange(64, dtype=np.uint64))
+
+    problems, row = [], 0
+    for genome, params, seeds in zip(genomes, level_params, level_seeds):
+        width, height = params["width"], params["height"]
+        arena = gridworld.genome_arena(genome)
+        if arena != (width, height, params["obstacles"]):
+            problems.append(f"nível {params['level_id']}: arena {(width, height, params['obstacles'])} != {arena}")
+        for seed in seeds:
+            grid = gridworld.build_grid(width, height, params["obstacles"], seed)
+            expected = gridworld.spawn_level(grid, seed, params["enemies"], params["coins"], params["powerups"], params["traps"])
+            where = f"nível {params['level_id']} semente {seed}"
+
+            free = (lay["free"][row][:, None] & bits[None, :]) != 0
+            if not np.array_equal(free[:height, :width].T, ~grid) or free[height:].any() or free[:, width:].any():
+                problems.append(f"{where}: paredes diferentes")
+            if tuple(lay["agent"][row]) != tuple(expected["agent"]) or tuple(lay["goal"][row]) != tuple(expected["goal"]):
+                problems.append(f"{where}: spawn do agente ou saída diferentes")
+            for key in ("enemies", "coins", "powerups", "traps"):
+                xs, ys = lay[key]
+                valid = lay[f"{key}_valid"][row]
+                cells = list(zip(xs[row][valid].tolist(), ys[row][valid].tolist()))
+                if cells != [tuple(cell) for cell in expected[key]]:
+                    problems.append(f"{where}: {key} diferentes")
+            types = lay["powerup_types"][row][lay["powerups_valid"][row]].tolist()
+            if types != list(expected["powerup_types"]):
+                problems.append(f"{where}: tipos de power-up diferentes")
+            row += 1
+    return problems
+
+
+# ==========================================
+# MOTOR DE SIMULAÇÃO EM LOTE
+# ==========================================
+def simulate_level(genome: dict, episodes: int = 64, player_save: Optional[dict] = None,
+                   roster: Optional[dict] = None, rng_seed: Optional[int] = None) -> dict:
+    """Corre `episodes` rondas do nível em lote e devolve um LevelReport igual ao do Unity."""
+    return simulate_levels([genome], [episodes], player_save, roster, rng_seed)[0]
+
+
+def simulate_levels(genomes: list, episodes: list, player_save: Optional[dict] = None,
+                    roster: Optional[dict] = None, rng_seed: Optional[int] = None) -> list:
+    """
+    Corre episodes[i] rondas de cada genomes[i] num único lote e devolve um LevelReport por nível
+    (os níveis com 0 episódios são saltados). O nível i usa o gerador rng_seed + i.
+    """
+    plan = [(i, genome, count) for i, (genome, count) in enumerate(zip(genomes, episodes)) if count > 0]
+    if not plan:
+        return []
+    level_params = [level_parameters(genome, player_save, roster) for _, genome, _ in plan]
+    level_seeds = [episode_seeds(params["seed"], count, np.random.default_rng(None if rng_seed is None else rng_seed + i))
+                   for params, (i, _, count) in zip(level_params, plan)]
+    counts = [len(seeds) for seeds in level_seeds]
+    lay = _batch_layouts(level_params, level_seeds)
+
+    n = sum(counts)
+    height = lay["height"]
+    free = lay["free"]
+
+    def per_episode(key, dtype=float):
+        return np.repeat(np.asarray([params[key] for params in level_params], dtype=dtype), counts)
+
+    agent_speed = per_episode("agent_speed")
+    enemy_speed = per_episode("enemy_speed")
+    greed_coins = per_episode("greed_coins", np.int64)
+    trap_cost = per_episode("trap_penalty") * per_episode("trap_resistance")
+
+    ax, ay = lay["agent"][:, 0].copy(), lay["agent"][:, 1].copy()
+    gx, gy = lay["goal"][:, 0], lay["goal"][:, 1]
+    ex, ey = (a.copy() for a in lay["enemies"])
+    cx, cy = lay["coins"]
+
+    # Campos de distância estáticos para a saída e para cada moeda (calculados uma vez, slots mortos ficam vazios)
+    targets = [(gx, gy, None)] + [(cx[:, k], cy[:, k], lay["coins_valid"][:, k]) for k in range(cx.shape[1])]
+    fields = np.stack([distance_field(_point_board(n, height, x, y, valid), free) for x, y, valid in targets], axis=1)
+    px, py = lay["powerups"]
+    tx, ty = lay["traps"]
+    enemy_alive = lay["enemies_valid"].copy()
+    coin_alive = lay["coins_valid"].copy()
+    powerup_alive = lay["powerups_valid"].copy()
+    trap_alive = lay["traps_valid"].copy()
+
+    timer = per_episode("time_limit")
+    elapsed = np.zeros(n)
+    boost = np.zeros(n)
+    agent_progress = np.zeros(n)
+    enemy_progress = np.zeros(ex.shape)
+    lives = per_episode("lives", np.int64)
+
+    collected = np.zeros(n, dtype=np.int64)
+    lives_lost = np.zeros(n, dtype=np.int64)
+    timeouts = np.zeros(n, dtype=np.int64)
+    powerups_used = np.zeros(n, dtype=np.int64)
+    won = np.zeros(n, dtype=bool)
+    active = np.ones(n, dtype=bool)
+
+    # Um só dt para o lote: o do nível mais rápido (nenhuma entidade avança mais de uma célula por passo)
+    max_speed = max([1.0] + [max(params["agent_speed"] * SPEED_BOOST_MULTIPLIER, params["enemy_speed"])
+                             for params in level_params])
+    dt = min(0.1, 1.0 / max_speed)
+    has_enemies = ex.shape[1] > 0
+
+    while active.any():
+        idx = np.flatnonzero(active)
+
+        timer[idx] -= dt
+        elapsed[idx] += dt
+        boost[idx] = np.maximum(boost[idx] - dt, 0.0)
+
+        # 1. AGENTE (SimpleAgent.HandleBotAI)
+        speed = agent_speed[idx] * np.where(boost[idx] > 0, SPEED_BOOST_MULTIPLIER, 1.0)
+        agent_progress[idx] += speed * dt
+        mover = agent_progress[idx] >= 1.0
+        if mover.any():
+            sub = idx[mover]
+            agent_progress[sub] -= 1.0
+            new_x, new_y = _agent_step(height, greed_coins[sub], fields, sub, free[sub], ax[sub], ay[sub],
+                                       gx[sub], gy[sub], ex[sub], ey[sub], enemy_alive[sub], cx[sub], cy[sub],
+                                       coin_alive[sub], collected[sub])
+            ax[sub], ay[sub] = new_x, new_y
+
+        # 2. RECOLHAS (GameObjective, PowerUp, Trap)
+        a_x, a_y = ax[idx][:, None], ay[idx][:, None]
+        hit = coin_alive[idx] & (cx[idx] == a_x) & (cy[idx] == a_y)
+        collected[idx] += hit.sum(axis=1)
+        coin_alive[idx] &= ~hit
+
+        hit = powerup_alive[idx] & (px[idx] == a_x) & (py[idx] == a_y)
+        types = lay["powerup_types"][idx]
+        timer[idx] += (hit & (types == 0)).sum(axis=1) * TIME_BOOST_AMOUNT
+        boost[idx] = np.where((hit & (types == 1)).any(axis=1), SPEED_BOOST_DURATION, boost[idx])
+        powerups_used[idx] += hit.sum(axis=1)
+        powerup_alive[idx] &= ~hit
+
+        hit = trap_alive[idx] & (tx[idx] == a_x) & (ty[idx] == a_y)
+        timer[idx] -= hit.sum(axis=1) * trap_cost[idx]
+        trap_alive[idx] &= ~hit
+
+        reached = (ax[idx] == gx[idx]) & (ay[idx] == gy[idx])
+        won[idx[reached]] = True
+
+        # 3. INIMIGOS (ChaserAI: um só BFS a partir dos agentes para todos os episódios do lote)
+        if has_enemies:
+            enemy_progress[idx] += enemy_speed[idx][:, None] * dt
+            movers = enemy_alive[idx] & (enemy_progress[idx] >= 1.0) & ~reached[:, None]
+            if movers.any():
+                sub_rows = np.flatnonzero(movers.any(axis=1))
+                sub = idx[sub_rows]
+                step = movers[sub_rows]
+                sources = _point_board(sub.size, height, ax[sub], ay[sub])
+                qx, qy = _with_neighbours(ex[sub], ey[sub], height)
+                need = np.zeros(qx.shape, dtype=bool)
+                need[..., 0] = step
+                depth = _bfs(sources, free[sub], qx.reshape(sub.size, -1), qy.reshape(sub.size, -1),
+                             need.reshape(sub.size, -1))
+                new_x, new_y = _step_towards(depth.reshape(qx.shape), ex[sub], ey[sub], height)
+                ex[sub] = np.where(step, new_x, ex[sub])
+                ey[sub] = np.where(step, new_y, ey[sub])
+                enemy_progress[sub] -= step
+
+            caught = enemy_alive[idx] & (ex[idx] == ax[idx][:, None]) & (ey[idx] == ay[idx][:, None])
+            caught &= ~reached[:, None]
+            n_caught = caught.sum(axis=1)
+            lives_lost[idx] += n_caught
+            lives[idx] -= n_caught
+            enemy_alive[idx] &= ~caught
+
+        # 4. FIM DA RONDA (Vitória, Timeout ou sem vidas)
+        out_of_time = ~reached & (timer[idx] <= 0)
+        timeouts[idx] += out_of_time
+        lives[idx] -= out_of_time
+        done = reached | out_of_time | (lives[idx] <= 0)
+        active[idx[done]] = False
+
+    bounds = np.cumsum([0] + counts)
+    return [_build_report(params["level_id"], *(arr[start:end] for arr in
+                                                (won, elapsed, timer, lives_lost, timeouts, collected, powerups_used)))
+            for params, start, end in zip(level_params, bounds[:-1], bounds[1:])]
+
+
+def _follow_field(fields: np.ndarray, target: np.ndarray, rows: np.ndarray, xs: np.ndarray, ys: np.ndarray):
+    """Desce o gradiente do campo estático (mesmo desempate do _step_towards)."""
+    d0 = _field_value(fields, target, rows, xs, ys)
+    new_x, new_y = xs.copy(), ys.copy()
+    pending = (d0 > 0) & (d0 < UNREACHABLE)
+    for dx, dy in DIRS:
+        ok = pending & (_field_value(fields, target, rows, xs + dx, ys + dy) == d0 - 1)
+        new_x = np.where(ok, xs + dx, new_x)
+        new_y = np.where(ok, ys + dy, new_y)
+        pending &= ~ok
+    return new_x, new_y
+
+
+def _agent_step(height, greed_coins, fields, episodes, free, ax, ay, gx, gy, ex, ey, enemy_alive, cx, cy,
+                coin_alive, collected):
+    """Escolhe o alvo (fuga, moeda ou saída) e dá um passo pela rota segura ou de desespero."""
+    n = ax.shape[0]
+    rows = np.arange(n)
+
+    enemy_dist = np.where(enemy_alive, np.hypot(ex - ax[:, None], ey - ay[:, None]), np.inf)
+    nearest_enemy = enemy_dist.min(axis=1) if enemy_dist.shape[1] > 0 else np.full(n, np.inf)
+    danger_close = nearest_enemy < DANGER_RADIUS
+
+    # Alvo 0 é a saída; o alvo k + 1 é a moeda k
+    target = np.zeros(n, dtype=np.int64)
+    tx, ty = gx.copy(), gy.copy()
+    if cx.shape[1] > 0:
+        coin_dist = np.where(coin_alive, np.hypot(cx - ax[:, None], cy - ay[:, None]), np.inf)
+        seeking = ~danger_close & (collected < greed_coins) & coin_alive.any(axis=1)
+        nearest = np.argmin(coin_dist, axis=1)
+        target = np.where(seeking, nearest + 1, 0)
+        tx = np.where(seeking, cx[rows, nearest], gx)
+        ty = np.where(seeking, cy[rows, nearest], gy)
+
+    new_x, new_y = _follow_field(fields, target, episodes, ax, ay)
+
+    near = np.flatnonzero(nearest_enemy < SAFE_RADIUS)
+    if near.size == 0:
+        return new_x, new_y
+
+    # Perto de inimigos: BFS real com zonas de perigo (igual ao FindPathBFS do bot)
+    k = ex.shape[1]
+    sources = _point_board(near.size, height, tx[near], ty[near])
+    agent_bit = _point_board(near.size, height, ax[near], ay[near])
+
+    danger = np.zeros((near.size, height), dtype=np.uint64)
+    danger_rows = np.repeat(np.arange(near.size), k)
+    alive = enemy_alive[near].ravel()
+    for dx, dy in ((0, 0),) + DIRS:
+        zx = _clamp(ex[near].ravel() + dx, 63)
+        zy = _clamp(ey[near].ravel() + dy, height - 1)
+        np.bitwise_or.at(danger, (danger_rows[alive], zy[alive]), _cell_bits(zx[alive]))
+
+    qx, qy = _with_neighbours(ax[near], ay[near], height)
+    safe = free[near] & ~danger
+    need = np.zeros(qx.shape, dtype=bool)
+    need[:, 0] = True
+    # Agente sem vizinhas seguras: a rota segura não existe e nem vale a pena inundar a região
+    safe_need = need & (_expand(agent_bit) & safe).any(axis=1)[:, None]
+
+    # Rota segura e rota de desespero (ignora inimigos) no mesmo lote; a segura ganha se existir
+    depth = _bfs(np.concatenate([sources, sources]), np.concatenate([safe | agent_bit, free[near]]),
+                 np.concatenate([qx, qx]), np.concatenate([qy, qy]), np.concatenate([safe_need, need]))
+    safe, desperate = depth[:near.size], depth[near.size:]
+    depth = np.where((safe[:, 0] < 0)[:, None], desperate, safe)
+    new_x[near], new_y[near] = _step_towards(depth, ax[near], ay[near], height)
+    return new_x, new_y
+
+
+def _build_report(level_id, won, elapsed, timer, lives_lost, timeouts, collected, powerups_used) -> dict:
+    """
+    Agrega os episódios num LevelReport: é o merge_level_reports dos relatórios que o GameManager
+    emitiria, um por episódio (contagens em bruto somadas, win_rate = vitórias / tentativas).
+    """
+    episodes = won.size
+    wins = int(won.sum())
+
+    return {
+        "level_id": level_id,
+        "total_rounds": episodes,
+        "wins": wins,
+        "win_rate": round(wins / episodes, 4) if episodes else 0.0,
+        "time_to_win": round(float(elapsed[won].mean()), 2) if wins else 0.0,
+        "lives_lost": int(lives_lost.sum()),
+        "timeouts": int(timeouts.sum()),
+        "collected_coins": int(collected.sum()),
+        "collected_crystals": int(np.floor(np.maximum(timer[won], 0)).sum()),
+        "powerups_used": int(powerups_used.sum()),
+    }
+
+
+def simulate_campaign(campaign: list, episodes: int = 64, player_save: Optional[dict] = None,
+                      roster: Optional[dict] = None, rng_seed: Optional[int] = None,
+                      episodes_by_level: Optional[dict] = None) -> dict:
+    """
+    Simula todos os níveis da campanha e devolve um metrics.json equivalente ao do Unity.
+    episodes_by_level ({level_id: episódios}) encurta níveis; 0 salta o nível (resultado já memorizado).
+    """
+    episodes_by_level = episodes_by_level or {}
+    level_reports = simulate_levels(campaign, [episodes_by_level.get(level.get("level_id"), episodes) for level in campaign],
+                                    player_save, roster, rng_seed)
+
+    bottleneck = min(level_reports, key=lambda rep: rep["win_rate"])["level_id"] if level_reports else 1
+    return {
+        # Uma campanha headless nunca é candidata ao Hall of Fame sem validação no Unity
+        "campaign_completed": False,
+        "bottleneck_level": bottleneck,
+        "is_human": False,
+        "engine": "headless",
+        "level_reports": level_reports,
+    }
+
+
+def run_headless_simulation(campaign_path: str, roster_path: str, player_save_path: str,
+                            episodes: int = 64, rng_seed: Optional[int] = None, episodes_by_level: Optional[dict] = None) -> dict:
+    """Lê os JSONs da Build e devolve o mesmo formato do call_tool('run_game_simulation')."""
+    def _load(path, default):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return default
+
+    try:
+        campaign = _load(campaign_path, [])
+        if isinstance(campaign, dict):
+            campaign = [campaign]
+        metrics = simulate_campaign(campaign, episodes, _load(player_save_path, {}), _load(roster_path, {}), rng_seed,
+                                    episodes_by_level)
+        return {"ok": True, "output": "Headless simulation ok", "data": {"metrics": metrics}}
+    except Exception as e:
+        return {"ok": False, "output": f"Headless simulation error: {e}", "data": None}
@@ -0,0 +1,297 @@
+"""
+Analisador estático de níveis (NumPy, sem simulação).
+
+A partir da semente e dos parâmetros do genoma gera o layout exato do Unity (gridworld.py) e
+calcula features estruturais: campos de distância BFS a partir da spawn, comprimento mínimo da
+rota spawn -> moedas -> saída, estrangulamentos (pontos de articulação), densidade de becos sem
+saída e rácio de área alcançável. Os resultados ficam na tabela level_analysis (chave: hash do
+genoma) e numa cache em memória, por isso o orchestrator, os prompts do Director e o Hall of Fame
+leem sempre o mesmo valor sem recalcular.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import threading
+from typing import Optional
+
+import numpy as np
+
+from services.game_director.gridworld import genome_arena, get_grid, spawn_level
+from shared.db.analysis_store import load_analyses, save_analyses
+
+# Velocidade de referência (células/s) para converter a rota em tempo de caminhada
+REFERENCE_SPEED = 5.0
+# Acima deste número de moedas a rota usa vizinho mais próximo + 2-opt em vez de Held-Karp exato
+EXACT_TOUR_MAX_COINS = 10
+
+_FEATURE_CACHE = {}
+_FEATURE_LOCK = threading.Lock()
+
+
+# ==========================================
+# 🚨 HASH DO GENOMA (só os campos que definem o layout)
+# ==========================================
+def genome_hash(genome: dict) -> str:
+    """Semente, arena, obstáculos e os spawns que antecedem as moedas (inimigos) definem o layout."""
+    width, height, obstacles = genome_arena(genome)
+    rules = genome.get("rules", {})
+    key = [int(genome.get("seed", 0)), width, height, obstacles, int(rules.get("enemyCount", 0)), int(rules.get("targetCount", 0))]
+    return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()[:20]
+
+
+# ==========================================
+# CAMPOS BFS EM LOTE E ESTRUTURA DO LABIRINTO
+# ==========================================
+def _dilate(front: np.ndarray) -> np.ndarray:
+    """Vizinhança 4-conexa de cada grelha do lote (eixos 1 e 2 = x, y)."""
+    nb = np.zeros_like(front)
+    nb[:, 1:, :] |= front[:, :-1, :]
+    nb[:, :-1, :] |= front[:, 1:, :]
+    nb[:, :, 1:] |= front[:, :, :-1]
+    nb[:, :, :-1] |= front[:, :, 1:]
+    return nb
+
+def distance_fields(passable: np.ndarray, sources: list) -> np.ndarray:
+    """Um campo de distâncias BFS por fonte, todos expandidos em simultâneo (-1 = inalcançável)."""
+    k = len(sources)
+    dist = np.full((k,) + passable.shape, -1, dtype=np.int32)
+    frontier = np.zeros((k,) + passable.shape, dtype=bool)
+    for i, (x, y) in enumerate(sources):
+        frontier[i, x, y] = True
+        dist[i, x, y] = 0
+
+    d = 0
+    while frontier.any():
+        d += 1
+        frontier = _dilate(frontier) & passable & (dist < 0)
+        dist[frontier] = d
+    return dist
+
+def _neighbour_count(passable: np.ndarray) -> np.ndarray:
+    p = passable.astype(np.int8)
+    count = np.zeros_like(p)
+    count[1:, :] += p[:-1, :]
+    count[:-1, :] += p[1:, :]
+    count[:, 1:] += p[:, :-1]
+    count[:, :-1] += p[:, 1:]
+    return count
+
+def articulation_points(region: np.ndarray) -> int:
+    """Células cuja remoção desliga a área alcançável (Tarjan iterativo sobre índices planos)."""
+    width, height = region.shape
+    cells = np.flatnonzero(region.ravel())
+    if cells.size < 3:
+        return 0
+
+    free = region.ravel()
+    disc = np.full(width * height, -1, dtype=np.int64)
+    low = np.zeros(width * height, dtype=np.int64)
+    neighbours = lambda i: [j for j in (i + 1, i - 1, i - height, i + height) if 0 <= j < free.size and free[j]]
+
+    root = int(cells[0])
+    disc[root] = low[root] = 0
+    timer = 1
+    points = set()
+    root_children = 0
+    stack = [(root, -1, iter(neighbours(root)))]
+
+    while stack:
+        node, parent, it = stack[-1]
+        child = next(it, None)
+        if child is None:
+            stack.pop()
+            if parent >= 0:
+                low[parent] = min(low[parent], low[node])
+                if parent != root and low[node] >= disc[parent]:
+                    points.add(parent)
+            continue
+        if disc[child] < 0:
+            disc[child] = low[child] = timer
+            timer += 1
+            if node == root:
+                root_children += 1
+            stack.append((child, node, iter(neighbours(child))))
+        elif child != parent:
+            low[node] = min(low[node], disc[child])
+
+    if root_children > 1:
+        points.add(root)
+    return len(points)
+
+
+# ==========================================
+# ROTA SPAWN -> MOEDAS -> SAÍDA
+# ==========================================
+def _held_karp(start: np.ndarray, between: np.ndarray, end: np.ndarray) -> float:
+    """Caminho mínimo exato (início fixo, fim fixo) com DP sobre subconjuntos, vetorizado por nó final."""
+    k = between.shape[0]
+    full = (1 << k) - 1
+    dp = np.full((1 << k, k), np.inf)
+    dp[1 << np.arange(k), np.arange(k)] = start
+
+    for mask in range(1, full + 1):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        outside = [j for j in range(k) if not mask & (1 << j)]
+        if not outside:
+            continue
+        # Para cada moeda j fora do conjunto: melhor dp[mask, i] + d(i, j)
+        best = (row[:, None] + between[:, outside]).min(axis=0)
+        targets = [mask | (1 << j) for j in outside]
+        dp[targets, outside] = np.minimum(dp[targets, outside], best)
+
+    return float((dp[full] + end).min())
+
+def _heuristic_tour(start: np.ndarray, between: np.ndarray, end: np.ndarray) -> float:
+    """Vizinho mais próximo seguido de 2-opt (muitas moedas)."""
+    k = between.shape[0]
+    order = [int(np.argmin(start))]
+    remaining = set(range(k)) - set(order)
+    while remaining:
+        last = order[-1]
+        nxt = min(remaining, key=lambda j: between[last, j])
+        order.append(nxt)
+        remaining.discard(nxt)
+
+    def length(path):
+        return start[path[0]] + sum(between[a, b] for a, b in zip(path, path[1:])) + end[path[-1]]
+
+    best = length(order)
+    improved = True
+    while improved:
+        improved = False
+        for i, j in itertools.combinations(range(k), 2):
+            candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+            candidate_length = length(candidate)
+            if candidate_length < best - 1e-9:
+                order, best, improved = candidate, candidate_length, True
+    return float(best)
+
+def coin_tour_length(start: np.ndarray, between: np.ndarray, end: np.ndarray) -> float:
+    if between.shape[0] == 0:
+        return float(end.min()) if end.size else 0.0
+    if between.shape[0] <= EXACT_TOUR_MAX_COINS:
+        return _held_karp(start, between, end)
+    return _heuristic_tour(start, between, end)
+
+
+# ==========================================
+# ANÁLISE DE UM GENOMA
+# ==========================================
+def analyze_genome(genome: dict, cache_dir: Optional[str] = None) -> dict:
+    """Features estruturais do layout da 1ª tentativa do nível (a que usa a semente do genoma)."""
+    seed = int(genome.get("seed", 0))
+    width, height, obstacles = genome_arena(genome)
+    rules = genome.get("rules", {})
+
+    grid = get_grid(width, height, obstacles, seed, cache_dir)
+    layout = spawn_level(grid, seed, int(rules.get("enemyCount", 0)), int(rules.get("targetCount", 0)), 0, 0)
+    passable = ~grid
+
+    # Fontes: spawn, moedas e saída -> matriz de distâncias entre todos os pontos de interesse
+    points = [layout["agent"]] + layout["coins"] + [layout["goal"]]
+    fields = distance_fields(passable, points)
+    xs, ys = np.array([p[0] for p in points]), np.array([p[1] for p in points])
+    dist = fields[:, xs, ys].astype(np.float64)
+    dist[dist < 0] = np.inf
+
+    spawn_field = fields[0]
+    region = spawn_field >= 0
+    reachable = int(region.sum())
+    free_cells = int(passable.sum())
+
+    neighbours = _neighbour_count(passable)
+    dead_ends = int((region & (neighbours == 1)).sum())
+    chokepoints = articulation_points(region)
+
+    n_coins = len(layout["coins"])
+    coin_ok = np.isfinite(dist[0, 1:1 + n_coins])
+    goal_distance = dist[0, -1]
+
+    tour = None
+    if np.isfinite(goal_distance):
+        idx = np.flatnonzero(coin_ok) + 1
+        tour = coin_tour_length(dist[0, idx], dist[np.ix_(idx, idx)], dist[idx, -1] if idx.size else np.array([goal_distance]))
+
+    enemy_distances = [int(spawn_field[x, y]) for x, y in layout["enemies"] if spawn_field[x, y] >= 0]
+
+    return {
+        "width": width,
+        "height": height,
+        "free_cells": free_cells,
+        "reachable_cells": reachable,
+        "reachable_ratio": round(reachable / max(free_cells, 1), 4),
+        "goal_reachable": bool(np.isfinite(goal_distance)),
+        "unreachable_coins": int((~coin_ok).sum()),
+        "exit_distance": int(goal_distance) if np.isfinite(goal_distance) else None,
+        "coin_tour_length": int(round(tour)) if tour is not None else None,
+        "max_distance": int(spawn_field.max()),
+        "mean_distance": round(float(spawn_field[region].mean()), 2) if reachable else 0.0,
+        "nearest_enemy_distance": min(enemy_distances) if enemy_distances else None,
+        "chokepoints": chokepoints,
+        "chokepoint_density": round(chokepoints / max(reachable, 1), 4),
+        "dead_ends": dead_ends,
+        "dead_end_density": round(dead_ends / max(reachable, 1), 4),
+    }
+
+
+# ==========================================
+# LEITURA COM CACHE (memória -> tabela level_analysis -> análise)
+# ==========================================
+def get_level_features(db_path: str, genomes: list, cache_dir: Optional[str] = None) -> dict:
+    """Devolve {genome_hash: features} para todos os genomas, só analisando os que nunca foram vistos."""
+    hashes = {genome_hash(g): g for g in genomes}
+
+    with _FEATURE_LOCK:
+        result = {h: _FEATURE_CACHE[h] for h in hashes if h in _FEATURE_CACHE}
+
+    missing = [h for h in hashes if h not in result]
+    if missing:
+        stored = load_analyses(db_path, missing)
+        result.update(stored)
+
+        new_rows = []
+        for h in missing:
+            if h in stored:
+                continue
+            genome = hashes[h]
+            features = analyze_genome(genome, cache_dir)
+            result[h] = features
+            new_rows.append((h, int(genome.get("level_id", 0)), int(genome.get("seed", 0)), features))
+        save_analyses(db_path, new_rows)
+
+        with _FEATURE_LOCK:
+            for h in missing:
+                _FEATURE_CACHE[h] = result[h]
+    return result
+
+def level_features(db_path: str, genome: dict, cache_dir: Optional[str] = None) -> dict:
+    return get_level_features(db_path, [genome], cache_dir)[genome_hash(genome)]
+
+def structural_difficulty(genome: dict, features: dict) -> Optional[float]:
+    """
+    Dificuldade que lê o labirinto: pressão de tempo (rota mínima a caminhar / timeLimit) mais a ameaça
+    dos inimigos, agravada por estrangulamentos e becos sem saída (menos rotas de fuga).
+    None quando a saída é inalcançável.
+    """
+    if features.get("coin_tour_length") is None:
+        return None
+
+    rules = genome.get("rules", {})
+    time_limit = max(float(rules.get("timeLimit", 30.0)), 1.0)
+    time_pressure = features["coin_tour_length"] / REFERENCE_SPEED / time_limit
+    threat = int(rules.get("enemyCount", 0)) * float(rules.get("enemySpeed", 0.0)) / REFERENCE_SPEED
+    confinement = 1.0 + 2.0 * (features["chokepoint_density"] + features["dead_end_density"])
+    return round(100 * time_pressure + 10 * threat * confinement, 1)
+
+def structure_summary(features: dict) -> str:
+    """Resumo em inglês para os prompts do Director."""
+    if not features.get("goal_reachable"):
+        return "EXIT UNREACHABLE from the spawn with the current seed."
+    return (f"Spawn->exit {features['exit_distance']} cells, full coin route {features['coin_tour_length']} cells, "
+            f"{features['chokepoints']} chokepoints, dead-end density {features['dead_end_density']:.2f}, "
+            f"reachable area {features['reachable_ratio']:.0%}"
+            + (f", {features['unreachable_coins']} coin(s) unreachable" if features["unreachable_coins"] else ""))
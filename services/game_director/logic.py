@@ -1,7 +1,14 @@
+import copy
 import json
+import os
 import random
+from rich import print
+from shared.metrics import merge_level_reports
 from shared.planning import extract_first_json_object
-from shared.ollama_client import chat
+from shared.db.llm_cache import cached_chat, get_cache_settings
+from shared.db.economy_query import get_inflation, get_item_series
+from shared.ollama_client import file_progress_callback
+from services.game_director.level_analyzer import level_features, structure_summary
 
 # ==========================================
 # 🚨 CURVA DE DIFICULDADE FÍSICA E PACING (Labirinto)
@@ -24,6 +31,33 @@ def get_progressive_boundaries(level_id: int) -> dict:
         "max_coins": int(5 + (factor * 15))  # Nunca passa de umas 20 no Nível 10!
     }
 
+def get_target_band(level_id: int) -> tuple:
+    """Intervalo de win rate pretendido para o nível (Pilar 1 da curva de dificuldade)."""
+    if level_id <= 3:
+        return 0.85, 0.95
+    elif level_id <= 6:
+        return 0.50, 0.60
+    elif level_id <= 9:
+        return 0.20, 0.30
+    return 0.05, 0.15
+
+# Arquétipo de cada banda da curva: (nome, descrição, mortes aceitáveis para humanos).
+# O intervalo de win rate vem sempre do get_target_band.
+BAND_ARCHETYPES = {
+    (0.85, 0.95): ("The Tutorial: High win rate expected", "Very easy, few enemies, generous time.", 0),
+    (0.50, 0.60): ("The Friction Point: Medium difficulty", "The player should start sweating and losing some lives.", 1),
+    (0.20, 0.30): ("The Gauntlet: Hard", "Brutal difficulty. Player is expected to die multiple times and rely on the shop.", 3),
+    (0.05, 0.15): ("The Final Boss: Glorious hell", "Extremely low win rate, maximum tension.", 5),
+}
+DEFAULT_ARCHETYPE = ("Custom band", "Keep the difficulty inside the target band.", 1)
+
+def get_band_archetype(level_id: int) -> tuple:
+    """(target_min, target_max, arquétipo para o prompt, mortes aceitáveis) da banda do nível."""
+    target_min, target_max = get_target_band(level_id)
+    name, description, acceptable_deaths = BAND_ARCHETYPES.get((target_min, target_max), DEFAULT_ARCHETYPE)
+    archetype = f"{name} ({target_min * 100:.0f}-{target_max * 100:.0f}%). {description}"
+    return target_min, target_max, archetype, acceptable_deaths
+
 def _get_player_context(player_save: dict, current_roster: dict) -> str:
     """Extrai o contexto do jogador para a IA ler e conta os upgrades totais"""
     loadout = player_save.get("loadout", {})
@@ -51,6 +85,22 @@ def _get_player_context(player_save: dict, current_roster: dict) -> str:
     - Trap Reduction Lvl: {upgrades.get('trapReductionLvl', 0)}
     """
 
+def _structure_context(config: dict, genome: dict) -> str:
+    """Resumo estrutural do labirinto atual (tabela level_analysis); vazio se a análise falhar."""
+    try:
+        db_path = os.path.join(config["paths"]["data"], "evolution.db")
+        return structure_summary(level_features(db_path, genome))
+    except Exception as e:
+        print(f"[yellow]Análise estrutural indisponível: {e}[/yellow]")
+        return "unavailable"
+
+def _confidence_context(report: dict) -> str:
+    """Intervalo de Wilson do escalonador (se existir), para o LLM não reagir a ruído."""
+    ci = report.get("win_rate_ci")
+    if not ci:
+        return ""
+    return f", 95% CI {ci[0]:.2f}-{ci[1]:.2f} over {report.get('total_rounds', 0)} rounds, verdict: {report.get('band_decision', 'undecided')}"
+
 def evolve_bot_genome(config: dict, metrics: dict, current_genome: dict, player_save: dict, current_roster: dict) -> dict:
     level_id = current_genome.get("level_id", 1)
     bounds = get_progressive_boundaries(level_id)
@@ -64,18 +114,7 @@ def evolve_bot_genome(config: dict, metrics: dict, current_genome: dict, player_
     collected_coins = my_report.get("collected_coins", 0)
 
     # 🚨 PILAR 1: A NOVA CURVA DE WIN-RATE
-    if level_id <= 3:
-        target_min, target_max = 0.85, 0.95
-        archetype = "The Tutorial: High win rate expected (85-95%). Very easy, few enemies, generous time."
-    elif level_id <= 6:
-        target_min, target_max = 0.50, 0.60
-        archetype = "The Friction Point: Medium difficulty (50-60%). The player should start sweating and losing some lives."
-    elif level_id <= 9:
-        target_min, target_max = 0.20, 0.30
-        archetype = "The Gauntlet: Hard (20-30%). Brutal difficulty. Player is expected to die multiple times and rely on the shop."
-    else:
-        target_min, target_max = 0.05, 0.15
-        archetype = "The Final Boss (Level 10): Glorious hell (5-15%). Extremely low win rate, maximum tension."
+    target_min, target_max, archetype, _ = get_band_archetype(level_id)
 
     # 🚨 PILAR 2: IMUNIDADE DE NÍVEL (Proteção contra o God Mode)
     upgrades = player_save.get("purchasedUpgrades", {})
@@ -96,10 +135,14 @@ def evolve_bot_genome(config: dict, metrics: dict, current_genome: dict, player_
     CURRENT LEVEL CONFIGURATION:
     {json.dumps(current_genome, indent=2)}
     
+    MAZE STRUCTURE (static analysis of the current seed and obstacles):
+    {_structure_context(config, current_genome)}
+    
     BOT SIMULATION METRICS FOR THIS LEVEL:
-    - Actual Win Rate: {win_rate:.2f} (Target is {target_min:.2f} to {target_max:.2f})
+    - Actual Win Rate: {win_rate:.2f} (Target is {target_min:.2f} to {target_max:.2f}{_confidence_context(my_report)})
     - Lives Lost (Enemies/Traps): {lives_lost}
     - Timeouts: {timeouts}
+    (Lives lost and timeouts are totals over {my_report.get('total_rounds', 1)} attempts.)
     
     DESIGN ARCHETYPE FOR LEVEL {level_id}:
     {archetype}
@@ -123,7 +166,7 @@ def evolve_bot_genome(config: dict, metrics: dict, current_genome: dict, player_
     }}
     """
 
-    raw_result = _call_ollama(config, prompt, "Bot", current_genome)
+    raw_result = _call_ollama(config, prompt, f"Bot Lvl {level_id}", current_genome, required_key="new_genome")
     ng = raw_result.get("new_genome", current_genome) if isinstance(raw_result, dict) else current_genome
 
     return _apply_genome_bounds(ng, level_id, bounds, "Bot")
@@ -131,7 +174,7 @@ def evolve_bot_genome(config: dict, metrics: dict, current_genome: dict, player_
 # ==========================================
 # (As funções _apply_genome_bounds, evolve_human_genome, evolve_economy mantêm-se inalteradas na base, mas precisas de atualizar o evolve_human_genome para aceitar o player_save e o current_roster também se o usares)
 # ==========================================
-def evolve_human_genome(config: dict, metrics: dict, current_genome: dict) -> dict:
+def evolve_human_genome(config: dict, metrics: dict, current_genome: dict, player_save: dict = None, current_roster: dict = None) -> dict:
     level_id = current_genome.get("level_id", 1)
     bounds = get_progressive_boundaries(level_id)
 
@@ -143,22 +186,9 @@ def evolve_human_genome(config: dict, metrics: dict, current_genome: dict) -> di
     timeouts = my_report.get("timeouts", 0)
 
     # 🚨 PILAR 1: A NOVA CURVA DE WIN-RATE (Aplicada aos Humanos)
-    if level_id <= 3:
-        target_min, target_max = 0.85, 0.95
-        archetype = "The Tutorial: High win rate expected (85-95%). Very easy, few enemies, generous time. DO NOT overcomplicate."
-        acceptable_deaths = 0 # Não queremos o humano a morrer no tutorial!
-    elif level_id <= 6:
-        target_min, target_max = 0.50, 0.60
-        archetype = "The Friction Point: Medium difficulty (50-60%). The player should start sweating and losing some lives."
-        acceptable_deaths = 1
-    elif level_id <= 9:
-        target_min, target_max = 0.20, 0.30
-        archetype = "The Gauntlet: Hard (20-30%). Brutal difficulty. Player is expected to die multiple times and rely on the shop."
-        acceptable_deaths = 3
-    else:
-        target_min, target_max = 0.05, 0.15
-        archetype = "The Final Boss (Level 10): Glorious hell (5-15%). Extremely low win rate, maximum tension."
-        acceptable_deaths = 5
+    target_min, target_max, archetype, acceptable_deaths = get_band_archetype(level_id)
+    if acceptable_deaths == 0:
+        archetype += " DO NOT overcomplicate." # Não queremos o humano a morrer no tutorial!
 
     prompt = f"""
     You are an expert Game Level Designer.
@@ -167,10 +197,14 @@ def evolve_human_genome(config: dict, metrics: dict, current_genome: dict) -> di
     CURRENT LEVEL CONFIGURATION:
     {json.dumps(current_genome, indent=2)}
     
+    MAZE STRUCTURE (static analysis of the current seed and obstacles):
+    {_structure_context(config, current_genome)}
+    
     HUMAN PLAYER METRICS FOR THIS LEVEL:
-    - Actual Win Rate: {win_rate:.2f} (Target is {target_min:.2f} to {target_max:.2f})
+    - Actual Win Rate: {win_rate:.2f} (Target is {target_min:.2f} to {target_max:.2f}{_confidence_context(my_report)})
     - Lives Lost (Enemies/Traps): {lives_lost}
     - Timeouts: {timeouts}
+    (Lives lost and timeouts are totals over {my_report.get('total_rounds', 1)} attempts.)
     
     DESIGN ARCHETYPE FOR LEVEL {level_id}:
     {archetype}
@@ -192,14 +226,123 @@ def evolve_human_genome(config: dict, metrics: dict, current_genome: dict) -> di
     }}
     """
 
-    raw_result = _call_ollama(config, prompt, "Human", current_genome)
+    raw_result = _call_ollama(config, prompt, f"Human Lvl {level_id}", current_genome, required_key="new_genome")
     ng = raw_result.get("new_genome", current_genome) if isinstance(raw_result, dict) else current_genome
 
     return _apply_genome_bounds(ng, level_id, bounds, "Human")
 
+# ==========================================
+# 🚨 MODO CAMPANHA: UM ÚNICO PEDIDO PARA TODOS OS NÍVEIS JOGADOS
+# ==========================================
+def _merge_genome(base: dict, patch: dict) -> dict:
+    """Aplica o genoma devolvido pela IA por cima do atual (rules/obstacles campo a campo)."""
+    merged = copy.deepcopy(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    return merged
+
+def _is_valid_genome(ng) -> bool:
+    """Valida se o genoma da IA tem a estrutura mínima e valores numéricos convertíveis."""
+    if not isinstance(ng, dict) or not isinstance(ng.get("rules", {}), dict) or not isinstance(ng.get("obstacles", {}), dict):
+        return False
+    if not ng.get("rules") and not ng.get("obstacles"):
+        return False
+    try:
+        rules = ng.get("rules", {})
+        for key in ("enemyCount", "trapCount", "targetCount"):
+            int(rules.get(key, 0))
+        for key in ("enemySpeed", "timeLimit"):
+            float(rules.get(key, 0))
+        int(ng.get("obstacles", {}).get("count", 0))
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def evolve_campaign_genomes(config: dict, metrics: dict, campaign: list, player_save: dict, current_roster: dict, is_human: bool = False) -> dict:
+    """
+    Evolui todos os níveis jogados numa única chamada ao LLM.
+    Devolve {level_id: {"report", "new_genome"}}. Os níveis que a resposta omitir ou
+    devolver inválidos são evoluídos individualmente (evolve_bot_genome / evolve_human_genome).
+    """
+    player_type = "Human" if is_human else "Bot"
+    genomes_by_id = {lvl.get("level_id"): lvl for lvl in campaign}
+    reports = [rep for rep in merge_level_reports(metrics.get("level_reports", [])) if rep["level_id"] in genomes_by_id]
+
+    if not reports:
+        return {}
+
+    level_sections = []
+    for rep in reports:
+        level_id = rep["level_id"]
+        bounds = get_progressive_boundaries(level_id)
+        target_min, target_max = get_target_band(level_id)
+        level_sections.append(f"""
+    LEVEL {level_id} :
+    - Actual Win Rate: {rep['win_rate']:.2f} (Target is {target_min:.2f} to {target_max:.2f}{_confidence_context(rep)})
+    - Lives Lost: {rep['lives_lost']} | Timeouts: {rep['timeouts']} | Coins Collected: {rep['collected_coins']} (totals over {rep.get('total_rounds', 1)} attempts)
+    - Maze: {_structure_context(config, genomes_by_id[level_id])}
+    - Bounds: enemyCount {bounds['min_enemies']}-{bounds['max_enemies']}, enemySpeed {bounds['min_speed']}-{bounds['max_speed']}, obstacles.count {bounds['min_obstacles']}-{bounds['max_obstacles']}, trapCount {bounds['min_traps']}-{bounds['max_traps']}, timeLimit {bounds['min_time']}-{bounds['max_time']}, targetCount {bounds['min_coins']}-{bounds['max_coins']}
+    - Current Genome: {json.dumps(genomes_by_id[level_id], separators=(',', ':'))}""")
+
+    player_context = _get_player_context(player_save or {}, current_roster or {})
+
+    prompt = f"""
+    You are an expert Game Level Designer acting as a "Dungeon Master" for a Roguelite game.
+    Your goal is to SURGICALLY evolve EVERY level listed below for a {player_type.upper()} player, as one coherent campaign.
+    
+    {player_context}
+    
+    DIFFICULTY CURVE: Levels 1-3 are the Tutorial, 4-6 the Friction Point, 7-9 the Gauntlet and 10+ the Final Boss.
+    Later levels must never be easier than earlier ones.
+    {"".join(level_sections)}
+    
+    DESIGN RULES:
+    1. If Timeouts > 0, INCREASE "rules.timeLimit".
+    2. RISK VS REWARD: If you increase enemies or traps significantly, you MUST also increase "rules.targetCount" (coins).
+    3. SURGICAL TWEAK: If a level is already inside its target, keep it almost unchanged.
+    4. Respect the bounds of each level.
+    
+    OUTPUT TASK: Return ONLY a strictly valid JSON object with one entry per level_id, structured EXACTLY like this:
+    {{
+        "genomes": {{
+            "<level_id>": {{ ... the updated genome object ... }}
+        }}
+    }}
+    """
+
+    raw_result = _call_ollama(config, prompt, "Campanha", {}, num_ctx=config.get("ollama", {}).get("num_ctx", 8192),
+                              required_key="genomes")
+    answered = raw_result.get("genomes", {}) if isinstance(raw_result, dict) else {}
+    if not isinstance(answered, dict):
+        answered = {}
+
+    results = {}
+    for rep in reports:
+        level_id = rep["level_id"]
+        current_genome = genomes_by_id[level_id]
+        ng = answered.get(str(level_id), answered.get(level_id))
+
+        if _is_valid_genome(ng):
+            results[level_id] = _apply_genome_bounds(_merge_genome(current_genome, ng), level_id, get_progressive_boundaries(level_id), player_type)
+            continue
+
+        # Fallback: o pedido em lote omitiu ou estragou este nível
+        if is_human:
+            results[level_id] = evolve_human_genome(config, metrics, current_genome, player_save, current_roster)
+        else:
+            results[level_id] = evolve_bot_genome(config, metrics, current_genome, player_save, current_roster)
+        results[level_id]["report"] += " (fallback individual)"
+
+    return results
+
 def _apply_genome_bounds(ng: dict, level_id: int, bounds: dict, player_type: str) -> dict:
     ng["level_id"] = level_id
-    ng["seed"] = random.randint(1000, 99999)
+    # A semente fica: quem a troca é o validate_layouts (ou o _finalize_level, sem layout_check)
+    if not isinstance(ng.get("seed"), int):
+        ng["seed"] = random.randint(1000, 99999)
 
     rules = ng.get("rules", {})
     rules["enemyCount"] = max(bounds['min_enemies'], min(bounds['max_enemies'], int(rules.get("enemyCount", 1))))
@@ -215,6 +358,25 @@ def _apply_genome_bounds(ng: dict, level_id: int, bounds: dict, player_type: str
     report_msg = f"Evolução {player_type} Lvl {level_id} concluída. Inimigos: {rules['enemyCount']} | Armadilhas: {rules['trapCount']}"
     return {"report": report_msg, "new_genome": ng}
 
+# Fotografias de preços mostradas ao Diretor de Economia (séries compactas por item)
+ECONOMY_HISTORY_SNAPSHOTS = 5
+
+def _economy_history_prompt(config: dict, item_ids: list) -> str:
+    """Séries de preços recentes e a inflação face à sessão anterior (índices, sem ler o histórico todo)."""
+    db_path = os.path.join(config.get("paths", {}).get("data", "workspace/data"), "evolution.db")
+    series = get_item_series(db_path, item_ids, last=ECONOMY_HISTORY_SNAPSHOTS)
+    series = {item_id: data["prices"] for item_id, data in series.items() if len(data["prices"]) > 1}
+    if not series:
+        return ""
+
+    inflation = get_inflation(db_path)
+    lines = [f"PRICE HISTORY (last {ECONOMY_HISTORY_SNAPSHOTS} snapshots, oldest -> newest):",
+             json.dumps({item_id: [int(p) if float(p).is_integer() else p for p in prices] for item_id, prices in series.items()},
+                        separators=(",", ":"))]
+    if inflation["basket_pct"] is not None:
+        lines.append(f"INFLATION SINCE PREVIOUS SESSION: {inflation['basket_pct']:+.1%} (same items)")
+    return "\n    ".join(lines)
+
 def evolve_economy(config: dict, metrics: dict, player_save: dict, current_roster: dict, safe_room_data: dict) -> dict:
     current_wallet = player_save.get("wallet", {})
     total_coins = current_wallet.get("totalCoins", 0)
@@ -227,6 +389,9 @@ def evolve_economy(config: dict, metrics: dict, player_save: dict, current_roste
     for item in safe_room_data.get("safeRoomItems", []):
         current_prices[item["id"]] = item["cost"]
 
+    # Tendência recente dos preços: evita que a IA suba o mesmo item geração após geração
+    history = _economy_history_prompt(config, list(current_prices))
+
     prompt = f"""
     You are an expert Game Economy Balancing AI.
     
@@ -236,11 +401,14 @@ def evolve_economy(config: dict, metrics: dict, player_save: dict, current_roste
     
     CURRENT SHOP PRICES (ID -> Cost):
     {json.dumps(current_prices, indent=2)}
+
+    {history or "PRICE HISTORY: none yet."}
     
     YOUR GOAL: Prevent hyper-inflation and maintain the challenge.
     1. If the player is hoarding massive amounts of Crystals (e.g. > 500), INCREASE the prices of Vault items (item_life, item_time_boost, etc).
     2. If the player is hoarding Coins (e.g. > 200), INCREASE the prices of Safe Room items (temp_speed_common, temp_trap_rare, etc).
     3. If the player is broke, DECREASE prices slightly to avoid frustration.
+    4. Use the price history: avoid raising the same item again if it already rose in the recent snapshots.
     
     OUTPUT FORMAT: Return ONLY a valid JSON object representing the NEW prices EXACTLY like this:
     {{
@@ -252,7 +420,7 @@ def evolve_economy(config: dict, metrics: dict, player_save: dict, current_roste
     }}
     """
 
-    raw_result = _call_ollama(config, prompt, "Economia", {"updated_prices": current_prices})
+    raw_result = _call_ollama(config, prompt, "Economia", {"updated_prices": current_prices}, required_key="updated_prices")
 
     updated_prices = current_prices
     if isinstance(raw_result, dict) and "updated_prices" in raw_result:
@@ -270,17 +438,31 @@ def evolve_economy(config: dict, metrics: dict, player_save: dict, current_roste
 
     return {"new_roster": current_roster, "new_safe_room": safe_room_data, "report": "Economia ajustada com base na riqueza do jogador."}
 
-def _call_ollama(config: dict, prompt: str, target_audience: str, fallback_data: dict) -> dict:
+def _llm_progress_path(config: dict) -> str:
+    return os.path.join(config.get("paths", {}).get("logs", "workspace/logs"), "llm_progress.json")
+
+def _call_ollama(config: dict, prompt: str, target_audience: str, fallback_data: dict, num_ctx: int = 4096,
+                 required_key: str = None) -> dict:
+    """Pede um JSON ao LLM. Só respostas com JSON (e com o objeto required_key) ficam na cache."""
+    def _usable(resp: dict) -> bool:
+        parsed = extract_first_json_object(resp.get("message", {}).get("content", ""))
+        return parsed is not None and (required_key is None or isinstance(parsed.get(required_key), dict))
+
     messages = [
         {"role": "system", "content": "You are a deterministic AI that outputs ONLY valid JSON. No markdown."},
         {"role": "user", "content": prompt}
     ]
 
-    resp = chat(
+    resp = cached_chat(
         host=config["ollama"]["host"],
         model=config["ollama"]["model"],
         messages=messages,
-        options={"temperature": 0.2, "top_p": 0.9, "num_ctx": 4096}
+        options={"temperature": 0.2, "top_p": 0.9, "num_ctx": num_ctx},
+        cache=get_cache_settings(config),
+        # Streaming: corta a geração assim que o JSON fecha e publica o progresso para o Dashboard
+        stream=config["ollama"].get("stream", True),
+        on_progress=file_progress_callback(_llm_progress_path(config), target_audience),
+        validate=_usable
     )
 
     content = resp["message"]["content"]
@@ -0,0 +1,87 @@
+import os
+from typing import Optional
+
+from shared.metrics import merge_level_reports
+from shared.db.results_store import context_fingerprint, files_fingerprint, genome_fingerprint, lookup_results, record_results
+
+# ==========================================
+# 🚨 MEMORIZAÇÃO DE RESULTADOS DE SIMULAÇÃO
+# ==========================================
+# Um nível cujo genoma (sem a seed, por omissão) já foi jogado com a mesma Build e o mesmo
+# save/roster não precisa de ser simulado outra vez: as amostras novas juntam-se às antigas.
+DEFAULT_MEMO = {"enabled": True, "include_seed": False, "min_rounds": 30, "min_episodes": 32}
+
+HEADLESS_SOURCES = ("headless_sim.py", "gridworld.py")
+
+
+def get_memo_settings(config: dict) -> dict:
+    return {**DEFAULT_MEMO, **config.get("simulation", {}).get("memo", {})}
+
+def build_fingerprint(sim_engine: str, exe_path: Optional[str] = None) -> str:
+    """Hash da Build do Unity (exe + Assembly-CSharp.dll) ou do código do simulador headless."""
+    if sim_engine == "headless" or not exe_path:
+        here = os.path.dirname(os.path.abspath(__file__))
+        return "headless-" + files_fingerprint([os.path.join(here, name) for name in HEADLESS_SOURCES])
+
+    data_dir = os.path.splitext(exe_path)[0] + "_Data"
+    return "unity-" + files_fingerprint([exe_path, os.path.join(data_dir, "Managed", "Assembly-CSharp.dll")])
+
+def memo_keys(config: dict, sim_engine: str, exe_path: Optional[str], player_save: dict, roster: dict) -> dict:
+    return {"build_hash": build_fingerprint(sim_engine, exe_path), "context_hash": context_fingerprint(player_save, roster),
+            "include_seed": bool(get_memo_settings(config)["include_seed"])}
+
+def cached_reports(db_path: str, campaign: list, keys: dict) -> dict:
+    """{level_id: LevelReport acumulado} para os níveis da campanha com resultados memorizados."""
+    fingerprints = {genome_fingerprint(level, keys["include_seed"]): level.get("level_id") for level in campaign}
+    found = lookup_results(db_path, list(fingerprints), keys["build_hash"], keys["context_hash"])
+    return {fingerprints[fp]: rep for fp, rep in found.items()}
+
+def plan_headless_episodes(cached: dict, campaign: list, episodes: int, min_episodes: int) -> dict:
+    """Episódios em falta por nível: 0 salta o nível, senão só o que falta (com um mínimo por lote)."""
+    plan = {}
+    for level in campaign:
+        level_id = level.get("level_id")
+        missing = episodes - int(cached.get(level_id, {}).get("total_rounds", 0))
+        plan[level_id] = 0 if missing <= 0 else min(episodes, max(min_episodes, missing))
+    return plan
+
+def record_reports(db_path: str, campaign: list, reports: list, keys: dict) -> list:
+    """Guarda os relatórios novos (agregados por nível) e devolve-os; usado também pelo escalonador."""
+    genomes_by_id = {level.get("level_id"): level for level in campaign}
+    played = [rep for rep in merge_level_reports(reports) if rep["level_id"] in genomes_by_id]
+
+    rows = [(genome_fingerprint(genomes_by_id[rep["level_id"]], keys["include_seed"]), rep) for rep in played]
+    record_results(db_path, rows, keys["build_hash"], keys["context_hash"])
+    return played
+
+def record_and_merge(db_path: str, campaign: list, metrics: dict, keys: dict, cached_only: Optional[dict] = None) -> dict:
+    """
+    Junta os relatórios desta run às estatísticas memorizadas e devolve as métricas com os
+    relatórios acumulados. Os níveis saltados (cached_only) entram com o resultado memorizado.
+    """
+    genomes_by_id = {level.get("level_id"): level for level in campaign}
+    played = record_reports(db_path, campaign, metrics.get("level_reports", []), keys)
+
+    running = cached_reports(db_path, [genomes_by_id[rep["level_id"]] for rep in played], keys)
+    reports = {rep["level_id"]: running.get(rep["level_id"], rep) for rep in played}
+    for level_id, rep in (cached_only or {}).items():
+        reports.setdefault(level_id, rep)
+
+    merged = dict(metrics)
+    merged["level_reports"] = [reports[k] for k in sorted(reports)]
+    # Os relatórios são totais acumulados do genoma, não a run desta geração (population.py não os volta a somar)
+    merged["memo_totals"] = True
+    return merged
+
+def metrics_from_cache(cached: dict) -> dict:
+    """metrics.json equivalente quando todos os níveis já têm amostras suficientes (sem correr o Unity)."""
+    reports = [cached[k] for k in sorted(cached)]
+    return {
+        # Tal como no headless: sem uma run real não há candidatura ao Hall of Fame
+        "campaign_completed": False,
+        "bottleneck_level": min(reports, key=lambda rep: rep["win_rate"])["level_id"] if reports else 0,
+        "is_human": False,
+        "engine": "memo",
+        "memo_totals": True,
+        "level_reports": reports,
+    }
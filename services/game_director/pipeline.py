@@ -0,0 +1,130 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+
+from rich import print
+
+from shared.metrics import merge_level_reports
+from shared.db.results_store import genome_fingerprint, record_results
+from services.game_director.memo import get_memo_settings, memo_keys
+from services.game_director.scheduler import get_scheduler_settings
+
+# ==========================================
+# 🚨 RUNNER EM PIPELINE: A PRÓXIMA SIMULAÇÃO SOBREPÕE-SE À ANÁLISE ATUAL
+# ==========================================
+# Enquanto o LLM ainda analisa os outros níveis e a economia, cada nível cuja evolução já foi
+# decidida (genoma final, com seed) é simulado em segundo plano. Os resultados entram na tabela
+# sim_results (memorização) e a geração seguinte já os encontra e salta essas rondas.
+#
+# Regras de ordem (os JSONs da pasta Builds nunca são lidos a meio de uma escrita):
+#   1. Os jobs de pré-simulação só recebem cópias em memória (genoma, save, roster); nunca abrem os
+#      JSONs da Builds. No Unity correm nas pastas _pool/prefetch_* (nunca nas eval_* da geração atual).
+#   2. Só o orchestrator escreve os JSONs da Builds, no fim da análise, e sempre de forma atómica
+#      (ficheiro temporário + os.replace).
+#   3. A fase de simulação da geração seguinte só começa depois de wait_idle(): a fila de
+#      pré-simulação está vazia e as pastas do pool estão livres (depois do drain_timeout os jobs
+#      na fila são cancelados, mas os que já correm são sempre esperados até ao fim).
+#   4. Um nível só é submetido depois de finalizado (blindagem + seed): o que é simulado é exatamente
+#      o genoma que vai ser gravado. Se a economia mudar o roster, o contexto (save/roster) muda de hash
+#      e os resultados pré-simulados simplesmente não são reutilizados.
+DEFAULT_PIPELINE = {"enabled": False, "unity_evaluations": 4, "drain_timeout": 900}
+
+
+def get_pipeline_settings(config: dict) -> dict:
+    return {**DEFAULT_PIPELINE, **config.get("run", {}).get("pipeline", {})}
+
+
+class GenerationPipeline:
+    """Vive no runner.py entre gerações; o orchestrator chama begin(), submit() e wait_idle()."""
+
+    def __init__(self, config: dict):
+        self.settings = get_pipeline_settings(config)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.futures = []
+        self.context = None
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rounds": 0, "busy_seconds": 0.0}
+
+    def begin(self, config: dict, sim_engine: str, exe_path: Optional[str], db_path: str,
+              player_save: dict, roster: dict):
+        """Fixa o contexto da próxima simulação (cópias, para não depender dos JSONs da Builds)."""
+        if not get_memo_settings(config)["enabled"]:
+            print("[yellow]⚠️ Pipeline: a memorização (simulation.memo) está desligada; sem pré-simulação.[/yellow]")
+            self.context = None
+            return
+
+        player_save, roster = copy.deepcopy(player_save or {}), copy.deepcopy(roster or {})
+        # Headless: as mesmas rondas que a run principal da geração seguinte pediria
+        rounds = int(config.get("simulation", {}).get("headless_episodes", 64))
+        if get_scheduler_settings(config)["enabled"]:
+            rounds = min(rounds, int(get_scheduler_settings(config)["initial_rounds"]))
+
+        self.context = {"config": config, "db_path": db_path, "keys": memo_keys(config, sim_engine, exe_path, player_save, roster),
+                        "evaluate": self._make_evaluator(config, sim_engine, exe_path, player_save, roster, rounds)}
+
+    def _make_evaluator(self, config: dict, sim_engine: str, exe_path: Optional[str], player_save: dict, roster: dict,
+                        rounds: int):
+        from services.game_director.evaluators import make_headless_evaluator, make_unity_evaluator
+        from shared.log_sink import log_sink_settings
+        from shared.telemetry import telemetry_settings
+        from shared.watchdog import watchdog_settings
+
+        if sim_engine == "headless" or not exe_path:
+            evaluate = make_headless_evaluator(player_save, roster, episodes=rounds, workers=1)
+            return lambda genome: [evaluate([genome])[0]]
+
+        log = {**log_sink_settings(config), "console": "quiet"}
+        evaluate = make_unity_evaluator(exe_path, ["-botMode", "-batchmode", "-nographics"],
+                                        workers=max(1, int(config.get("simulation", {}).get("workers", 1))),
+                                        log_dir=config.get("paths", {}).get("logs", "workspace/logs"),
+                                        telemetry=telemetry_settings(config), watchdog=watchdog_settings(config),
+                                        log=log, slot_prefix="prefetch")
+        evaluations = max(1, int(self.settings["unity_evaluations"]))
+        return lambda genome: evaluate([genome] * evaluations)
+
+    def submit(self, genome: dict):
+        """Regra 4: recebe o genoma já finalizado (o que vai ser gravado na campanha)."""
+        if self.context is None or not genome:
+            return
+        self.stats["submitted"] += 1
+        self.futures.append(self.executor.submit(self._run, self.context, copy.deepcopy(genome)))
+
+    def _run(self, context: dict, genome: dict):
+        started = time.monotonic()
+        try:
+            reports = merge_level_reports([rep for rep in context["evaluate"](genome) if rep])
+            keys = context["keys"]
+            fingerprint = genome_fingerprint(genome, keys["include_seed"])
+            record_results(context["db_path"], [(fingerprint, rep) for rep in reports], keys["build_hash"], keys["context_hash"])
+            self.stats["done"] += 1
+            self.stats["rounds"] += sum(int(rep.get("total_rounds", 0)) for rep in reports)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[yellow]⚠️ Pipeline: pré-simulação do Nível {genome.get('level_id')} falhou: {e}[/yellow]")
+        finally:
+            self.stats["busy_seconds"] += time.monotonic() - started
+
+    def wait_idle(self):
+        """Regra 3: barreira antes da fase de simulação da geração seguinte."""
+        pending = [f for f in self.futures if not f.done()]
+        if pending:
+            print(f"[dim]⏳ Pipeline: à espera de {len(pending)} pré-simulações antes de simular...[/dim]")
+            _, not_done = wait(pending, timeout=float(self.settings["drain_timeout"]))
+            if not_done:
+                # cancel() só tira da fila os jobs que ainda não arrancaram; um job em curso (Unity a correr
+                # nas pastas _pool/prefetch_*) não pára, por isso a barreira espera por ele (o watchdog limita-o)
+                cancelled = sum(1 for future in not_done if future.cancel())
+                running = [future for future in not_done if not future.cancelled()]
+                self.stats["cancelled"] += cancelled
+                print(f"[yellow]⚠️ Pipeline: {len(not_done)} pré-simulações não acabaram em {self.settings['drain_timeout']}s: "
+                      f"{cancelled} ainda na fila canceladas, à espera de {len(running)} em curso...[/yellow]")
+                wait(running)
+        self.futures = [f for f in self.futures if not f.done()]
+        if self.stats["submitted"]:
+            cancelled = f", {self.stats['cancelled']} canceladas" if self.stats["cancelled"] else ""
+            print(f"[dim]🔀 Pipeline: {self.stats['done']}/{self.stats['submitted']} níveis pré-simulados "
+                  f"({self.stats['rounds']} rondas, {self.stats['busy_seconds']:.1f}s em paralelo com a análise{cancelled}).[/dim]")
+
+    def close(self):
+        self.wait_idle()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,178 @@
+import copy
+import os
+import random
+from typing import Optional
+
+from rich import print
+
+from shared.metrics import merge_level_reports
+from shared.db.population_store import load_population, save_population
+from services.game_director.logic import get_progressive_boundaries, get_target_band, _apply_genome_bounds
+from services.game_director.controller import KNOBS, _knob_position, _set_knob
+from services.game_director.surrogate import get_surrogate_settings, load_surrogate, screen_genome
+from services.game_director.gridworld import check_layout, layout_cache_dir
+
+# ==========================================
+# 🚨 PROCURA POPULACIONAL DE GENOMAS POR NÍVEL
+# ==========================================
+DEFAULT_POPULATION = {"population_size": 6, "evaluations_per_generation": 8, "mutation": 0.12, "seed_mutation": 0.2}
+
+
+def band_distance(win_rate: float, level_id: int) -> float:
+    """Fitness (menor é melhor): distância à banda alvo, com desempate pela distância ao centro da banda."""
+    target_min, target_max = get_target_band(level_id)
+    outside = max(0.0, target_min - win_rate, win_rate - target_max)
+    return round(outside + 0.1 * abs(win_rate - (target_min + target_max) / 2), 5)
+
+def _genome_key(genome: dict) -> str:
+    values = [str(genome.get(KNOBS[k][0], {}).get(KNOBS[k][1])) for k in KNOBS]
+    return "|".join(values + [str(genome.get("rules", {}).get("targetCount")), str(genome.get("seed"))])
+
+def _member_report(member: dict, level_id: int) -> dict:
+    """Relatório agregado do membro. Membros antigos (só média e contagem) contam uma ronda por avaliação."""
+    if member.get("report"):
+        return member["report"]
+    evaluations = int(member.get("evaluations", 1))
+    return {"level_id": level_id, "total_rounds": evaluations,
+            "wins": int(round(float(member.get("win_rate", 0.0)) * evaluations))}
+
+def _add_observation(members: list, genome: dict, report: dict, level_id: int):
+    """
+    Junta uma avaliação à população. Genomas repetidos acumulam os relatórios com o merge_level_reports,
+    por isso o win rate (e a fitness) fica ponderado pelas rondas de cada avaliação.
+    """
+    key = _genome_key(genome)
+    report = {**report, "level_id": level_id}
+
+    member = next((m for m in members if m["key"] == key), None)
+    if member is None:
+        member = {"key": key, "genome": copy.deepcopy(genome), "evaluations": 0}
+        members.append(member)
+    else:
+        report = merge_level_reports([_member_report(member, level_id), report])[0]
+
+    _score(member, report, level_id)
+
+def _score(member: dict, report: dict, level_id: int):
+    member["report"] = report
+    member["evaluations"] += 1
+    member["win_rate"] = round(float(report.get("win_rate", 0.0)), 4)
+    member["fitness"] = band_distance(member["win_rate"], level_id)
+
+def _set_total(members: list, genome: dict, report: dict, level_id: int):
+    """
+    Com a memorização o relatório da run principal já é o total acumulado do genoma: substitui o do membro
+    em vez de se somar. Só conta como avaliação nova se trouxer mais rondas do que as que o membro já tem
+    (um nível servido só pela cache não acrescenta nada).
+    """
+    member = next((m for m in members if m["key"] == _genome_key(genome)), None)
+    if member is None:
+        return _add_observation(members, genome, report, level_id)
+    if int(report.get("total_rounds", 0)) <= int(_member_report(member, level_id).get("total_rounds", 0)):
+        return
+
+    _score(member, {**report, "level_id": level_id}, level_id)
+
+def _tournament(members: list, rng: random.Random) -> dict:
+    a, b = rng.choice(members), rng.choice(members)
+    return a if a["fitness"] <= b["fitness"] else b
+
+def make_offspring(members: list, level_id: int, count: int, rng: random.Random, mutation: float, seed_mutation: float,
+                   screen=None, max_attempts: int = 4) -> list:
+    """
+    Recombinação uniforme dos knobs de dois pais (torneio) + mutação gaussiana, sempre dentro dos bounds.
+    screen(genome) -> bool opcional (surrogate): os filhos rejeitados são substituídos, até max_attempts × count tentativas.
+    """
+    bounds = get_progressive_boundaries(level_id)
+    children, rejected = [], []
+
+    for _ in range(count * (max_attempts if screen else 1)):
+        if len(children) >= count:
+            break
+        parent_a, parent_b = _tournament(members, rng)["genome"], _tournament(members, rng)["genome"]
+        child = copy.deepcopy(parent_a)
+
+        for knob in KNOBS:
+            source = parent_a if rng.random() < 0.5 else parent_b
+            position = _knob_position(source, knob, bounds) + rng.gauss(0.0, mutation)
+            _set_knob(child, knob, bounds, position)
+
+        if rng.random() < seed_mutation:
+            child["seed"] = rng.randint(1000, 99999)
+
+        if screen and not screen(child):
+            rejected.append(child)
+            continue
+        children.append(child)
+
+    # Se o surrogate rejeitou quase tudo, completa com os rejeitados (a simulação tem a última palavra)
+    return children + rejected[:count - len(children)]
+
+def run_population_search(config: dict, metrics: dict, campaign: list, evaluator, is_human: bool = False,
+                          rng: Optional[random.Random] = None, agent_speed: float = 5.0) -> dict:
+    """
+    Uma geração da procura populacional para todos os níveis jogados:
+    gera evaluations_per_generation filhos por nível, avalia-os todos num só lote (em paralelo no avaliador),
+    seleciona os melhores pela distância à banda alvo e devolve o melhor genoma de cada nível.
+    """
+    search_config = {**DEFAULT_POPULATION, **config.get("director", {}).get("population", {})}
+    db_path = os.path.join(config["paths"]["data"], "evolution.db")
+    player_type = "Human" if is_human else "Bot"
+    rng = rng or random.Random()
+
+    genomes_by_id = {lvl.get("level_id"): lvl for lvl in campaign}
+    reports = [rep for rep in merge_level_reports(metrics.get("level_reports", [])) if rep["level_id"] in genomes_by_id]
+
+    screens = []
+    if config.get("director", {}).get("layout_check", True):
+        cache_dir = layout_cache_dir(config)
+        screens.append(lambda genome: check_layout(genome, cache_dir=cache_dir)["ok"])
+    if get_surrogate_settings(config).get("enabled", True):
+        surrogate_state = load_surrogate(config)
+        screens.append(lambda genome: screen_genome(config, genome, is_human, agent_speed, surrogate_state)["ok"])
+    screen = (lambda genome: all(check(genome) for check in screens)) if screens else None
+
+    populations, candidates = {}, []
+    for rep in reports:
+        level_id = rep["level_id"]
+        members = load_population(db_path, level_id, is_human)
+        # A simulação principal desta geração conta como uma avaliação do genoma atual
+        if metrics.get("memo_totals"):
+            _set_total(members, genomes_by_id[level_id], rep, level_id)
+        else:
+            _add_observation(members, genomes_by_id[level_id], rep, level_id)
+        populations[level_id] = members
+
+        children = make_offspring(members, level_id, int(search_config["evaluations_per_generation"]), rng,
+                                  float(search_config["mutation"]), float(search_config["seed_mutation"]), screen)
+        candidates.extend((level_id, child) for child in children)
+
+    print(f"[magenta]🧬 Procura populacional: {len(candidates)} candidatos para {len(populations)} níveis...[/magenta]")
+    evaluated = evaluator([child for _, child in candidates]) if candidates else []
+
+    failed = 0
+    for (level_id, child), report in zip(candidates, evaluated):
+        if report is None:
+            failed += 1
+            continue
+        _add_observation(populations[level_id], child, report, level_id)
+
+    if failed:
+        print(f"[yellow]⚠️ {failed} avaliações falharam e foram ignoradas.[/yellow]")
+
+    results = {}
+    for level_id, members in populations.items():
+        # Seleção: ordena pela fitness (mais amostras desempatam) e mantém os melhores
+        members.sort(key=lambda m: (m["fitness"], -m["evaluations"]))
+        del members[int(search_config["population_size"]):]
+        save_population(db_path, level_id, members, is_human)
+
+        best = members[0]
+        result = _apply_genome_bounds(copy.deepcopy(best["genome"]), level_id, get_progressive_boundaries(level_id), player_type)
+        # O genoma foi avaliado com esta seed: não se sorteia outra
+        result["reseed"] = False
+        result["report"] = (f"População Lvl {level_id}: melhor win rate {best['win_rate']:.2f} "
+                            f"({best['evaluations']} avaliações, distância {best['fitness']:.3f}). | " + result["report"])
+        results[level_id] = result
+
+    return results
@@ -0,0 +1,124 @@
+import math
+from typing import Callable, Dict, List, Optional
+
+from rich import print
+
+from shared.metrics import merge_level_reports
+from services.game_director.logic import get_target_band
+
+# ==========================================
+# 🚨 ESCALONADOR SEQUENCIAL DE RONDAS (INTERVALO DE WILSON)
+# ==========================================
+# Um nível só recebe mais rondas enquanto o intervalo de confiança do win rate cruzar uma das
+# margens da banda alvo. Os níveis decididos (claramente dentro, acima ou abaixo) deixam de gastar
+# simulação; os indecisos recebem lotes que crescem com as rondas que faltam para decidir.
+DEFAULT_SCHEDULER = {"enabled": False, "z": 1.96, "initial_rounds": 32, "batch_rounds": 32,
+                     "budget_rounds": 512, "max_rounds_per_level": 512}
+
+# simulate_batch({level_id: rondas}) -> lista de LevelReports com as rondas novas
+BatchSimulator = Callable[[Dict[int, int]], List[dict]]
+
+
+def get_scheduler_settings(config: dict) -> dict:
+    return {**DEFAULT_SCHEDULER, **config.get("simulation", {}).get("scheduler", {})}
+
+def wilson_interval(wins: int, rounds: int, z: float = 1.96) -> tuple:
+    if rounds <= 0:
+        return 0.0, 1.0
+    p = wins / rounds
+    denom = 1 + z * z / rounds
+    centre = (p + z * z / (2 * rounds)) / denom
+    half = z * math.sqrt(p * (1 - p) / rounds + z * z / (4 * rounds * rounds)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def band_decision(wins: int, rounds: int, level_id: int, z: float = 1.96) -> str:
+    """"inside", "above" (demasiado fácil), "below" (demasiado difícil) ou "undecided"."""
+    target_min, target_max = get_target_band(level_id)
+    low, high = wilson_interval(wins, rounds, z)
+    if low >= target_min and high <= target_max:
+        return "inside"
+    if low > target_max:
+        return "above"
+    if high < target_min:
+        return "below"
+    return "undecided"
+
+def rounds_to_decide(wins: int, rounds: int, level_id: int, z: float = 1.96) -> int:
+    """Rondas totais para a meia-largura do intervalo ficar abaixo da distância à margem mais próxima."""
+    target_min, target_max = get_target_band(level_id)
+    p = min(0.99, max(0.01, wins / rounds if rounds else 0.5))
+    if target_min <= p <= target_max:
+        # Dentro da banda: o intervalo inteiro tem de caber entre as duas margens
+        margin = min(p - target_min, target_max - p)
+    else:
+        margin = min(abs(p - target_min), abs(p - target_max))
+    margin = max(margin, 0.005)
+    return int(math.ceil(z * z * p * (1 - p) / (margin * margin)))
+
+def annotate_reports(reports: List[dict], z: float = 1.96) -> List[dict]:
+    """Acrescenta o intervalo de confiança e a decisão a cada LevelReport (lidos pelo Director)."""
+    for rep in reports:
+        rounds = int(rep.get("total_rounds", 0))
+        wins = int(rep.get("wins", 0))
+        low, high = wilson_interval(wins, rounds, z)
+        rep["win_rate_ci"] = [round(low, 4), round(high, 4)]
+        rep["band_decision"] = band_decision(wins, rounds, rep["level_id"], z)
+    return reports
+
+def run_sequential_schedule(config: dict, metrics: dict, simulate_batch: BatchSimulator,
+                            on_batch: Optional[Callable[[List[dict]], None]] = None) -> dict:
+    """
+    Parte das métricas já simuladas e pede lotes de rondas só para os níveis indecisos,
+    até todos estarem decididos ou o orçamento da geração (budget_rounds) acabar.
+    on_batch(relatórios novos) permite guardar as amostras (ex.: memorização de resultados).
+    """
+    settings = get_scheduler_settings(config)
+    z = float(settings["z"])
+    budget = int(settings["budget_rounds"])
+    max_per_level = int(settings["max_rounds_per_level"])
+
+    reports = {rep["level_id"]: rep for rep in merge_level_reports(metrics.get("level_reports", []))}
+    spent = 0
+
+    while budget - spent > 0:
+        plan = {}
+        for level_id, rep in reports.items():
+            rounds, wins = int(rep["total_rounds"]), int(rep["wins"])
+            if band_decision(wins, rounds, level_id, z) != "undecided" or rounds >= max_per_level:
+                continue
+            # Passos de grupo: no máximo duplica a amostra de cada vez (a estimativa de "needed" é grosseira)
+            needed = rounds_to_decide(wins, rounds, level_id, z) - rounds
+            plan[level_id] = min(max(int(settings["batch_rounds"]), min(needed, rounds)), max_per_level - rounds)
+
+        if not plan:
+            break
+
+        # Se o orçamento não chega para todos, os níveis mais perto de decidir têm prioridade
+        remaining = budget - spent
+        for level_id in sorted(plan, key=plan.get):
+            plan[level_id] = min(plan[level_id], remaining)
+            remaining -= plan[level_id]
+        plan = {k: v for k, v in plan.items() if v > 0}
+        if not plan:
+            break
+
+        print(f"[dim]🎯 Escalonador: mais rondas para {dict(sorted(plan.items()))} (orçamento {spent}/{budget}).[/dim]")
+        new_reports = [rep for rep in simulate_batch(plan) if rep and rep.get("level_id") in reports]
+        if not new_reports:
+            break
+        if on_batch:
+            on_batch(new_reports)
+
+        batch_rounds = sum(int(rep.get("total_rounds", 0)) for rep in new_reports)
+        spent += max(batch_rounds, 1)
+        touched = {rep["level_id"] for rep in new_reports}
+        for rep in merge_level_reports([reports[level_id] for level_id in touched] + new_reports):
+            reports[rep["level_id"]] = rep
+
+    merged = dict(metrics)
+    merged["level_reports"] = annotate_reports([reports[k] for k in sorted(reports)], z)
+    merged["scheduler_rounds"] = spent
+
+    undecided = [rep["level_id"] for rep in merged["level_reports"] if rep["band_decision"] == "undecided"]
+    print(f"[dim]🎯 Escalonador: {spent} rondas extra; níveis indecisos: {undecided or 'nenhum'}.[/dim]")
+    return merged
@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from services.game_director.logic import get_target_band
+from shared.db.connection import reading
+from shared.db.evolution_logger import selected_class_speed
+
+# ==========================================
+# 🚨 SURROGATE: PREVISÃO DO WIN RATE A PARTIR DO GENOMA
+# ==========================================
+# Ridge bayesiana incremental (estatísticas suficientes XᵀX / Xᵀy), com escalas fixas
+# para poder juntar linhas novas sem re-normalizar. A incerteza vem da variância preditiva.
+FEATURES = ["bias", "level", "level²", "enemies", "enemy_speed", "speed_ratio", "obstacles", "traps",
+            "time_limit", "coins", "enemies×speed", "enemies×obstacles"]
+TARGETS = ["win_rate", "lives_lost", "timeouts"]
+
+DEFAULT_SURROGATE = {"enabled": True, "min_samples": 30, "z": 2.0, "ridge_lambda": 1.0, "filename": "surrogate.json"}
+
+# Valores usados quando as linhas antigas da BD não têm time_limit/target_count
+DEFAULT_TIME_LIMIT = 120.0
+DEFAULT_TARGET_COUNT = 4
+
+
+def feature_vector(level_id: int, enemy_count: float, enemy_speed: float, agent_speed: float, obstacles: float,
+                   traps: float, time_limit: Optional[float], target_count: Optional[float]) -> np.ndarray:
+    lvl = level_id / 10.0
+    enemies = enemy_count / 10.0
+    obst = obstacles / 100.0
+    time_limit = time_limit or DEFAULT_TIME_LIMIT
+    target_count = target_count or DEFAULT_TARGET_COUNT
+
+    return np.array([
+        1.0, lvl, lvl * lvl, enemies, enemy_speed / 5.0, enemy_speed / max(agent_speed, 0.1), obst, traps / 10.0,
+        time_limit / 100.0, target_count / 10.0, enemies * enemy_speed / 5.0, enemies * obst,
+    ], dtype=np.float64)
+
+def genome_features(genome: dict, agent_speed: float = 5.0) -> np.ndarray:
+    rules = genome.get("rules", {})
+    return feature_vector(int(genome.get("level_id", 1)), float(rules.get("enemyCount", 0)), float(rules.get("enemySpeed", 0.0)),
+                          agent_speed, float(genome.get("obstacles", {}).get("count", 0)), float(rules.get("trapCount", 0)),
+                          rules.get("timeLimit"), rules.get("targetCount"))
+
+def _regularizer(ridge_lambda: float) -> np.ndarray:
+    reg = np.eye(len(FEATURES)) * ridge_lambda
+    reg[0, 0] = 1e-6  # o bias não é regularizado
+    return reg
+
+def _empty_model(ridge_lambda: float) -> dict:
+    p = len(FEATURES)
+    return {"n": 0, "A": _regularizer(ridge_lambda).tolist(), "B": np.zeros((p, len(TARGETS))).tolist(), "yy": [0.0] * len(TARGETS),
+            "lambda": ridge_lambda, "W": np.zeros((p, len(TARGETS))).tolist(), "sigma2": [1.0] * len(TARGETS)}
+
+def _solve(model: dict):
+    A, B = np.array(model["A"]), np.array(model["B"])
+    W = np.linalg.solve(A, B)
+    # RSS exato: yᵀy − 2wᵀb + wᵀ(XᵀX)w, com XᵀX = A − λI
+    XtX = A - _regularizer(model["lambda"])
+    p = A.shape[0]
+    sigma2 = []
+    for t in range(len(TARGETS)):
+        w = W[:, t]
+        rss = model["yy"][t] - 2 * w @ B[:, t] + w @ XtX @ w
+        sigma2.append(float(max(rss, 1e-6) / max(model["n"] - p, 1)))
+    model["W"], model["sigma2"] = W.tolist(), sigma2
+
+def _rows_to_pairs(rows: list, last_params: dict) -> list:
+    """
+    Cada linha da tabela evolution guarda as métricas do genoma JOGADO e os parâmetros do genoma NOVO.
+    O par de treino é (parâmetros da linha anterior do mesmo nível, métricas da linha atual).
+    """
+    pairs = []
+    for row in rows:
+        (row_id, level_id, is_human, win_rate, lives_lost, timeouts, enemy_count, enemy_speed,
+         agent_speed, obstacles, traps, time_limit, target_count) = row
+        key = f"{'human' if is_human else 'bot'}:{level_id}"
+
+        played = last_params.get(key)
+        if played is not None:
+            pairs.append((bool(is_human), feature_vector(level_id, *played), [win_rate or 0.0, lives_lost or 0, timeouts or 0]))
+
+        last_params[key] = [enemy_count or 0, enemy_speed or 0.0, agent_speed or 5.0, obstacles or 0, traps or 0, time_limit, target_count]
+    return pairs
+
+def update_surrogate(db_path: str, state: dict, ridge_lambda: float = 1.0) -> dict:
+    """Treino incremental: só lê as linhas com id > last_id e atualiza as estatísticas suficientes."""
+    state = state or {}
+    state.setdefault("last_id", 0)
+    state.setdefault("last_params", {})
+    models = state.setdefault("models", {})
+
+    if not os.path.exists(db_path):
+        return state
+
+    with reading(db_path) as cursor:
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(evolution)").fetchall()}
+        extra = "time_limit, target_count" if "time_limit" in columns else "NULL, NULL"
+        rows = cursor.execute(f'''
+            SELECT id, level_id, is_human, win_rate, lives_lost, timeouts, enemy_count, enemy_speed,
+                   agent_speed, obstacles_count, traps_spawned, {extra}
+            FROM evolution WHERE id > ? ORDER BY id ASC
+        ''', (state["last_id"],)).fetchall()
+
+    if not rows:
+        return state
+
+    touched = set()
+    for is_human, x, y in _rows_to_pairs(rows, state["last_params"]):
+        name = "human" if is_human else "bot"
+        model = models.setdefault(name, _empty_model(ridge_lambda))
+        A, B = np.array(model["A"]), np.array(model["B"])
+        A += np.outer(x, x)
+        B += np.outer(x, y)
+        model["A"], model["B"] = A.tolist(), B.tolist()
+        model["yy"] = [yy + v * v for yy, v in zip(model["yy"], y)]
+        model["n"] += 1
+        touched.add(name)
+
+    for name in touched:
+        _solve(models[name])
+
+    state["last_id"] = rows[-1][0]
+    return state
+
+def predict(state: dict, x: np.ndarray, is_human: bool = False) -> Optional[dict]:
+    """Previsão (média e desvio padrão) para cada alvo. None se ainda não houver modelo treinado."""
+    model = (state or {}).get("models", {}).get("human" if is_human else "bot")
+    if not model or model["n"] == 0:
+        return None
+
+    W = np.array(model["W"])
+    A_inv_x = np.linalg.solve(np.array(model["A"]), x)
+    leverage = float(x @ A_inv_x)
+
+    result = {"samples": model["n"]}
+    for t, target in enumerate(TARGETS):
+        mean = float(x @ W[:, t])
+        std = float(np.sqrt(model["sigma2"][t] * (1.0 + leverage)))
+        if target == "win_rate":
+            mean = min(1.0, max(0.0, mean))
+        else:
+            mean = max(0.0, mean)
+        result[target] = {"mean": round(mean, 4), "std": round(std, 4)}
+    return result
+
+# ==========================================
+# CARREGAMENTO (cache por mtime da BD) E PRE-SCREENING
+# ==========================================
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_surrogate_settings(config: dict) -> dict:
+    return {**DEFAULT_SURROGATE, **config.get("director", {}).get("surrogate", {})}
+
+def load_surrogate(config: dict) -> dict:
+    """Carrega o modelo do disco e atualiza-o com as linhas novas da BD (só quando o evolution.db mudou)."""
+    settings = get_surrogate_settings(config)
+    data_dir = config.get("paths", {}).get("data", "workspace/data")
+    db_path = os.path.join(data_dir, "evolution.db")
+    model_path = os.path.join(data_dir, settings["filename"])
+    db_mtime = os.path.getmtime(db_path) if os.path.exists(db_path) else 0.0
+
+    with _CACHE_LOCK:
+        cached = _CACHE.get(model_path)
+        if cached and cached[0] == db_mtime:
+            return cached[1]
+
+        state = {}
+        if os.path.exists(model_path):
+            with open(model_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+        last_id = state.get("last_id", 0)
+        state = update_surrogate(db_path, state, float(settings["ridge_lambda"]))
+
+        if state.get("last_id", 0) != last_id:
+            os.makedirs(data_dir, exist_ok=True)
+            with open(model_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+
+        _CACHE[model_path] = (db_mtime, state)
+        return state
+
+def roster_agent_speed(current_roster: dict, player_save: Optional[dict] = None) -> float:
+    """Mesma velocidade do agente que o log_evolution_to_db grava (para as features baterem certo)."""
+    return selected_class_speed(current_roster, player_save)
+
+def predict_genome(config: dict, genome: dict, is_human: bool = False, agent_speed: float = 5.0) -> Optional[dict]:
+    return predict(load_surrogate(config), genome_features(genome, agent_speed), is_human)
+
+def screen_genome(config: dict, genome: dict, is_human: bool = False, agent_speed: float = 5.0, state: dict = None) -> dict:
+    """
+    Rejeita genomas que o surrogate prevê, com confiança (z desvios padrão), fora da banda alvo.
+    Com poucas amostras (< min_samples) aceita sempre.
+    """
+    settings = get_surrogate_settings(config)
+    state = state if state is not None else load_surrogate(config)
+    prediction = predict(state, genome_features(genome, agent_speed), is_human)
+
+    if prediction is None or prediction["samples"] < int(settings["min_samples"]):
+        return {"ok": True, "prediction": prediction, "reason": "surrogate sem amostras suficientes"}
+
+    target_min, target_max = get_target_band(int(genome.get("level_id", 1)))
+    mean, std = prediction["win_rate"]["mean"], prediction["win_rate"]["std"]
+    margin = float(settings["z"]) * std
+
+    if mean - margin > target_max:
+        return {"ok": False, "prediction": prediction, "reason": f"demasiado fácil (previsto {mean:.2f} ± {std:.2f})"}
+    if mean + margin < target_min:
+        return {"ok": False, "prediction": prediction, "reason": f"demasiado difícil (previsto {mean:.2f} ± {std:.2f})"}
+    return {"ok": True, "prediction": prediction, "reason": "dentro do intervalo plausível"}
@@ -1,28 +1,45 @@
 import json
 import os
+import yaml
 from shared.ollama_client import chat
-from shared.db.evolution_logger import get_all_metrics_for_api
+from shared.db.metrics_query import iter_metrics
+from shared.db.rollups import get_level_stats
 
 # Sobe dois níveis para chegar à raiz do projeto e entrar em 'memory'
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 MARKETING_FILE = os.path.join(BASE_DIR, "memory", "marketing_plan.json")
+CONFIG_PATH = os.path.join(BASE_DIR, "config.yaml")
+POST_OPTIONS = {"temperature": 0.7}
 
-def generate_weekly_marketing_plan(db_path, theme):
+def _load_config() -> dict:
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    return {}
+
+def generate_weekly_marketing_plan(db_path, theme, config=None):
     """Consulta a BD e gera 7 posts baseados na performance real."""
-    df = get_all_metrics_for_api(db_path)
-    last_runs = df.head(3).to_dict(orient='records') if not df.empty else "Sem dados"
+    config = config if config is not None else _load_config()
+    # Só as 3 runs mais recentes e as colunas que interessam ao prompt
+    last_runs = list(iter_metrics(db_path, ("timestamp", "level_id", "is_human", "win_rate", "lives_lost", "timeouts",
+                                            "enemy_count", "enemy_speed", "obstacles_count"), limit=3)) or "Sem dados"
+    # Win rate médio por nível (bots) já agregado nos rollups
+    level_summary = {stats["level_id"]: stats["win_rate_mean"] for stats in get_level_stats(db_path, is_human=False)}
 
     dias = ["Segunda", "Terça (Imagem)", "Quarta", "Quinta", "Sexta (Vídeo)", "Sábado", "Domingo"]
     plan = []
 
+    # Sem cache de respostas: a temperature 0.7 é para os posts variarem de semana para semana
+    ollama_config = config.get("ollama", {})
+
     for dia in dias:
         post_type = "Imagem" if "Imagem" in dia else ("Vídeo" if "Vídeo" in dia else "Texto")
-        prompt = f"Gera um post de {post_type} para {dia}. Tema: {theme}. Métricas: {last_runs}. Usa emojis e #StudioAI."
+        prompt = f"Gera um post de {post_type} para {dia}. Tema: {theme}. Métricas: {last_runs}. Win rate médio por nível: {level_summary or 'Sem dados'}. Usa emojis e #StudioAI."
 
         try:
-            response = chat(host="http://localhost:11434", model="llama3.1:8b",
+            response = chat(host=ollama_config.get("host", "http://localhost:11434"), model="llama3.1:8b",
                             messages=[{"role": "user", "content": prompt}],
-                            options={"temperature": 0.7})
+                            options=POST_OPTIONS)
             texto = response["message"]["content"]
         except:
             texto = "Erro na geração do post."
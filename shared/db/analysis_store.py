@@ -0,0 +1,44 @@
+import json
+import os
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+def init_analysis_db(db_path: str):
+    """Cria a tabela com as features estruturais de cada layout (chave: hash do genoma)."""
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS level_analysis (
+                                     genome_hash TEXT PRIMARY KEY,
+                                     level_id INTEGER,
+                                     seed INTEGER,
+                                     features_json TEXT,
+                                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                       )
+                       ''')
+
+    ensure_schema(db_path, "level_analysis", create)
+
+def load_analyses(db_path: str, genome_hashes: list) -> dict:
+    """Devolve {genome_hash: features} para os hashes que já estão na tabela (uma só query)."""
+    if not genome_hashes or not os.path.exists(db_path):
+        return {}
+
+    init_analysis_db(db_path)
+    with reading(db_path) as cursor:
+        placeholders = ",".join("?" * len(genome_hashes))
+        cursor.execute(f"SELECT genome_hash, features_json FROM level_analysis WHERE genome_hash IN ({placeholders})", list(genome_hashes))
+        rows = cursor.fetchall()
+
+    return {genome_hash: json.loads(features_json) for genome_hash, features_json in rows}
+
+def save_analyses(db_path: str, rows: list):
+    """rows: lista de (genome_hash, level_id, seed, features)."""
+    if not rows:
+        return
+
+    init_analysis_db(db_path)
+    with transaction(db_path) as cursor:
+        cursor.executemany('''
+                           INSERT OR REPLACE INTO level_analysis (genome_hash, level_id, seed, features_json)
+                           VALUES (?, ?, ?, ?)
+                           ''', [(h, level_id, seed, json.dumps(features)) for h, level_id, seed, features in rows])
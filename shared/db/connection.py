@@ -0,0 +1,197 @@
+import atexit
+import os
+import pathlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# ==========================================
+# 🚨 LIGAÇÕES SQLITE PARTILHADAS (WAL + ESCRITAS EM LOTE)
+# ==========================================
+# Uma ligação por processo e por ficheiro, reutilizada por todos os loggers e stores da pasta shared/db.
+#   - journal_mode=WAL: as leituras do servidor (dashboard, performance) não bloqueiam as escritas do
+#     orchestrator e vice-versa; cada processo continua a ter a sua ligação.
+#   - synchronous=NORMAL: em WAL só arrisca as últimas transações num corte de energia, nunca a BD.
+#   - O esquema (CREATE TABLE/INDEX, migrações) corre uma vez por processo e ficheiro.
+# As escritas das threads do mesmo processo usam a ligação à vez (RLock). As leituras (reading()) usam
+# uma ligação só de leitura por thread: em WAL leem o último commit sem esperar por um BEGIN IMMEDIATE
+# de outra thread (dentro de uma transação da própria thread leem pela ligação de escrita, para verem
+# o que ainda não foi confirmado). Se o ficheiro for apagado ou trocado (ex.: scripts/reset_workspace.py),
+# as ligações são reabertas na chamada seguinte.
+PRAGMAS = (("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("busy_timeout", 10000))
+
+
+class _Handle:
+    __slots__ = ("conn", "lock", "identity", "path", "writer", "readers")
+
+    def __init__(self, conn: sqlite3.Connection, identity, path: str):
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.identity = identity
+        self.path = path
+        self.writer = None  # thread com uma transação aberta na ligação de escrita
+        self.readers = {}   # ident da thread -> ligação só de leitura
+
+    def reader(self) -> sqlite3.Connection:
+        ident = threading.get_ident()
+        conn = self.readers.get(ident)
+        if conn is None:
+            with _REGISTRY_LOCK:
+                # Ligações de threads que já terminaram (ex.: pool de threads do servidor) são fechadas aqui
+                alive = {thread.ident for thread in threading.enumerate()}
+                for dead in [key for key in self.readers if key not in alive]:
+                    _close(self.readers.pop(dead))
+                conn = sqlite3.connect(f"{pathlib.Path(self.path).as_uri()}?mode=ro", uri=True, timeout=10,
+                                       check_same_thread=False, isolation_level=None)
+                conn.execute(f"PRAGMA busy_timeout={dict(PRAGMAS)['busy_timeout']}")
+                self.readers[ident] = conn
+        return conn
+
+    def close(self):
+        for conn in [self.conn, *self.readers.values()]:
+            _close(conn)
+        self.readers.clear()
+
+
+_HANDLES = {}
+_SCHEMAS = set()
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _close(conn: sqlite3.Connection):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+def _identity(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+def _handle(db_path: str) -> _Handle:
+    path = os.path.abspath(db_path)
+    key = (os.getpid(), path)
+    with _REGISTRY_LOCK:
+        handle = _HANDLES.get(key)
+        if handle is not None and handle.identity != _identity(path):
+            # O ficheiro desapareceu ou foi substituído: a ligação antiga escreveria num inode órfão
+            _HANDLES.pop(key)
+            _SCHEMAS.difference_update({entry for entry in _SCHEMAS if entry[:2] == key})
+            handle.close()
+            handle = None
+
+        if handle is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+            for name, value in PRAGMAS:
+                conn.execute(f"PRAGMA {name}={value}")
+            handle = _HANDLES[key] = _Handle(conn, _identity(path), path)
+        return handle
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """A ligação partilhada (autocommit); para escrever usar transaction(), para ler reading()."""
+    return _handle(db_path).conn
+
+@contextmanager
+def transaction(db_path: str):
+    """Cursor dentro de uma transação de escrita (BEGIN IMMEDIATE ... COMMIT, ROLLBACK em erro).
+    Transações aninhadas na mesma thread juntam-se à de fora."""
+    handle = _handle(db_path)
+    with handle.lock:
+        conn = handle.conn
+        if conn.in_transaction:
+            yield conn.cursor()
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        handle.writer = threading.get_ident()
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            handle.writer = None
+        conn.execute("COMMIT")
+
+@contextmanager
+def reading(db_path: str):
+    """Cursor para leituras numa ligação só de leitura desta thread (em WAL não espera pelas escritas,
+    nem das outras threads nem dos outros processos)."""
+    handle = _handle(db_path)
+    if handle.writer == threading.get_ident():
+        # Dentro de uma transação desta thread: a ligação de escrita vê as linhas ainda por confirmar
+        with handle.lock:
+            yield handle.conn.cursor()
+        return
+    cursor = handle.reader().cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+def ensure_schema(db_path: str, name: str, create: Callable[[sqlite3.Cursor], None]):
+    """Corre create(cursor) uma vez por processo para este ficheiro e este nome de esquema."""
+    _handle(db_path)  # reabre (e esquece os esquemas) se o ficheiro foi apagado ou trocado
+    key = (os.getpid(), os.path.abspath(db_path), name)
+    if key in _SCHEMAS:
+        return
+    with transaction(db_path) as cursor:
+        create(cursor)
+    _SCHEMAS.add(key)
+
+def close_all():
+    """Fecha as ligações deste processo (o último a fechar faz o checkpoint do WAL)."""
+    with _REGISTRY_LOCK:
+        for key in [key for key in _HANDLES if key[0] == os.getpid()]:
+            _HANDLES.pop(key).close()
+        _SCHEMAS.difference_update({entry for entry in _SCHEMAS if entry[0] == os.getpid()})
+
+atexit.register(close_all)
+
+
+class BufferedWriter:
+    """
+    Acumula linhas de um INSERT e grava-as num só executemany, numa transação: em flush(), ao sair
+    do with ou quando chegam max_rows. after_insert(cursor, rows) corre na mesma transação
+    (ex.: tabelas agregadas que têm de ficar coerentes com as linhas novas).
+    """
+
+    def __init__(self, db_path: str, sql: str, max_rows: int = 1000,
+                 schema: Optional[Callable[[str], None]] = None,
+                 after_insert: Optional[Callable[[sqlite3.Cursor, list], None]] = None):
+        self.db_path = db_path
+        self.sql = sql
+        self.max_rows = max_rows
+        self.schema = schema
+        self.after_insert = after_insert
+        self.rows = []
+        self.written = 0
+
+    def add(self, row: tuple):
+        self.rows.append(row)
+        if len(self.rows) >= self.max_rows:
+            self.flush()
+
+    def flush(self) -> int:
+        if not self.rows:
+            return 0
+        rows, self.rows = self.rows, []
+        if self.schema:
+            self.schema(self.db_path)
+        with transaction(self.db_path) as cursor:
+            cursor.executemany(self.sql, rows)
+            if self.after_insert:
+                self.after_insert(cursor, rows)
+        self.written += len(rows)
+        return len(rows)
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
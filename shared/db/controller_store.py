@@ -0,0 +1,38 @@
+import json
+import os
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+def init_controller_db(db_path: str):
+    """Cria a tabela com o estado do controlador numérico (um registo por nível e tipo de jogador)."""
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS controller_state (
+                                     level_id INTEGER,
+                                     is_human BOOLEAN,
+                                     state_json TEXT,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     PRIMARY KEY (level_id, is_human)
+                       )
+                       ''')
+
+    ensure_schema(db_path, "controller_state", create)
+
+def load_controller_state(db_path: str, level_id: int, is_human: bool = False) -> dict:
+    if not os.path.exists(db_path):
+        return {}
+
+    init_controller_db(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute("SELECT state_json FROM controller_state WHERE level_id = ? AND is_human = ?", (level_id, bool(is_human)))
+        row = cursor.fetchone()
+
+    return json.loads(row[0]) if row else {}
+
+def save_controller_state(db_path: str, level_id: int, state: dict, is_human: bool = False):
+    init_controller_db(db_path)
+    with transaction(db_path) as cursor:
+        cursor.execute('''
+                       INSERT OR REPLACE INTO controller_state (level_id, is_human, state_json, updated_at)
+                       VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                       ''', (level_id, bool(is_human), json.dumps(state)))
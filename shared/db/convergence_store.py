@@ -0,0 +1,67 @@
+import os
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+# Estado de convergência por nível e tipo de jogador (lido e gravado uma vez por geração).
+# total_rounds = rondas do último relatório que contou para o streak (uma repetição memorizada não as aumenta)
+CONVERGENCE_COLUMNS = ("streak", "frozen", "genome_fp", "roster_hash", "price_index", "reason", "total_rounds")
+
+
+def init_convergence_db(db_path: str):
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS level_convergence (
+                                     level_id INTEGER,
+                                     is_human BOOLEAN,
+                                     streak INTEGER DEFAULT 0,
+                                     frozen BOOLEAN DEFAULT 0,
+                                     genome_fp TEXT,
+                                     roster_hash TEXT,
+                                     price_index REAL,
+                                     reason TEXT,
+                                     total_rounds INTEGER DEFAULT 0,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     PRIMARY KEY (level_id, is_human)
+                       )
+                       ''')
+
+        # Migração: tabelas criadas antes da contagem de rondas
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(level_convergence)").fetchall()}
+        if "total_rounds" not in existing:
+            cursor.execute("ALTER TABLE level_convergence ADD COLUMN total_rounds INTEGER DEFAULT 0")
+
+    ensure_schema(db_path, "level_convergence", create)
+
+def load_convergence_states(db_path: str, is_human: bool = False) -> dict:
+    """{level_id: {streak, frozen, genome_fp, roster_hash, price_index, reason, total_rounds}}"""
+    if not os.path.exists(db_path):
+        return {}
+
+    init_convergence_db(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute(f"SELECT level_id, {', '.join(CONVERGENCE_COLUMNS)} FROM level_convergence WHERE is_human = ?",
+                       (bool(is_human),))
+        rows = cursor.fetchall()
+
+    states = {}
+    for row in rows:
+        state = dict(zip(CONVERGENCE_COLUMNS, row[1:]))
+        state["frozen"] = bool(state["frozen"])
+        state["total_rounds"] = int(state["total_rounds"] or 0)
+        states[row[0]] = state
+    return states
+
+def save_convergence_states(db_path: str, states: dict, is_human: bool = False):
+    """Grava os estados de todos os níveis numa só transação."""
+    if not states:
+        return
+
+    init_convergence_db(db_path)
+    with transaction(db_path) as cursor:
+        cursor.executemany(f'''
+                           INSERT OR REPLACE INTO level_convergence (level_id, is_human, {', '.join(CONVERGENCE_COLUMNS)}, updated_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                           ''', [(level_id, bool(is_human), int(state.get("streak", 0)), bool(state.get("frozen")),
+                                  state.get("genome_fp"), state.get("roster_hash"), state.get("price_index"), state.get("reason"),
+                                  int(state.get("total_rounds") or 0))
+                                 for level_id, state in states.items()])
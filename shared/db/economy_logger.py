@@ -1,38 +1,89 @@
-import sqlite3
 import json
 
+from shared.db.connection import ensure_schema, transaction
+
+# ==========================================
+# 🚨 HISTÓRICO ECONÓMICO NORMALIZADO
+# ==========================================
+# economy_snapshots: uma linha por fotografia (sessão, riqueza do jogador, índice de preços = preço médio).
+# economy_prices: uma linha por (item, fotografia), chave primária (item_id, snapshot_id) sem rowid:
+# "o preço do item X ao longo do tempo" é uma leitura contígua do índice, sem json.loads
+# (o índice (snapshot_id) serve os preços de uma fotografia inteira).
+# BDs antigas: as linhas da economy_history (prices_json) são migradas uma vez, com o mesmo id,
+# e a tabela fica como economy_history_legacy (cópia de segurança; já ninguém a lê nem escreve).
+
+def _migrate_legacy(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'economy_history'")
+    if cursor.fetchone() is None:
+        return
+
+    # Só as linhas que ainda não estão nas fotografias (idempotente se a migração for repetida)
+    rows = cursor.execute('''
+                          SELECT id, timestamp, session_id, player_coins, player_crystals, prices_json
+                          FROM economy_history WHERE id > (SELECT COALESCE(MAX(id), 0) FROM economy_snapshots)
+                          ORDER BY id ASC
+                          ''').fetchall()
+    for snapshot_id, timestamp, session_id, player_coins, player_crystals, prices_json in rows:
+        try:
+            prices = json.loads(prices_json or "{}")
+        except ValueError:
+            prices = {}
+        _insert_snapshot(cursor, session_id, player_coins, player_crystals, prices, snapshot_id, timestamp)
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'economy_history_legacy'")
+    if cursor.fetchone() is None:
+        cursor.execute("ALTER TABLE economy_history RENAME TO economy_history_legacy")
+
 def init_economy_db(db_path: str):
-    """Cria a tabela de histórico económico se ela ainda não existir."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    """Cria as tabelas do histórico económico (e migra a economy_history antiga) uma vez por processo."""
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS economy_snapshots (
+                                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     session_id TEXT,
+                                     player_coins INTEGER,
+                                     player_crystals INTEGER,
+                                     item_count INTEGER,
+                                     price_index REAL
+                       )
+                       ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_economy_snapshots_session ON economy_snapshots (session_id, id)")
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS economy_prices (
+                                     item_id TEXT,
+                                     snapshot_id INTEGER,
+                                     price REAL,
+                                     PRIMARY KEY (item_id, snapshot_id)
+                       ) WITHOUT ROWID
+                       ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_economy_prices_snapshot ON economy_prices (snapshot_id)")
+        _migrate_legacy(cursor)
 
-    # Criamos uma tabela dedicada à economia
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS economy_history (
-                                                                  id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                                                  timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                                                                  session_id TEXT,
-                                                                  player_coins INTEGER,
-                                                                  player_crystals INTEGER,
-                                                                  prices_json TEXT
-                   )
-                   ''')
-
-    conn.commit()
-    conn.close()
-
-def log_economy_snapshot(db_path: str, session_id: str, player_coins: int, player_crystals: int, prices_dict: dict):
-    """Injeta a 'fotografia' financeira atual na base de dados."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Convertemos o dicionário de preços para texto JSON para ser fácil de guardar na coluna
-    prices_json = json.dumps(prices_dict)
+    ensure_schema(db_path, "economy", create)
+
+def _insert_snapshot(cursor, session_id, player_coins, player_crystals, prices_dict: dict,
+                     snapshot_id=None, timestamp=None) -> int:
+    prices = {}
+    for item_id, price in (prices_dict or {}).items():
+        try:
+            prices[str(item_id)] = float(price)
+        except (TypeError, ValueError):
+            continue
+    price_index = round(sum(prices.values()) / len(prices), 4) if prices else 0.0
 
     cursor.execute('''
-                   INSERT INTO economy_history (session_id, player_coins, player_crystals, prices_json)
-                   VALUES (?, ?, ?, ?)
-                   ''', (session_id, player_coins, player_crystals, prices_json))
+                   INSERT INTO economy_snapshots (id, timestamp, session_id, player_coins, player_crystals, item_count, price_index)
+                   VALUES (?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?)
+                   ''', (snapshot_id, timestamp, session_id, player_coins, player_crystals, len(prices), price_index))
+    snapshot_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO economy_prices (item_id, snapshot_id, price) VALUES (?, ?, ?)",
+                       [(item_id, snapshot_id, price) for item_id, price in prices.items()])
+    return snapshot_id
+
+def log_economy_snapshot(db_path: str, session_id: str, player_coins: int, player_crystals: int, prices_dict: dict) -> int:
+    """Injeta a 'fotografia' financeira atual na base de dados (devolve o id da fotografia)."""
+    init_economy_db(db_path)
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    with transaction(db_path) as cursor:
+        return _insert_snapshot(cursor, session_id, player_coins, player_crystals, prices_dict)
@@ -0,0 +1,133 @@
+import os
+from typing import Optional, Sequence
+
+from shared.db.connection import reading
+from shared.db.economy_logger import init_economy_db
+
+# ==========================================
+# 🚨 CONSULTAS AO HISTÓRICO ECONÓMICO (SÉRIES POR ITEM E INFLAÇÃO ENTRE SESSÕES)
+# ==========================================
+# Tudo lido pelos índices: economy_prices (item_id, snapshot_id) para as séries de um item,
+# (snapshot_id) para os preços de uma fotografia, e economy_snapshots (session_id, id) para as sessões.
+# Nenhuma função percorre o histórico inteiro: as séries pedem só as últimas N fotografias.
+DEFAULT_SERIES_LENGTH = 20
+
+
+def _snapshot_dict(cursor, row) -> dict:
+    return dict(zip([description[0] for description in cursor.description], row))
+
+def _first_snapshot_of_last(cursor, count: int) -> int:
+    """Id da fotografia mais antiga entre as últimas count (0 se houver menos)."""
+    row = cursor.execute("SELECT id FROM economy_snapshots ORDER BY id DESC LIMIT 1 OFFSET ?",
+                         (max(1, int(count)) - 1,)).fetchone()
+    return row[0] if row else 0
+
+def get_snapshots(db_path: str, last: int = DEFAULT_SERIES_LENGTH) -> list:
+    """As últimas fotografias (sem os preços), da mais antiga para a mais recente."""
+    if not os.path.exists(db_path):
+        return []
+
+    init_economy_db(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute('''
+                       SELECT id, timestamp, session_id, player_coins, player_crystals, item_count, price_index
+                       FROM economy_snapshots ORDER BY id DESC LIMIT ?
+                       ''', (int(last),))
+        snapshots = [_snapshot_dict(cursor, row) for row in cursor.fetchall()]
+    return snapshots[::-1]
+
+def get_item_series(db_path: str, item_ids: Optional[Sequence[str]] = None, last: int = DEFAULT_SERIES_LENGTH) -> dict:
+    """
+    {item_id: {"snapshot_ids": [...], "prices": [...]}} nas últimas `last` fotografias.
+    item_ids None = os itens da fotografia mais recente.
+    """
+    if not os.path.exists(db_path):
+        return {}
+
+    init_economy_db(db_path)
+    with reading(db_path) as cursor:
+        if item_ids is None:
+            cursor.execute('''
+                           SELECT item_id FROM economy_prices
+                           WHERE snapshot_id = (SELECT MAX(id) FROM economy_snapshots) ORDER BY item_id
+                           ''')
+            item_ids = [row[0] for row in cursor.fetchall()]
+        item_ids = [str(item_id) for item_id in item_ids]
+        if not item_ids:
+            return {}
+
+        first_id = _first_snapshot_of_last(cursor, last)
+        cursor.execute(f'''
+                       SELECT item_id, snapshot_id, price FROM economy_prices
+                       WHERE item_id IN ({",".join("?" * len(item_ids))}) AND snapshot_id >= ?
+                       ORDER BY item_id, snapshot_id
+                       ''', (*item_ids, first_id))
+        rows = cursor.fetchall()
+
+    series = {item_id: {"snapshot_ids": [], "prices": []} for item_id in item_ids}
+    for item_id, snapshot_id, price in rows:
+        series[item_id]["snapshot_ids"].append(snapshot_id)
+        series[item_id]["prices"].append(price)
+    return series
+
+def _session_snapshot(cursor, session_id: Optional[str], before_id: Optional[int] = None) -> Optional[dict]:
+    """Última fotografia de uma sessão; sem session_id, a última de outra sessão anterior a before_id."""
+    columns = "id, timestamp, session_id, player_coins, player_crystals, item_count, price_index"
+    if session_id is not None:
+        cursor.execute(f"SELECT {columns} FROM economy_snapshots WHERE session_id = ? ORDER BY id DESC LIMIT 1",
+                       (session_id,))
+    elif before_id is None:
+        cursor.execute(f"SELECT {columns} FROM economy_snapshots ORDER BY id DESC LIMIT 1")
+    else:
+        cursor.execute(f'''
+                       SELECT {columns} FROM economy_snapshots
+                       WHERE id < ? AND session_id IS NOT (SELECT session_id FROM economy_snapshots WHERE id = ?)
+                       ORDER BY id DESC LIMIT 1
+                       ''', (before_id, before_id))
+    row = cursor.fetchone()
+    return _snapshot_dict(cursor, row) if row else None
+
+def _pct(old: float, new: float) -> Optional[float]:
+    return round((new - old) / old, 4) if old else None
+
+def get_inflation(db_path: str, from_session: Optional[str] = None, to_session: Optional[str] = None) -> dict:
+    """
+    Variação de preços entre a última fotografia de duas sessões (por omissão: a sessão mais
+    recente contra a anterior). {"from", "to", "price_index_delta", "price_index_pct", "basket_pct", "items"}
+    basket_pct = variação média dos itens presentes nas duas fotografias (itens novos ou removidos
+    mexem no preço médio mas não são inflação).
+    """
+    empty = {"from": None, "to": None, "price_index_delta": 0.0, "price_index_pct": None, "basket_pct": None, "items": {}}
+    if not os.path.exists(db_path):
+        return empty
+
+    init_economy_db(db_path)
+    with reading(db_path) as cursor:
+        to_snapshot = _session_snapshot(cursor, to_session)
+        if to_snapshot is None:
+            return empty
+        from_snapshot = _session_snapshot(cursor, from_session, before_id=to_snapshot["id"])
+        if from_snapshot is None:
+            return {**empty, "to": to_snapshot}
+
+        cursor.execute('''
+                       SELECT snapshot_id, item_id, price FROM economy_prices WHERE snapshot_id IN (?, ?)
+                       ''', (from_snapshot["id"], to_snapshot["id"]))
+        prices = {from_snapshot["id"]: {}, to_snapshot["id"]: {}}
+        for snapshot_id, item_id, price in cursor.fetchall():
+            prices[snapshot_id][item_id] = price
+
+    old_prices, new_prices = prices[from_snapshot["id"]], prices[to_snapshot["id"]]
+    items = {}
+    for item_id in sorted(set(old_prices) | set(new_prices)):
+        old, new = old_prices.get(item_id), new_prices.get(item_id)
+        items[item_id] = {"from": old, "to": new,
+                          "delta": round(new - old, 4) if old is not None and new is not None else None,
+                          "pct": _pct(old, new) if old is not None and new is not None else None}
+
+    basket = [item["pct"] for item in items.values() if item["pct"] is not None]
+    return {"from": from_snapshot, "to": to_snapshot,
+            "price_index_delta": round(to_snapshot["price_index"] - from_snapshot["price_index"], 4),
+            "price_index_pct": _pct(from_snapshot["price_index"], to_snapshot["price_index"]),
+            "basket_pct": round(sum(basket) / len(basket), 4) if basket else None,
+            "items": items}
@@ -1,47 +1,73 @@
+import json
 import sqlite3
-import os
-import pandas as pd
 from datetime import datetime
+from rich import print
+
+from shared.db.connection import BufferedWriter, ensure_schema
+from shared.db.rollups import init_rollups, update_rollups
 
 def init_db(db_path):
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # 🚨 CORREÇÃO: O nome da tabela tem de ser 'evolution_logs' para bater certo com o INSERT!
-    cursor.execute('''
-                   CREATE TABLE IF NOT EXISTS evolution (
-                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                 session_id TEXT,
-                                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                                 level_id INTEGER,
-                                 is_human BOOLEAN,
-                                 win_rate REAL,
-                                 time_to_win REAL,
-                                 lives_lost INTEGER,
-                                 timeouts INTEGER,
-                                 collected_coins INTEGER,
-                                 collected_crystals INTEGER,
-                                 powerups_used INTEGER,
-                                 enemy_count INTEGER,
-                                 enemy_speed REAL,
-                                 agent_speed REAL,
-                                 obstacles_count INTEGER,
-                                 powerups_spawned INTEGER,
-                                 traps_spawned INTEGER,
-                                 report TEXT
-                   )
-                   ''')
-    conn.commit()
-    conn.close()
+    """Cria a tabela evolution (e migra BDs antigas) uma vez por processo."""
+    def create(cursor):
+        # 🚨 CORREÇÃO: O nome da tabela tem de ser 'evolution_logs' para bater certo com o INSERT!
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS evolution (
+                                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     session_id TEXT,
+                                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     level_id INTEGER,
+                                     is_human BOOLEAN,
+                                     win_rate REAL,
+                                     time_to_win REAL,
+                                     lives_lost INTEGER,
+                                     timeouts INTEGER,
+                                     collected_coins INTEGER,
+                                     collected_crystals INTEGER,
+                                     powerups_used INTEGER,
+                                     enemy_count INTEGER,
+                                     enemy_speed REAL,
+                                     agent_speed REAL,
+                                     obstacles_count INTEGER,
+                                     powerups_spawned INTEGER,
+                                     traps_spawned INTEGER,
+                                     report TEXT
+                       )
+                       ''')
 
-# 🚨 Adicionámos o 'current_roster=None' no final dos argumentos
-def log_evolution_to_db(db_path, metrics, new_genome, report, is_human=False, session_id=None, current_roster=None):
-    try:
-        init_db(db_path)
-    except Exception as e:
-        print(f"[red]Erro ao inicializar BD: {e}[/red]")
+        # Migração: colunas que o surrogate e os rollups precisam (BDs antigas não as têm)
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(evolution)").fetchall()}
+        for column, col_type in (("time_limit", "REAL"), ("target_count", "INTEGER"), ("genome_json", "TEXT")):
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE evolution ADD COLUMN {column} {col_type}")
+
+        # Índices das consultas do dashboard/API (shared/db/metrics_query.py)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_evolution_session ON evolution (session_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_evolution_level ON evolution (level_id, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_evolution_player_time ON evolution (is_human, timestamp)")
+
+    ensure_schema(db_path, "evolution", create)
+    init_rollups(db_path)
+
+INSERT_EVOLUTION_SQL = '''
+                       INSERT INTO evolution
+                       (session_id, level_id, is_human, win_rate, time_to_win, lives_lost, timeouts,
+                        collected_coins, collected_crystals, powerups_used, enemy_count, enemy_speed,
+                        agent_speed, obstacles_count, powerups_spawned, traps_spawned, report,
+                        time_limit, target_count, genome_json)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       '''
+
+def selected_class_speed(current_roster, player_save=None) -> float:
+    """stats.speed da classe escolhida no save (loadout.selectedClassID); sem save, a da primeira classe."""
+    classes = (current_roster or {}).get("classes") or []
+    selected_id = (player_save or {}).get("loadout", {}).get("selectedClassID")
+    selected = next((char for char in classes if char.get("id") == selected_id), classes[0] if classes else None)
+    if selected is None:
+        return 5.0
+    return float(selected.get("stats", {}).get("speed", 5.0))
 
+def evolution_row(metrics, new_genome, report, is_human=False, session_id=None, current_roster=None, player_save=None) -> tuple:
+    """Os valores de uma linha da tabela evolution, pela ordem do INSERT_EVOLUTION_SQL."""
     if session_id is None:
         session_id = datetime.now().strftime("Session_%Y%m%d_%H%M")
 
@@ -54,11 +80,11 @@ def log_evolution_to_db(db_path, metrics, new_genome, report, is_human=False, se
     powerups_spawned = int(rules.get("powerUpCount", 0))
     traps_spawned = int(rules.get("trapCount", 0))
     obstacles_count = int(new_genome.get("obstacles", {}).get("count", 0))
+    time_limit = float(rules.get("timeLimit", 0.0))
+    target_count = int(rules.get("targetCount", 0))
 
-    # 🚨 1.5 Extrair a Velocidade do Jogador (Roster)
-    agent_speed = 5.0
-    if current_roster and "classes" in current_roster and len(current_roster["classes"]) > 0:
-        agent_speed = float(current_roster["classes"][0].get("baseSpeed", 5.0))
+    # 🚨 1.5 Extrair a Velocidade do Jogador (classe escolhida no save, Roster)
+    agent_speed = selected_class_speed(current_roster, player_save)
 
     # 2. Extrair Dados de Performance (Metrics)
     level_reports = metrics.get("level_reports", [])
@@ -72,40 +98,40 @@ def log_evolution_to_db(db_path, metrics, new_genome, report, is_human=False, se
     collected_crystals = int(my_report.get("collected_crystals", 0))
     powerups_used = int(my_report.get("powerups_used", 0))
 
-    # 3. Inserção Limpa em Colunas
-    conn = None
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+    return (session_id, level_id, is_human, win_rate, time_to_win, lives_lost, timeouts,
+            collected_coins, collected_crystals, powerups_used, enemy_count, enemy_speed,
+            agent_speed, obstacles_count, powerups_spawned, traps_spawned, report,
+            time_limit, target_count, json.dumps(new_genome, separators=(",", ":")))
 
-        # 🚨 Adicionado o 'agent_speed' na Query e nos Valores
-        cursor.execute('''
-                       INSERT INTO evolution
-                       (session_id, level_id, is_human, win_rate, time_to_win, lives_lost, timeouts,
-                        collected_coins, collected_crystals, powerups_used, enemy_count, enemy_speed,
-                        agent_speed, obstacles_count, powerups_spawned, traps_spawned, report)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                       ''', (
-                           session_id, level_id, is_human, win_rate, time_to_win, lives_lost, timeouts,
-                           collected_coins, collected_crystals, powerups_used, enemy_count, enemy_speed,
-                           agent_speed, obstacles_count, powerups_spawned, traps_spawned, report
-                       ))
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"\n[bold red]🚨 ERRO SQLITE: {e}[/bold red]\n")
-    finally:
-        if conn: conn.close()
+class EvolutionWriter(BufferedWriter):
+    """
+    Linhas de uma sessão do orchestrator: add() por nível, um só executemany/transação no flush().
+    Os rollups (shared/db/rollups.py) são atualizados na mesma transação.
+    """
 
-def get_all_metrics_for_api(db_path):
-    if not os.path.exists(db_path):
-        return []
+    def __init__(self, db_path, max_rows: int = 1000):
+        super().__init__(db_path, INSERT_EVOLUTION_SQL, max_rows=max_rows, schema=init_db, after_insert=update_rollups)
 
-    conn = sqlite3.connect(db_path)
-    query = "SELECT * FROM evolution ORDER BY id ASC"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    def log(self, metrics, new_genome, report, is_human=False, session_id=None, current_roster=None, player_save=None):
+        self.add(evolution_row(metrics, new_genome, report, is_human, session_id, current_roster, player_save))
 
-    if 'is_human' in df.columns:
-        df['is_human'] = df['is_human'].astype(bool)
+    def flush(self) -> int:
+        try:
+            return super().flush()
+        except sqlite3.Error as e:
+            print(f"\n[bold red]🚨 ERRO SQLITE: {e}[/bold red]\n")
+            return 0
+
+# 🚨 Adicionámos o 'current_roster=None' no final dos argumentos
+def log_evolution_to_db(db_path, metrics, new_genome, report, is_human=False, session_id=None, current_roster=None,
+                        player_save=None):
+    """Uma linha isolada (play.py); o orchestrator usa o EvolutionWriter para gravar a sessão de uma vez."""
+    writer = EvolutionWriter(db_path)
+    writer.log(metrics, new_genome, report, is_human, session_id, current_roster, player_save)
+    writer.flush()
+
+def get_all_metrics_for_api(db_path):
+    """Todas as linhas por ordem de id (exportações). Para páginas e filtros usar shared/db/metrics_query.py."""
+    from shared.db.metrics_query import iter_metrics
 
-    return df.to_dict(orient="records")
\ No newline at end of file
+    return list(iter_metrics(db_path, descending=False))
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from shared.ollama_client import chat
+from shared.db.connection import ensure_schema, reading, transaction
+
+# ==========================================
+# 🚨 CACHE PERSISTENTE DE RESPOSTAS DO LLM (Content-Addressed)
+# ==========================================
+def get_cache_settings(config: dict, data_dir: Optional[str] = None) -> dict:
+    """Lê a secção llm_cache do config.yaml. A BD fica ao lado do evolution.db (paths.data)."""
+    cache_config = config.get("llm_cache", {})
+    data_dir = data_dir or config.get("paths", {}).get("data", "workspace/data")
+
+    return {
+        "enabled": cache_config.get("enabled", True),
+        "db_path": os.path.join(data_dir, cache_config.get("filename", "llm_cache.db")),
+        "ttl_seconds": float(cache_config.get("ttl_hours", 72)) * 3600,
+        "max_bytes": int(float(cache_config.get("max_mb", 64)) * 1024 * 1024),
+        # Bypass: ignora as respostas guardadas mas continua a gravar as novas
+        "bypass": bool(cache_config.get("bypass", False)) or os.environ.get("STUDIO_AI_LLM_CACHE_BYPASS") == "1",
+        # Acima desta temperatura a resposta não é determinística: nem se lê nem se grava
+        "max_temperature": float(cache_config.get("max_temperature", 0.3)),
+    }
+
+def init_llm_cache(db_path: str):
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS llm_cache (
+                                     cache_key TEXT PRIMARY KEY,
+                                     model TEXT,
+                                     response_json TEXT,
+                                     size_bytes INTEGER,
+                                     created_at REAL,
+                                     last_access REAL,
+                                     hits INTEGER DEFAULT 0
+                       )
+                       ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS llm_cache_stats (
+                                     name TEXT PRIMARY KEY,
+                                     value INTEGER DEFAULT 0
+                       )
+                       ''')
+
+    ensure_schema(db_path, "llm_cache", create)
+
+def make_cache_key(model: str, options: dict, messages: list) -> str:
+    """Hash SHA-256 canónico de (model, options, messages)."""
+    payload = json.dumps({"model": model, "options": options or {}, "messages": messages},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _bump(cursor, name: str, amount: int = 1):
+    cursor.execute('''
+                   INSERT INTO llm_cache_stats (name, value) VALUES (?, ?)
+                   ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+                   ''', (name, amount))
+
+def cache_lookup(db_path: str, cache_key: str, ttl_seconds: float) -> Optional[dict]:
+    """Devolve a resposta guardada (e conta hit/miss). Entradas expiradas são apagadas."""
+    now = time.time()
+    with transaction(db_path) as cursor:
+        cursor.execute("SELECT response_json, created_at FROM llm_cache WHERE cache_key = ?", (cache_key,))
+        row = cursor.fetchone()
+
+        result = None
+        if row and now - row[1] <= ttl_seconds:
+            cursor.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?", (now, cache_key))
+            _bump(cursor, "hits")
+            result = json.loads(row[0])
+        else:
+            if row:
+                cursor.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+                _bump(cursor, "expired")
+            _bump(cursor, "misses")
+
+    return result
+
+def cache_store(db_path: str, cache_key: str, model: str, response: dict, max_bytes: int, ttl_seconds: float):
+    """Grava a resposta e aplica a evição LRU por tamanho total (e limpa as expiradas)."""
+    response_json = json.dumps(response, ensure_ascii=False)
+    now = time.time()
+
+    with transaction(db_path) as cursor:
+        cursor.execute('''
+                       INSERT OR REPLACE INTO llm_cache (cache_key, model, response_json, size_bytes, created_at, last_access, hits)
+                       VALUES (?, ?, ?, ?, ?, ?, 0)
+                       ''', (cache_key, model, response_json, len(response_json.encode("utf-8")), now, now))
+
+        cursor.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - ttl_seconds,))
+
+        # Mantém as entradas mais recentes até max_bytes (soma acumulada por last_access DESC)
+        cursor.execute('''
+                       DELETE FROM llm_cache WHERE cache_key IN (
+                           SELECT cache_key FROM (
+                               SELECT cache_key, SUM(size_bytes) OVER (ORDER BY last_access DESC, cache_key) AS running
+                               FROM llm_cache
+                           ) WHERE running > ?
+                       )
+                       ''', (max_bytes,))
+        if cursor.rowcount > 0:
+            _bump(cursor, "evictions", cursor.rowcount)
+
+def cache_evict(db_path: str, cache_key: str):
+    """Apaga uma entrada (resposta guardada que já não passa na validação do chamador)."""
+    with transaction(db_path) as cursor:
+        cursor.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+        if cursor.rowcount > 0:
+            _bump(cursor, "rejected", cursor.rowcount)
+
+def get_cache_stats(db_path: str) -> dict:
+    """Contadores de hits/misses/evictions e tamanho atual da cache."""
+    if not os.path.exists(db_path):
+        return {"hits": 0, "misses": 0, "entries": 0, "size_bytes": 0, "hit_rate": 0.0}
+
+    init_llm_cache(db_path)
+    with reading(db_path) as cursor:
+        stats = dict(cursor.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        entries, size_bytes = cursor.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()
+
+    stats.setdefault("hits", 0)
+    stats.setdefault("misses", 0)
+    stats.update({"entries": entries, "size_bytes": size_bytes})
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+def cached_chat(host: str, model: str, messages, options: dict, cache: Optional[dict] = None, timeout: Optional[float] = None,
+                stream: bool = False, on_progress: Optional[Callable[[dict], None]] = None,
+                validate: Optional[Callable[[dict], bool]] = None) -> dict:
+    """
+    Igual ao chat() do ollama_client, mas consulta primeiro a cache persistente.
+    cache = get_cache_settings(config); None ou enabled=False desliga a cache, tal como uma
+    temperatura acima de max_temperature. validate(resp) decide se a resposta pode ser guardada
+    (ex.: tem um JSON extraível); uma entrada guardada que falhe a validação é apagada e repetida.
+    """
+    temperature = float((options or {}).get("temperature", 0.0))
+    if not cache or not cache.get("enabled") or temperature > cache.get("max_temperature", 0.3):
+        return chat(host=host, model=model, messages=messages, options=options, timeout=timeout, stream=stream, on_progress=on_progress)
+
+    db_path = cache["db_path"]
+    init_llm_cache(db_path)
+    cache_key = make_cache_key(model, options, messages)
+
+    if not cache.get("bypass"):
+        hit = cache_lookup(db_path, cache_key, cache["ttl_seconds"])
+        if hit is not None:
+            if validate is None or validate(hit):
+                return hit
+            cache_evict(db_path, cache_key)
+
+    resp = chat(host=host, model=model, messages=messages, options=options, timeout=timeout, stream=stream, on_progress=on_progress)
+    if validate is None or validate(resp):
+        cache_store(db_path, cache_key, model, resp, cache["max_bytes"], cache["ttl_seconds"])
+    return resp
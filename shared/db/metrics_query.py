@@ -0,0 +1,114 @@
+import os
+from typing import Iterator, Optional, Sequence
+
+from shared.db.connection import reading
+from shared.db.evolution_logger import init_db
+
+# ==========================================
+# 🚨 CONSULTAS À TABELA EVOLUTION (PROJEÇÃO + FILTROS + PAGINAÇÃO POR CHAVE)
+# ==========================================
+# Sem pandas e sem SELECT *: só as colunas pedidas, filtros em SQL e paginação keyset pelo id
+# (WHERE id < cursor ORDER BY id DESC LIMIT n). Com os índices criados no init_db
+# ((session_id), (level_id, id), (is_human, timestamp)) cada página custa o mesmo com 100 linhas
+# ou com milhões, ao contrário de OFFSET ou de carregar a tabela inteira.
+# iter_metrics() lê em lotes curtos: a ligação partilhada só fica presa durante cada lote.
+METRIC_COLUMNS = ("id", "session_id", "timestamp", "level_id", "is_human", "win_rate", "time_to_win", "lives_lost",
+                  "timeouts", "collected_coins", "collected_crystals", "powerups_used", "enemy_count", "enemy_speed",
+                  "agent_speed", "obstacles_count", "powerups_spawned", "traps_spawned", "report", "time_limit",
+                  "target_count", "genome_json")
+
+MAX_PAGE_SIZE = 500
+
+
+def _normalize_time(value: Optional[str]) -> Optional[str]:
+    """O timestamp da BD é CURRENT_TIMESTAMP ('AAAA-MM-DD HH:MM:SS', UTC); aceita também ISO com 'T'."""
+    return value.replace("T", " ").rstrip("Z") if value else value
+
+def _build_query(columns: Sequence[str], level_id: Optional[int], is_human: Optional[bool], session_id: Optional[str],
+                 since: Optional[str], until: Optional[str], after: Optional[int], descending: bool, limit: int):
+    unknown = [column for column in columns if column not in METRIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+
+    where, params = [], []
+    if level_id is not None:
+        where.append("level_id = ?")
+        params.append(int(level_id))
+    if is_human is not None:
+        where.append("is_human = ?")
+        params.append(bool(is_human))
+    if session_id is not None:
+        where.append("session_id = ?")
+        params.append(session_id)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(_normalize_time(since))
+    if until:
+        where.append("timestamp <= ?")
+        params.append(_normalize_time(until))
+    # Filtro só por jogador (com ou sem intervalo de tempo): ordena por (timestamp, id) para o índice
+    # (is_human, timestamp) servir o ORDER BY; o timestamp cresce com o id, por isso a ordem é a mesma.
+    # O cursor continua a ser só o id (o timestamp dele vem da chave primária).
+    by_time = is_human is not None and level_id is None and session_id is None
+    sign, direction = ("<", "DESC") if descending else (">", "ASC")
+    if after is not None:
+        if by_time:
+            where.append(f"(timestamp, id) {sign} ((SELECT timestamp FROM evolution WHERE id = ?), ?)")
+            params += [int(after), int(after)]
+        else:
+            where.append(f"id {sign} ?")
+            params.append(int(after))
+
+    # O id entra sempre na projeção: é a chave do cursor
+    select = ", ".join(dict.fromkeys(("id", *columns)))
+    sql = f"SELECT {select} FROM evolution"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    order = f"timestamp {direction}, id {direction}" if by_time else f"id {direction}"
+    sql += f" ORDER BY {order} LIMIT ?"
+    return sql, params + [int(limit)]
+
+def iter_metrics(db_path: str, columns: Optional[Sequence[str]] = None, level_id: Optional[int] = None,
+                 is_human: Optional[bool] = None, session_id: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None, cursor: Optional[int] = None, descending: bool = True,
+                 limit: Optional[int] = None, batch_size: int = 500) -> Iterator[dict]:
+    """
+    Linhas da tabela evolution como dicts (só as colunas pedidas; None = todas), das mais recentes
+    para as mais antigas por omissão. cursor = id da última linha já vista; limit = None lê até ao fim.
+    """
+    if not os.path.exists(db_path):
+        return
+
+    init_db(db_path)
+    columns = tuple(columns or METRIC_COLUMNS)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        sql, params = _build_query(columns, level_id, is_human, session_id, since, until, cursor, descending, size)
+        with reading(db_path) as db_cursor:
+            db_cursor.execute(sql, params)
+            names = [description[0] for description in db_cursor.description]
+            rows = db_cursor.fetchall()
+
+        for row in rows:
+            record = dict(zip(names, row))
+            if "is_human" in record:
+                record["is_human"] = bool(record["is_human"])
+            yield record
+
+        if len(rows) < size:
+            return
+        cursor = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+
+def query_metrics_page(db_path: str, columns: Optional[Sequence[str]] = None, limit: int = 50,
+                       cursor: Optional[int] = None, descending: bool = True, **filters) -> dict:
+    """Uma página e o cursor da seguinte: {"data": [...], "next_cursor": id ou None}."""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    # Pede uma linha a mais para saber se há página seguinte sem fazer COUNT(*)
+    rows = list(iter_metrics(db_path, columns, cursor=cursor, descending=descending, limit=limit + 1,
+                             batch_size=limit + 1, **filters))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"data": rows, "next_cursor": rows[-1]["id"] if has_more else None}
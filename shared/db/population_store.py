@@ -0,0 +1,42 @@
+import json
+import os
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+# ==========================================
+# POPULAÇÃO DE GENOMAS POR NÍVEL (procura populacional do Director)
+# ==========================================
+# Um registo por (nível, tipo de jogador) com os membros em JSON: genoma, relatório agregado
+# (merge_level_reports de todas as avaliações), win rate ponderado e fitness.
+def init_population_db(db_path: str):
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS population_state (
+                                     level_id INTEGER,
+                                     is_human BOOLEAN,
+                                     members_json TEXT,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     PRIMARY KEY (level_id, is_human)
+                       )
+                       ''')
+
+    ensure_schema(db_path, "population_state", create)
+
+def load_population(db_path: str, level_id: int, is_human: bool = False) -> list:
+    if not os.path.exists(db_path):
+        return []
+
+    init_population_db(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute("SELECT members_json FROM population_state WHERE level_id = ? AND is_human = ?", (level_id, bool(is_human)))
+        row = cursor.fetchone()
+
+    return json.loads(row[0]) if row else []
+
+def save_population(db_path: str, level_id: int, members: list, is_human: bool = False):
+    init_population_db(db_path)
+    with transaction(db_path) as cursor:
+        cursor.execute('''
+                       INSERT OR REPLACE INTO population_state (level_id, is_human, members_json, updated_at)
+                       VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                       ''', (level_id, bool(is_human), json.dumps(members)))
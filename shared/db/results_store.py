@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+
+from shared.metrics import SUM_FIELDS
+from shared.db.connection import ensure_schema, reading, transaction
+
+# ==========================================
+# 🚨 IMPRESSÕES DIGITAIS (GENOMA, BUILD E CONTEXTO DO JOGADOR)
+# ==========================================
+# Só os campos que mudam a jogabilidade: tema, paredes visuais e escalas dos obstáculos ficam de fora
+GENOME_FIELDS = (("arena", "halfSize"), ("obstacles", "count"))
+
+
+def _digest(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:20]
+
+def _canonical_number(value):
+    try:
+        return round(float(value), 3)
+    except (TypeError, ValueError):
+        return value
+
+def genome_fingerprint(genome: dict, include_seed: bool = True) -> str:
+    """Hash canónico do genoma (números normalizados, ordem das chaves irrelevante)."""
+    canonical = {
+        "level_id": int(genome.get("level_id", 1)),
+        "rules": {k: _canonical_number(v) for k, v in (genome.get("rules") or {}).items()},
+    }
+    for section, key in GENOME_FIELDS:
+        canonical[f"{section}.{key}"] = _canonical_number((genome.get(section) or {}).get(key))
+    if include_seed:
+        canonical["seed"] = int(genome.get("seed", 0))
+    return _digest(canonical)
+
+def context_fingerprint(player_save: dict, roster: dict) -> str:
+    """Hash do que o save e o roster mudam numa ronda (classe escolhida, stats, upgrades)."""
+    player_save = player_save or {}
+    selected_id = player_save.get("loadout", {}).get("selectedClassID")
+    selected = next((c for c in (roster or {}).get("classes", []) if c.get("id") == selected_id), {})
+    stats = player_save.get("stats", {}) or {}
+    return _digest({
+        "class": selected_id,
+        "class_stats": selected.get("stats", {}),
+        "upgrades": player_save.get("purchasedUpgrades", {}) or {},
+        "max_lives": stats.get("maxLives"),
+        "powerups": stats.get("basePowerUpCount"),
+    })
+
+def files_fingerprint(paths: list) -> str:
+    """Hash do conteúdo dos ficheiros da Build (ou do simulador); os que não existem são ignorados."""
+    sha = hashlib.sha1()
+    for path in paths:
+        if os.path.isfile(path):
+            sha.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+    return sha.hexdigest()[:20]
+
+
+# ==========================================
+# TABELA DE RESULTADOS (estatísticas acumuladas por impressão digital)
+# ==========================================
+def init_results_db(db_path: str):
+    def create(cursor):
+        cursor.execute(f'''
+                       CREATE TABLE IF NOT EXISTS sim_results (
+                                     fingerprint TEXT,
+                                     build_hash TEXT,
+                                     context_hash TEXT,
+                                     level_id INTEGER,
+                                     samples INTEGER DEFAULT 0,
+                                     {", ".join(f"{field} INTEGER DEFAULT 0" for field in SUM_FIELDS)},
+                                     time_to_win_sum REAL DEFAULT 0,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     PRIMARY KEY (fingerprint, build_hash, context_hash)
+                       )
+                       ''')
+
+    ensure_schema(db_path, "sim_results", create)
+
+def record_results(db_path: str, rows: list, build_hash: str, context_hash: str):
+    """
+    Junta LevelReports às estatísticas acumuladas (soma, nunca substitui).
+    rows: lista de (fingerprint, report) com os relatórios já agregados por nível.
+    """
+    if not rows:
+        return
+
+    init_results_db(db_path)
+    fields = ", ".join(SUM_FIELDS)
+    updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in SUM_FIELDS)
+
+    values = []
+    for fingerprint, rep in rows:
+        wins = int(rep.get("wins", 0))
+        values.append((fingerprint, build_hash, context_hash, rep["level_id"], *[int(rep.get(field, 0)) for field in SUM_FIELDS],
+                       float(rep.get("time_to_win", 0.0)) * wins))
+
+    with transaction(db_path) as cursor:
+        cursor.executemany(f'''
+                           INSERT INTO sim_results (fingerprint, build_hash, context_hash, level_id, samples, {fields}, time_to_win_sum)
+                           VALUES (?, ?, ?, ?, 1, {", ".join("?" * len(SUM_FIELDS))}, ?)
+                           ON CONFLICT (fingerprint, build_hash, context_hash) DO UPDATE SET
+                               samples = samples + 1, {updates},
+                               time_to_win_sum = time_to_win_sum + excluded.time_to_win_sum,
+                               updated_at = CURRENT_TIMESTAMP
+                           ''', values)
+
+def lookup_results(db_path: str, fingerprints: list, build_hash: str, context_hash: str) -> dict:
+    """Devolve {fingerprint: LevelReport acumulado (+ "samples")} para as impressões digitais conhecidas."""
+    if not fingerprints or not os.path.exists(db_path):
+        return {}
+
+    init_results_db(db_path)
+    placeholders = ",".join("?" * len(fingerprints))
+    with reading(db_path) as cursor:
+        cursor.execute(f'''
+                       SELECT fingerprint, level_id, samples, {", ".join(SUM_FIELDS)}, time_to_win_sum FROM sim_results
+                       WHERE build_hash = ? AND context_hash = ? AND fingerprint IN ({placeholders})
+                       ''', [build_hash, context_hash, *fingerprints])
+        rows = cursor.fetchall()
+
+    results = {}
+    for fingerprint, level_id, samples, *sums, time_sum in rows:
+        rep = {"level_id": level_id, **dict(zip(SUM_FIELDS, sums))}
+        # Tentativas e vitórias ficam em total (win rate ponderado); o resto é a média por run, como um relatório normal
+        for field in SUM_FIELDS[2:]:
+            rep[field] = int(round(rep[field] / max(samples, 1)))
+        rep["win_rate"] = round(rep["wins"] / rep["total_rounds"], 4) if rep["total_rounds"] else 0.0
+        rep["time_to_win"] = round(time_sum / rep["wins"], 2) if rep["wins"] else 0.0
+        rep["samples"] = samples
+        results[fingerprint] = rep
+    return results
@@ -0,0 +1,237 @@
+import json
+import os
+from typing import Optional
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+# ==========================================
+# 🚨 AGREGADOS DA TABELA EVOLUTION (ROLLUPS INCREMENTAIS)
+# ==========================================
+# O dashboard, a API de performance e o marketing leem estas tabelas em vez de agregar a evolution:
+#   - evolution_level_stats: por nível e tipo de jogador, contagem, média e variância (Welford/Chan)
+#     do win rate, vidas perdidas e timeouts, e o último genoma gravado;
+#   - evolution_session_stats: resumo de cada sessão do orchestrator;
+#   - evolution_totals: uma só linha com o total de runs e a última linha agregada (last_id).
+# update_rollups() agrega as linhas com id > last_id. Corre dentro da mesma transação do INSERT
+# (EvolutionWriter -> BufferedWriter.after_insert), por isso os agregados nunca ficam a meio.
+# Linhas gravadas por outro caminho entram na escrita seguinte ou ao abrir a BD (init_rollups).
+# rebuild_rollups() (python -m scripts.rebuild_rollups) apaga tudo e volta a agregar o histórico.
+ROLLUP_METRICS = ("win_rate", "lives_lost", "timeouts")
+
+ROLLUP_CHUNK = 50000
+
+
+def init_rollups(db_path: str):
+    def create(cursor):
+        stats_columns = ", ".join(f"{metric}_mean REAL DEFAULT 0, {metric}_m2 REAL DEFAULT 0" for metric in ROLLUP_METRICS)
+        cursor.execute(f'''
+                       CREATE TABLE IF NOT EXISTS evolution_level_stats (
+                                     level_id INTEGER,
+                                     is_human BOOLEAN,
+                                     runs INTEGER DEFAULT 0,
+                                     {stats_columns},
+                                     last_id INTEGER,
+                                     last_session_id TEXT,
+                                     latest_genome_json TEXT,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                                     PRIMARY KEY (level_id, is_human)
+                       )
+                       ''')
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS evolution_session_stats (
+                                     session_id TEXT PRIMARY KEY,
+                                     is_human BOOLEAN,
+                                     runs INTEGER DEFAULT 0,
+                                     win_rate_mean REAL DEFAULT 0,
+                                     lives_lost INTEGER DEFAULT 0,
+                                     timeouts INTEGER DEFAULT 0,
+                                     min_level INTEGER,
+                                     max_level INTEGER,
+                                     first_id INTEGER,
+                                     last_id INTEGER,
+                                     started_at DATETIME,
+                                     ended_at DATETIME
+                       )
+                       ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_stats_last ON evolution_session_stats (last_id)")
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS evolution_totals (
+                                     id INTEGER PRIMARY KEY CHECK (id = 1),
+                                     runs INTEGER DEFAULT 0,
+                                     last_id INTEGER DEFAULT 0,
+                                     last_level_id INTEGER,
+                                     last_session_id TEXT,
+                                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                       )
+                       ''')
+        cursor.execute("INSERT OR IGNORE INTO evolution_totals (id, runs, last_id) VALUES (1, 0, 0)")
+        # BD com histórico anterior aos rollups (ou linhas gravadas por outro caminho): apanha-as já
+        update_rollups(cursor)
+
+    ensure_schema(db_path, "evolution_rollups", create)
+
+def _combine(count: int, mean: float, m2: float, values: list) -> tuple:
+    """Junta um lote a (n, média, M2) com a fórmula de Chan (estável, sem somas de quadrados)."""
+    n_b = len(values)
+    mean_b = sum(values) / n_b
+    m2_b = sum((v - mean_b) ** 2 for v in values)
+    total = count + n_b
+    delta = mean_b - mean
+    return total, mean + delta * n_b / total, m2 + m2_b + delta * delta * count * n_b / total
+
+def _apply_chunk(cursor, rows: list):
+    by_level, by_session = {}, {}
+    for row in rows:
+        by_level.setdefault((row["level_id"], bool(row["is_human"])), []).append(row)
+        by_session.setdefault(row["session_id"], []).append(row)
+
+    stat_columns = [f"{metric}_{part}" for metric in ROLLUP_METRICS for part in ("mean", "m2")]
+    for (level_id, is_human), level_rows in by_level.items():
+        cursor.execute(f"SELECT runs, {', '.join(stat_columns)}, latest_genome_json FROM evolution_level_stats "
+                       f"WHERE level_id = ? AND is_human = ?", (level_id, is_human))
+        current = cursor.fetchone() or (0, *([0.0] * len(stat_columns)), None)
+
+        runs, stats = current[0], []
+        for i, metric in enumerate(ROLLUP_METRICS):
+            values = [float(row[metric] or 0) for row in level_rows]
+            _, mean, m2 = _combine(runs, current[1 + 2 * i], current[2 + 2 * i], values)
+            stats += [mean, m2]
+        genome = next((row["genome_json"] for row in reversed(level_rows) if row["genome_json"]), current[-1])
+
+        cursor.execute(f'''
+                       INSERT OR REPLACE INTO evolution_level_stats
+                       (level_id, is_human, runs, {', '.join(stat_columns)}, last_id, last_session_id, latest_genome_json, updated_at)
+                       VALUES (?, ?, ?, {', '.join('?' * len(stat_columns))}, ?, ?, ?, CURRENT_TIMESTAMP)
+                       ''', (level_id, is_human, runs + len(level_rows), *stats, level_rows[-1]["id"],
+                             level_rows[-1]["session_id"], genome))
+
+    for session_id, session_rows in by_session.items():
+        levels = [row["level_id"] for row in session_rows]
+        cursor.execute('''
+                       INSERT INTO evolution_session_stats
+                       (session_id, is_human, runs, win_rate_mean, lives_lost, timeouts, min_level, max_level,
+                        first_id, last_id, started_at, ended_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (session_id) DO UPDATE SET
+                           win_rate_mean = (win_rate_mean * runs + excluded.win_rate_mean * excluded.runs) / (runs + excluded.runs),
+                           runs = runs + excluded.runs,
+                           lives_lost = lives_lost + excluded.lives_lost,
+                           timeouts = timeouts + excluded.timeouts,
+                           min_level = MIN(min_level, excluded.min_level),
+                           max_level = MAX(max_level, excluded.max_level),
+                           last_id = excluded.last_id,
+                           ended_at = excluded.ended_at
+                       ''', (session_id, bool(session_rows[0]["is_human"]), len(session_rows),
+                             sum(float(row["win_rate"] or 0) for row in session_rows) / len(session_rows),
+                             sum(int(row["lives_lost"] or 0) for row in session_rows),
+                             sum(int(row["timeouts"] or 0) for row in session_rows),
+                             min(levels), max(levels), session_rows[0]["id"], session_rows[-1]["id"],
+                             session_rows[0]["timestamp"], session_rows[-1]["timestamp"]))
+
+    cursor.execute('''
+                   UPDATE evolution_totals SET runs = runs + ?, last_id = ?, last_level_id = ?, last_session_id = ?,
+                                               updated_at = CURRENT_TIMESTAMP
+                   WHERE id = 1
+                   ''', (len(rows), rows[-1]["id"], rows[-1]["level_id"], rows[-1]["session_id"]))
+
+def update_rollups(cursor, rows: Optional[list] = None) -> int:
+    """
+    Agrega as linhas da evolution com id > last_id (em blocos de ROLLUP_CHUNK). Assinatura de
+    after_insert: rows (as linhas do executemany) é ignorado, o que conta é o last_id gravado.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'evolution'")
+    if cursor.fetchone() is None:
+        return 0
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(evolution)").fetchall()}
+    genome = "genome_json" if "genome_json" in columns else "NULL AS genome_json"
+
+    total = 0
+    while True:
+        last_id = cursor.execute("SELECT last_id FROM evolution_totals WHERE id = 1").fetchone()[0]
+        cursor.execute(f'''
+                       SELECT id, session_id, timestamp, level_id, is_human, win_rate, lives_lost, timeouts, {genome}
+                       FROM evolution WHERE id > ? ORDER BY id ASC LIMIT ?
+                       ''', (last_id, ROLLUP_CHUNK))
+        names = [description[0] for description in cursor.description]
+        chunk = [dict(zip(names, row)) for row in cursor.fetchall()]
+        if not chunk:
+            return total
+        _apply_chunk(cursor, chunk)
+        total += len(chunk)
+
+def rebuild_rollups(db_path: str) -> int:
+    """Apaga os agregados e volta a calculá-los a partir do histórico completo (uma transação)."""
+    init_rollups(db_path)
+    with transaction(db_path) as cursor:
+        cursor.execute("DELETE FROM evolution_level_stats")
+        cursor.execute("DELETE FROM evolution_session_stats")
+        cursor.execute("UPDATE evolution_totals SET runs = 0, last_id = 0, last_level_id = NULL, last_session_id = NULL")
+        return update_rollups(cursor)
+
+# ==========================================
+# LEITURAS (O(1) por linha devolvida)
+# ==========================================
+def get_totals(db_path: str) -> dict:
+    """{"runs", "last_id", "last_level_id", "last_session_id", "updated_at"}"""
+    if not os.path.exists(db_path):
+        return {"runs": 0, "last_id": 0, "last_level_id": None, "last_session_id": None, "updated_at": None}
+
+    init_rollups(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute("SELECT runs, last_id, last_level_id, last_session_id, updated_at FROM evolution_totals WHERE id = 1")
+        names = [description[0] for description in cursor.description]
+        return dict(zip(names, cursor.fetchone()))
+
+def get_level_stats(db_path: str, is_human: Optional[bool] = None, include_genome: bool = False) -> list:
+    """Um dict por (nível, jogador) com média e variância amostral de cada métrica."""
+    if not os.path.exists(db_path):
+        return []
+
+    init_rollups(db_path)
+    stat_columns = [f"{metric}_{part}" for metric in ROLLUP_METRICS for part in ("mean", "m2")]
+    sql = (f"SELECT level_id, is_human, runs, {', '.join(stat_columns)}, last_id, last_session_id, latest_genome_json "
+           f"FROM evolution_level_stats")
+    params = ()
+    if is_human is not None:
+        sql += " WHERE is_human = ?"
+        params = (bool(is_human),)
+    with reading(db_path) as cursor:
+        rows = cursor.execute(sql + " ORDER BY level_id, is_human", params).fetchall()
+
+    stats = []
+    for row in rows:
+        level_id, human, runs = row[0], bool(row[1]), row[2]
+        entry = {"level_id": level_id, "is_human": human, "runs": runs, "last_id": row[-3], "last_session_id": row[-2]}
+        for i, metric in enumerate(ROLLUP_METRICS):
+            mean, m2 = row[3 + 2 * i], row[4 + 2 * i]
+            entry[f"{metric}_mean"] = round(mean, 4)
+            entry[f"{metric}_var"] = round(m2 / (runs - 1), 6) if runs > 1 else 0.0
+        if include_genome:
+            entry["latest_genome"] = json.loads(row[-1]) if row[-1] else None
+        stats.append(entry)
+    return stats
+
+def get_session_stats(db_path: str, limit: int = 20, cursor: Optional[int] = None) -> dict:
+    """Sessões mais recentes primeiro, paginadas pelo last_id: {"data": [...], "next_cursor": last_id ou None}."""
+    if not os.path.exists(db_path):
+        return {"data": [], "next_cursor": None}
+
+    init_rollups(db_path)
+    sql = "SELECT * FROM evolution_session_stats"
+    params = []
+    if cursor is not None:
+        sql += " WHERE last_id < ?"
+        params.append(int(cursor))
+    sql += " ORDER BY last_id DESC LIMIT ?"
+    params.append(int(limit) + 1)
+    with reading(db_path) as db_cursor:
+        db_cursor.execute(sql, params)
+        names = [description[0] for description in db_cursor.description]
+        rows = [dict(zip(names, row)) for row in db_cursor.fetchall()]
+
+    for row in rows:
+        row["is_human"] = bool(row["is_human"])
+        row["win_rate_mean"] = round(row["win_rate_mean"], 4)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"data": rows, "next_cursor": rows[-1]["last_id"] if has_more else None}
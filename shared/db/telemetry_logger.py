@@ -0,0 +1,47 @@
+import json
+import os
+
+from shared.db.connection import ensure_schema, reading, transaction
+
+def init_telemetry_db(db_path: str):
+    """Cria a tabela de eventos da telemetria do Unity (uma linha por evento do log)."""
+    def create(cursor):
+        cursor.execute('''
+                       CREATE TABLE IF NOT EXISTS sim_events (
+                                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                     run_id TEXT,
+                                     ts REAL,
+                                     kind TEXT,
+                                     level_id INTEGER,
+                                     attempt INTEGER,
+                                     data_json TEXT
+                       )
+                       ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sim_events_run ON sim_events (run_id, id)")
+
+    ensure_schema(db_path, "sim_events", create)
+
+def log_events(db_path: str, run_id: str, events: list):
+    """Grava um lote de TelemetryEvents numa só transação."""
+    if not events:
+        return
+
+    init_telemetry_db(db_path)
+    with transaction(db_path) as cursor:
+        cursor.executemany('''
+                           INSERT INTO sim_events (run_id, ts, kind, level_id, attempt, data_json)
+                           VALUES (?, ?, ?, ?, ?, ?)
+                           ''', [(run_id, e.ts, e.kind, e.level_id, e.attempt, json.dumps(e.data)) for e in events])
+
+def load_run_events(db_path: str, run_id: str) -> list:
+    """Eventos de uma run por ordem de chegada (dicts), para reconstruir relatórios depois do facto."""
+    if not os.path.exists(db_path):
+        return []
+
+    init_telemetry_db(db_path)
+    with reading(db_path) as cursor:
+        cursor.execute("SELECT ts, kind, level_id, attempt, data_json FROM sim_events WHERE run_id = ? ORDER BY id", (run_id,))
+        rows = cursor.fetchall()
+
+    return [{"ts": ts, "kind": kind, "level_id": level_id, "attempt": attempt, "data": json.loads(data_json)}
+            for ts, kind, level_id, attempt, data_json in rows]
@@ -0,0 +1,200 @@
+import glob
+import gzip
+import os
+import time
+from collections import deque
+from typing import List, Optional
+
+from rich import print
+
+# ==========================================
+# 🚨 SINK DOS LOGS DO UNITY (BAIXO OVERHEAD)
+# ==========================================
+# As linhas cruas vão direto para um ficheiro por run (rodado por tamanho, opcionalmente gzip).
+# Em memória fica só um ring buffer para dar contexto aos erros; a consola recebe um resumo
+# limitado no tempo em vez de um rich.print por linha.
+#   console: "summary" (por omissão), "verbose" (uma linha colorida por linha do log) ou "quiet" (nada)
+# Retenção por run: a primeira parte (arranque, sementes, primeiros níveis) fica sempre, mais as
+# últimas "backups" partes rodadas; só as partes do meio são apagadas quando o log cresce demais.
+DEFAULT_LOG_SINK = {"console": "summary", "compress": False, "max_mb": 20, "backups": 3, "ring_lines": 200,
+                    "summary_seconds": 2.0, "max_errors_per_summary": 5, "keep_files": 60}
+
+RUNS_DIRNAME = "sim_runs"
+
+
+def log_sink_settings(config: dict) -> dict:
+    return {**DEFAULT_LOG_SINK, **config.get("simulation", {}).get("log", {})}
+
+def _is_error(line: str) -> bool:
+    return "Exception" in line or "Error" in line or "Crash" in line
+
+
+class SimulationLogSink:
+    """
+    write(linha) por cada linha do stdout; também é subscritor da telemetria (nível/tentativa
+    atuais para o resumo). close() fecha o ficheiro e devolve as partes da run (pode ser chamado mais de uma vez).
+    """
+
+    def __init__(self, log_dir: str, label: str = "main", settings: Optional[dict] = None, tag: str = ""):
+        self.settings = {**DEFAULT_LOG_SINK, **(settings or {})}
+        self.console = self.settings["console"]
+        self.tag = tag
+        self.label = label
+
+        self.log_dir = log_dir
+        self.runs_dir = os.path.join(log_dir, RUNS_DIRNAME)
+        os.makedirs(self.runs_dir, exist_ok=True)
+        suffix = ".log.gz" if self.settings["compress"] else ".log"
+        self.suffix = suffix
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.base_path = os.path.join(self.runs_dir, f"{stamp}_{label}")
+        n = 1
+        while glob.glob(f"{self.base_path}*"):
+            n += 1
+            self.base_path = os.path.join(self.runs_dir, f"{stamp}_{label}_{n}")
+        self.max_bytes = int(float(self.settings["max_mb"]) * 1024 * 1024)
+
+        self.ring = deque(maxlen=int(self.settings["ring_lines"]))
+        self.part = 0
+        self.parts = []
+        self.dropped_parts = 0
+        self._closed = False
+        self._bytes = 0
+        self._fh = None
+        self._open_part()
+
+        self.lines = 0
+        self.errors = 0
+        self.level_id = None
+        self.attempt = 0
+        self.wins = 0
+        self.levels_done = 0
+        self._errors_shown = 0
+        self._errors_suppressed = 0
+        self._last_summary = time.monotonic()
+        self._prune()
+
+    # ---------- ficheiro ----------
+    def _open_part(self):
+        path = f"{self.base_path}{'' if self.part == 0 else f'.{self.part}'}{self.suffix}"
+        if self.settings["compress"]:
+            # compresslevel baixo: o objetivo é não travar o leitor, não poupar o último byte
+            self._fh = gzip.open(path, "wt", encoding="utf-8", compresslevel=3)
+        else:
+            self._fh = open(path, "w", encoding="utf-8", buffering=1 << 16)
+        self.parts.append(path)
+        self._bytes = 0
+
+    def _rotate(self):
+        self._fh.close()
+        self.part += 1
+        self._open_part()
+        # A primeira parte fica sempre (é onde está o arranque da run); das rodadas ficam as últimas "backups"
+        while len(self.parts) > int(self.settings["backups"]) + 2:
+            old = self.parts.pop(1)
+            self.dropped_parts += 1
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.runs_dir, "*.log*")), key=os.path.getmtime)
+        for old in files[:max(0, len(files) - int(self.settings["keep_files"]))]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    # ---------- linhas ----------
+    def write(self, line: str):
+        self._fh.write(line)
+        self._fh.write("\n")
+        self._bytes += len(line) + 1
+        if self._bytes > self.max_bytes:
+            self._rotate()
+
+        self.ring.append(line)
+        self.lines += 1
+
+        if self.console == "verbose":
+            self._render_line(line)
+        elif _is_error(line):
+            self.errors += 1
+            if self.console != "quiet":
+                if self._errors_shown < int(self.settings["max_errors_per_summary"]):
+                    self._errors_shown += 1
+                    print(f"[bold red]  [{self.tag}UNITY][/bold red] {line}")
+                else:
+                    self._errors_suppressed += 1
+
+        if self.console == "summary":
+            now = time.monotonic()
+            if now - self._last_summary >= float(self.settings["summary_seconds"]):
+                self._print_summary(now)
+
+    def _render_line(self, line: str):
+        # Modo verbose: o render antigo, linha a linha
+        if _is_error(line):
+            self.errors += 1
+            print(f"[bold red]  [{self.tag}UNITY][/bold red] {line}")
+        elif "[ROUND STATS]" in line:
+            print(f"[bold cyan]  📊 {self.tag}{line.split('[ROUND STATS]')[-1].strip()}[/bold cyan]")
+        elif "Warning" in line:
+            print(f"[yellow]  [{self.tag}UNITY][/yellow] {line}")
+        elif "BOT" in line or "A iniciar Nível" in line:
+            print(f"[bold green]  [{self.tag}BOT][/bold green] {line}")
+        else:
+            print(f"[dim]  [{self.tag}UNITY] {line}[/dim]")
+
+    def _print_summary(self, now: float):
+        self._last_summary = now
+        suppressed = f" | +{self._errors_suppressed} erros omitidos" if self._errors_suppressed else ""
+        level = f"nível {self.level_id} (tentativa {self.attempt})" if self.level_id is not None else "a arrancar"
+        print(f"[dim]  📡 {self.tag}{level} | {self.levels_done} níveis concluídos | {self.wins} vitórias | "
+              f"{self.lines} linhas | {self.errors} erros{suppressed}[/dim]")
+        self._errors_shown = 0
+        self._errors_suppressed = 0
+
+    # ---------- subscritor da telemetria ----------
+    def __call__(self, event):
+        if event.level_id is not None:
+            self.level_id = event.level_id
+        if event.attempt is not None:
+            self.attempt = event.attempt
+        if event.kind == "round_result" and event.data.get("win"):
+            self.wins += 1
+        elif event.kind == "level_report":
+            self.levels_done += 1
+            if self.console == "summary":
+                rep = event.data["report"]
+                print(f"[cyan]  📊 {self.tag}Nível {rep['level_id']}: {rep['wins']}/{rep.get('total_rounds', 0)} vitórias, "
+                      f"{rep.get('lives_lost', 0)} vidas perdidas, {rep.get('timeouts', 0)} timeouts[/cyan]")
+
+    # ---------- fim ----------
+    def tail(self, n: Optional[int] = None) -> str:
+        lines = list(self.ring)
+        return "\n".join(lines if n is None else lines[-n:])
+
+    def close(self) -> List[str]:
+        """Fecha a run, grava o latest_simulation*.log (cauda + partes da run) e devolve as partes, por ordem."""
+        if self._closed:
+            return list(self.parts)
+        self._closed = True
+        if self._fh and not self._fh.closed:
+            self._fh.close()
+
+        latest_name = "latest_simulation.log" if self.label == "main" else f"latest_simulation_{self.label}.log"
+        with open(os.path.join(self.log_dir, latest_name), "w", encoding="utf-8") as f_log:
+            f_log.write("=== LOG DA ÚLTIMA SIMULAÇÃO DO BOT ===\n")
+            f_log.write(f"Log completo: {', '.join(self.parts)}\n")
+            if self.dropped_parts:
+                f_log.write(f"Partes intermédias removidas pela rotação: {self.dropped_parts}\n")
+            f_log.write(f"Linhas: {self.lines} | Erros: {self.errors} | Últimas {len(self.ring)} linhas:\n\n")
+            f_log.write(self.tail())
+            f_log.write("\n\n=== FIM DA SIMULAÇÃO ===")
+
+        if self.console == "summary":
+            parts = f" (+{len(self.parts) - 1} partes)" if len(self.parts) > 1 else ""
+            print(f"[dim]  🗂️ {self.tag}{self.lines} linhas do Unity ({self.errors} erros) em {self.parts[0]}{parts}[/dim]")
+        return list(self.parts)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, List
+
+# Campos do LevelReport (GameManager.cs) que são contagens e podem ser somados
+SUM_FIELDS = ("total_rounds", "wins", "lives_lost", "timeouts", "collected_coins", "collected_crystals", "powerups_used")
+
+
+def merge_level_reports(reports: List[dict]) -> List[dict]:
+    """
+    Junta vários LevelReports (de várias instâncias ou de repetições do mesmo nível) num
+    único relatório por nível. O win_rate é recalculado a partir de wins / total_rounds
+    para ficar corretamente ponderado pelo número de tentativas de cada relatório.
+    """
+    merged: Dict[int, dict] = {}
+    time_weight: Dict[int, float] = {}
+
+    for rep in reports:
+        level_id = rep.get("level_id")
+        if level_id is None:
+            continue
+
+        acc = merged.setdefault(level_id, {"level_id": level_id, **{k: 0 for k in SUM_FIELDS}, "time_to_win": 0.0})
+        # Relatórios antigos sem total_rounds contam como uma tentativa
+        rounds = int(rep.get("total_rounds", 0)) or 1
+        wins = int(rep.get("wins", round(float(rep.get("win_rate", 0.0)) * rounds)))
+
+        acc["total_rounds"] += rounds
+        acc["wins"] += wins
+        for field in SUM_FIELDS[2:]:
+            acc[field] += int(rep.get(field, 0))
+
+        time_weight[level_id] = time_weight.get(level_id, 0.0) + float(rep.get("time_to_win", 0.0)) * wins
+
+    for level_id, acc in merged.items():
+        acc["win_rate"] = round(acc["wins"] / acc["total_rounds"], 4) if acc["total_rounds"] else 0.0
+        acc["time_to_win"] = round(time_weight[level_id] / acc["wins"], 2) if acc["wins"] else 0.0
+
+    return [merged[k] for k in sorted(merged)]
+
+
+def merge_campaign_metrics(metrics_list: List[dict]) -> dict:
+    """Agrega vários metrics.json (um por instância do jogo) num único dicionário de métricas."""
+    all_reports = [rep for m in metrics_list for rep in m.get("level_reports", [])]
+    completed = [bool(m.get("campaign_completed", False)) for m in metrics_list]
+    bottlenecks = [m.get("bottleneck_level") for m in metrics_list if not m.get("campaign_completed") and m.get("bottleneck_level")]
+
+    return {
+        "campaign_completed": any(completed),
+        "bottleneck_level": Counter(bottlenecks).most_common(1)[0][0] if bottlenecks else 0,
+        "is_human": any(m.get("is_human", False) for m in metrics_list),
+        "instances": len(metrics_list),
+        "completed_instances": sum(completed),
+        "recovered_instances": sum(bool(m.get("recovered_from_log")) for m in metrics_list),
+        "level_reports": merge_level_reports(all_reports),
+    }
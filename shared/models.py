@@ -59,4 +59,9 @@ class GameEvolutionRequest(BaseModel):
     config: dict
     metrics: dict
     current_genome: LevelGenomeModel
-    is_human: bool = False
\ No newline at end of file
+    is_human: bool = False
+
+class SurrogatePredictRequest(BaseModel):
+    genome: dict
+    is_human: bool = False
+    agent_speed: float = 5.0
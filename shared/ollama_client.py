@@ -1,15 +1,202 @@
 from __future__ import annotations
+import json
+import os
+import random
+import threading
+import time
 import requests
-from typing import Any, Dict
-
-def chat(host: str, model: str, messages, options: Dict[str, Any]):
-    url = f"{host}/api/chat"
-    payload = {
-        "model": model,
-        "messages": messages,
-        "stream": False,
-        "options": options or {}
-    }
-    r = requests.post(url, json=payload, timeout=180)
-    r.raise_for_status()
-    return r.json()
\ No newline at end of file
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Optional
+
+# Códigos HTTP que justificam nova tentativa (modelo a carregar, servidor ocupado...)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class OllamaClient:
+    """
+    Cliente HTTP persistente para o Ollama: uma requests.Session com pool de ligações keep-alive,
+    política de keep_alive do modelo, timeouts por chamada e retries com backoff exponencial.
+    """
+
+    def __init__(self, host: str, keep_alive: str = "30m", connect_timeout: float = 5.0, read_timeout: float = 180.0,
+                 retries: int = 2, backoff: float = 1.0, pool_size: int = 8):
+        self.host = host.rstrip("/")
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None, stream: bool = False) -> requests.Response:
+        url = f"{self.host}{path}"
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            try:
+                r = self.session.post(url, json=payload, timeout=(self.connect_timeout, timeout or self.read_timeout), stream=stream)
+                if r.status_code not in RETRY_STATUS or attempt == self.retries:
+                    if not r.ok:
+                        r.close()
+                    r.raise_for_status()
+                    return r
+                last_error = requests.HTTPError(f"{r.status_code} from {url}", response=r)
+                # Com stream=True a ligação só volta ao pool depois de lida ou fechada
+                r.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                if attempt == self.retries:
+                    raise
+
+            # Backoff exponencial com jitter para não martelar um Ollama a carregar o modelo
+            time.sleep(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff / 2))
+
+        raise last_error
+
+    def chat(self, model: str, messages, options: Dict[str, Any] = None, timeout: Optional[float] = None) -> dict:
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": options or {}
+        }
+        return self._post("/api/chat", payload, timeout).json()
+
+    def chat_stream(self, model: str, messages, options: Dict[str, Any] = None, timeout: Optional[float] = None,
+                    on_progress: Optional[Callable[[dict], None]] = None, stop_on_json: bool = True) -> dict:
+        """
+        Pede a resposta em streaming (NDJSON). Com stop_on_json, corta a geração assim que o primeiro
+        objeto JSON de topo fecha e é parseável (o Ollama pára de gerar quando a ligação é fechada).
+        Devolve o mesmo formato do chat() normal, com "early_stop" a indicar se houve corte.
+        """
+        from shared.planning import JsonStreamScanner
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": options or {}
+        }
+        scanner = JsonStreamScanner() if stop_on_json else None
+        parts = []
+        chunks = 0
+        chars = 0
+        done = False
+        early_stop = False
+        start = time.perf_counter()
+
+        r = self._post("/api/chat", payload, timeout, stream=True)
+        try:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                piece = event.get("message", {}).get("content", "")
+                parts.append(piece)
+                chunks += 1
+                chars += len(piece)
+
+                found = scanner.feed(piece) if scanner else None
+                done = bool(event.get("done"))
+
+                if on_progress:
+                    on_progress({"model": model, "chunks": chunks, "chars": chars,
+                                 "elapsed": round(time.perf_counter() - start, 2),
+                                 "json_depth": scanner.depth if scanner else None, "done": done or found is not None})
+
+                if found is not None:
+                    early_stop = not done
+                    break
+                if done:
+                    break
+        finally:
+            r.close()
+
+        return {"model": model, "message": {"role": "assistant", "content": "".join(parts)}, "done": True, "early_stop": early_stop}
+
+    def warm_up(self, model: str) -> float:
+        """Carrega o modelo em memória (pedido sem prompt) e devolve o tempo que demorou em segundos."""
+        start = time.perf_counter()
+        self._post("/api/generate", {"model": model, "keep_alive": self.keep_alive})
+        return time.perf_counter() - start
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS: Dict[str, OllamaClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(host: str, config: Optional[dict] = None) -> OllamaClient:
+    """
+    Devolve o cliente partilhado para este host (um por processo).
+    Na primeira chamada com config, usa a secção ollama do config.yaml para keep_alive, timeouts e retries.
+    """
+    key = host.rstrip("/")
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            ollama_config = (config or {}).get("ollama", {})
+            timeouts = ollama_config.get("timeouts", {})
+            _CLIENTS[key] = OllamaClient(
+                host,
+                keep_alive=ollama_config.get("keep_alive", "30m"),
+                connect_timeout=float(timeouts.get("connect", 5)),
+                read_timeout=float(timeouts.get("read", 180)),
+                retries=int(ollama_config.get("retries", 2)),
+                backoff=float(ollama_config.get("retry_backoff", 1.0)),
+                pool_size=max(8, int((config or {}).get("director", {}).get("concurrency", 4)) * 2),
+            )
+        return _CLIENTS[key]
+
+
+def chat(host: str, model: str, messages, options: Dict[str, Any], timeout: Optional[float] = None,
+         stream: bool = False, on_progress: Optional[Callable[[dict], None]] = None):
+    client = get_client(host)
+    if stream:
+        return client.chat_stream(model, messages, options, timeout=timeout, on_progress=on_progress)
+    return client.chat(model, messages, options, timeout=timeout)
+
+
+# ==========================================
+# PROGRESSO DOS PEDIDOS EM STREAMING (lido pelo Dashboard)
+# ==========================================
+_PROGRESS_LOCK = threading.Lock()
+
+
+def file_progress_callback(path: str, label: str, min_interval: float = 0.5) -> Callable[[dict], None]:
+    """
+    Cria um callback on_progress que grava o estado do pedido em path (um JSON {label: progresso}),
+    no máximo a cada min_interval segundos. O servidor é outro processo, por isso partilhamos via ficheiro.
+    """
+    last_write = [0.0]
+
+    def _callback(progress: dict):
+        now = time.time()
+        if not progress.get("done") and now - last_write[0] < min_interval:
+            return
+        last_write[0] = now
+
+        with _PROGRESS_LOCK:
+            state = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        state = json.load(f)
+                except Exception:
+                    state = {}
+            state[label] = {**progress, "updated_at": now}
+
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+
+    return _callback
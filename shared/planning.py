@@ -1,27 +1,25 @@
 from __future__ import annotations
+import os
 import re
 import json
 from typing import Optional, Tuple, List
 
-from shared.ollama_client import chat
+from shared.db.llm_cache import cached_chat, get_cache_settings
+from shared.ollama_client import file_progress_callback
 
 
-def extract_first_json_object(text: str) -> Optional[dict]:
-    """Extract first valid JSON object, removing single-line comments."""
-    if not text:
-        return None
-    text_clean = re.sub(r'//.*', '', text)
-    try:
-        obj = json.loads(text_clean)
-        if isinstance(obj, dict):
-            return obj
-    except Exception:
-        pass
+def _strip_comments(text: str) -> str:
+    return re.sub(r'//.*', '', text)
+
 
-    # Lógica de profundidade (Depth) para encontrar o objeto em texto sujo
+def _first_object(text_clean: str) -> Tuple[bool, Optional[dict]]:
+    """
+    Primeiro objeto de topo (chavetas equilibradas, fora de strings) do texto sem comentários.
+    Devolve (fechou, objeto): (False, None) enquanto não fecha; (True, None) se fechou mas não é JSON válido.
+    """
     start = text_clean.find("{")
     if start < 0:
-        return None
+        return False, None
 
     depth = 0
     in_str = False
@@ -40,12 +38,63 @@ def extract_first_json_object(text: str) -> Optional[dict]:
         elif ch == "}":
             depth -= 1
             if depth == 0:
-                candidate = text_clean[start : i + 1]
                 try:
-                    return json.loads(candidate)
+                    obj = json.loads(text_clean[start : i + 1])
                 except Exception:
-                    return None
-    return None
+                    return True, None
+                return True, obj if isinstance(obj, dict) else None
+    return False, None
+
+
+def extract_first_json_object(text: str) -> Optional[dict]:
+    """Extract first valid JSON object, removing single-line comments."""
+    if not text:
+        return None
+    text_clean = _strip_comments(text)
+    try:
+        obj = json.loads(text_clean)
+        if isinstance(obj, dict):
+            return obj
+    except Exception:
+        pass
+
+    # Lógica de profundidade (Depth) para encontrar o objeto em texto sujo.
+    # Regra única com o JsonStreamScanner: só conta o primeiro objeto (se não for válido, não há objeto)
+    return _first_object(text_clean)[1]
+
+
+def has_json_object(resp: dict) -> bool:
+    """Validação para o cached_chat: só vale a pena guardar respostas com um objeto JSON extraível."""
+    return extract_first_json_object((resp or {}).get("message", {}).get("content", "")) is not None
+
+
+class JsonStreamScanner:
+    """
+    Versão incremental do extract_first_json_object para respostas em streaming, com a mesma regra:
+    feed() recebe pedaços de texto e devolve o primeiro objeto JSON de topo assim que as chavetas
+    fecham e é parseável (None enquanto não há objeto completo). Se o primeiro objeto fechar mas não
+    for válido, o scanner desiste (tal como o extract_first_json_object devolve None) e a resposta
+    segue até ao fim para a validação normal.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.depth = 0  # profundidade aproximada (só para o progresso)
+        self.closed = False
+        self.result: Optional[dict] = None
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        if self.closed or not chunk:
+            return self.result
+
+        self.text += chunk
+        self.depth = max(0, self.depth + chunk.count("{") - chunk.count("}"))
+        if "}" not in chunk:
+            return None
+
+        # Os comentários // vão até ao fim da linha, por isso o prefixo limpo é sempre prefixo do texto final limpo
+        self.closed, self.result = _first_object(_strip_comments(self.text))
+        return self.result
 
 
 def build_plan_request(
@@ -117,7 +166,7 @@ def request_plan(
         previous_plan_raw=previous_plan_raw,
     )
 
-    resp = chat(
+    resp = cached_chat(
         host=config["ollama"]["host"],
         model=config["ollama"]["model"],
         messages=messages,
@@ -126,6 +175,12 @@ def request_plan(
             "top_p": config["ollama"]["top_p"],
             "num_ctx": config["ollama"]["num_ctx"],
         },
+        cache=get_cache_settings(config),
+        stream=config["ollama"].get("stream", True),
+        on_progress=file_progress_callback(
+            os.path.join(config.get("paths", {}).get("logs", "workspace/logs"), "llm_progress.json"), "Planner"
+        ),
+        validate=has_json_object,
     )
 
     content = resp["message"]["content"]
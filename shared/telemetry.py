@@ -0,0 +1,334 @@
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from rich import print
+
+# ==========================================
+# 🚨 TELEMETRIA ESTRUTURADA DO LOG DO UNITY
+# ==========================================
+# Cada linha do stdout do QA Bot vira eventos tipados à medida que chega. Os subscritores
+# (base de dados, dashboard, política de abort) recebem-nos em tempo real e, se o metrics.json
+# não aparecer (crash, kill), os level_reports são reconstruídos a partir dos eventos.
+EVENT_KINDS = ("level_start", "round_result", "damage", "timeout", "level_report", "game_over", "error", "watchdog")
+
+_NUM = r"(-?\d+(?:[.,]\d+)?)"
+LEVEL_START_RE = re.compile(r"A iniciar Nível (\d+) \| Semente Ativa: (-?\d+) \| Obstáculos: (\d+)")
+ROUND_STATS_RE = re.compile(r"\[ROUND STATS\] Nível: (\d+) \| Tentativa: (\d+) \| Resultado: (\w+) \| Tempo: " + _NUM + r"s \| Moedas: (\d+)")
+DAMAGE_RE = re.compile(r"\[DAMAGE\] Nível: (\d+) \| Tentativa: (\d+) \| Motivo: (.*?) \| Vidas: (-?\d+) \| Tempo: " + _NUM + "s")
+GAME_OVER_RE = re.compile(r"\[BOT\] Game Over no Nível (\d+)")
+REPORT_HEADER_RE = re.compile(r"\[📊 METRICS REPORT\] Nível (\d+) Concluído!")
+
+# Linhas "↳ ..." do bloco METRICS REPORT (um Debug.Log com várias linhas)
+REPORT_FIELDS_RE = [
+    (re.compile(r"Tentativas: (\d+) \| Win Rate: " + _NUM), ("total_rounds", "win_rate")),
+    (re.compile(r"Tempo de Fuga: " + _NUM + r"s \| Timeouts: (\d+)"), ("time_to_win", "timeouts")),
+    (re.compile(r"Vidas Perdidas: (\d+)"), ("lives_lost",)),
+    (re.compile(r"Dinheiro: (\d+) Moedas \| (\d+) Cristais"), ("collected_coins", "collected_crystals")),
+    (re.compile(r"Powerups Usados: (\d+)"), ("powerups_used",)),
+]
+INT_FIELDS = ("total_rounds", "timeouts", "lives_lost", "collected_coins", "collected_crystals", "powerups_used")
+
+
+def _number(text: str) -> float:
+    # O Unity formata com a cultura do sistema (pt-PT usa vírgula decimal)
+    return float(text.replace(",", "."))
+
+
+@dataclass
+class TelemetryEvent:
+    kind: str
+    level_id: Optional[int] = None
+    attempt: Optional[int] = None
+    data: Dict = field(default_factory=dict)
+    ts: float = field(default_factory=time.time)
+
+
+class UnityLogParser:
+    """Máquina de estados linha a linha (o bloco METRICS REPORT ocupa várias linhas)."""
+
+    def __init__(self):
+        self.current_level = None
+        self.current_attempt = 0
+        self._report = None
+        # Vitórias contadas nas linhas [ROUND STATS] do nível atual (o Win Rate do relatório vem arredondado a F2)
+        self._round_wins = {}
+
+    def feed(self, line: str) -> List[TelemetryEvent]:
+        line = line.strip()
+        if not line:
+            return []
+
+        events = []
+        if self._report is not None:
+            if line.startswith("↳"):
+                self._parse_report_line(line)
+                return []
+            events.append(self._close_report())
+
+        m = LEVEL_START_RE.search(line)
+        if m:
+            level_id = int(m.group(1))
+            if level_id != self.current_level:
+                self._round_wins.pop(level_id, None)
+            self.current_attempt = self.current_attempt + 1 if level_id == self.current_level else 1
+            self.current_level = level_id
+            events.append(TelemetryEvent("level_start", level_id, self.current_attempt,
+                                         {"seed": int(m.group(2)), "obstacles": int(m.group(3))}))
+            return events
+
+        m = ROUND_STATS_RE.search(line)
+        if m:
+            event = TelemetryEvent("round_result", int(m.group(1)), int(m.group(2)), {
+                "result": m.group(3), "win": m.group(3).upper().startswith("VIT"),
+                "time": _number(m.group(4)), "coins": int(m.group(5))})
+            self._round_wins[event.level_id] = self._round_wins.get(event.level_id, 0) + int(event.data["win"])
+            events.append(event)
+            return events
+
+        m = DAMAGE_RE.search(line)
+        if m:
+            reason = m.group(3)
+            kind = "timeout" if "TEMPO" in reason.upper() else "damage"
+            events.append(TelemetryEvent(kind, int(m.group(1)), int(m.group(2)), {
+                "reason": reason, "lives": int(m.group(4)), "time": _number(m.group(5))}))
+            return events
+
+        m = REPORT_HEADER_RE.search(line)
+        if m:
+            self._report = {"level_id": int(m.group(1))}
+            return events
+
+        m = GAME_OVER_RE.search(line)
+        if m:
+            events.append(TelemetryEvent("game_over", int(m.group(1)), self.current_attempt))
+            return events
+
+        if "Exception" in line or "Crash" in line:
+            events.append(TelemetryEvent("error", self.current_level, self.current_attempt, {"line": line[:500]}))
+        return events
+
+    def flush(self) -> List[TelemetryEvent]:
+        """Fecha um bloco METRICS REPORT pendente (fim do stdout)."""
+        return [self._close_report()] if self._report is not None else []
+
+    def _parse_report_line(self, line: str):
+        for regex, names in REPORT_FIELDS_RE:
+            m = regex.search(line)
+            if m:
+                for name, value in zip(names, m.groups()):
+                    self._report[name] = int(value) if name in INT_FIELDS else _number(value)
+                return
+
+    def _close_report(self) -> TelemetryEvent:
+        report, self._report = self._report, None
+        # Cada vitória fecha o nível, por isso um relatório tem no máximo uma; sem linhas [ROUND STATS]
+        # (log cortado) conta-se a partir do Win Rate, nunca de win_rate * rounds (o F2 arredonda 1/3 para 0,33)
+        wins = self._round_wins.pop(report["level_id"], None)
+        report["wins"] = wins if wins is not None else int(float(report.get("win_rate", 0.0)) > 0)
+        return TelemetryEvent("level_report", report["level_id"], int(report.get("total_rounds", 0)), {"report": report})
+
+
+class TelemetryBus:
+    """Publica cada evento para todos os subscritores; um subscritor com erro nunca pára a simulação."""
+
+    def __init__(self, subscribers: Optional[List[Callable[[TelemetryEvent], None]]] = None):
+        self.subscribers = list(subscribers or [])
+        self._failed = set()
+
+    def subscribe(self, subscriber: Callable[[TelemetryEvent], None]):
+        self.subscribers.append(subscriber)
+
+    def publish(self, events: List[TelemetryEvent]):
+        for event in events:
+            for subscriber in self.subscribers:
+                if id(subscriber) in self._failed:
+                    continue
+                try:
+                    subscriber(event)
+                except Exception as e:
+                    self._failed.add(id(subscriber))
+                    print(f"[yellow]⚠️ Subscritor de telemetria desligado ({type(subscriber).__name__}): {e}[/yellow]")
+
+    def close(self):
+        for subscriber in self.subscribers:
+            close = getattr(subscriber, "close", None)
+            if close and id(subscriber) not in self._failed:
+                try:
+                    close()
+                except Exception as e:
+                    print(f"[yellow]⚠️ Erro ao fechar subscritor de telemetria: {e}[/yellow]")
+
+
+# ==========================================
+# SUBSCRITORES
+# ==========================================
+class ReportRebuilder:
+    """
+    Reconstrói os level_reports a partir dos eventos. Os blocos METRICS REPORT mandam;
+    sem eles, um nível só entra se ficou resolvido (vitória ou Game Over) antes do crash.
+    """
+
+    def __init__(self):
+        self.reports = {}
+        self.partial = {}
+        self.last_level = None
+
+    def __call__(self, event: TelemetryEvent):
+        if event.level_id is None:
+            return
+        self.last_level = event.level_id
+        if event.kind == "level_report":
+            self.reports[event.level_id] = dict(event.data["report"])
+            return
+
+        level = self.partial.setdefault(event.level_id, {"level_id": event.level_id, "total_rounds": 0, "wins": 0,
+                                                         "time_to_win": 0.0, "lives_lost": 0, "timeouts": 0,
+                                                         "collected_coins": 0, "collected_crystals": 0, "powerups_used": 0,
+                                                         "resolved": False})
+        if event.kind == "level_start":
+            # Tal como o currentLevelAttempts do GameManager: cada arranque do nível é uma tentativa
+            level["total_rounds"] = max(level["total_rounds"], event.attempt or 0)
+        elif event.kind == "round_result":
+            level["collected_coins"] = event.data["coins"]
+            level["resolved"] = True
+            if event.data["win"]:
+                level["wins"] += 1
+                level["time_to_win"] = event.data["time"]
+        elif event.kind in ("damage", "timeout"):
+            level["timeouts" if event.kind == "timeout" else "lives_lost"] += 1
+        elif event.kind == "game_over":
+            level["resolved"] = True
+
+    def level_reports(self) -> List[dict]:
+        reports = dict(self.reports)
+        for level_id, level in self.partial.items():
+            if level_id in reports or not level["resolved"] or level["total_rounds"] <= 0:
+                continue
+            rep = {k: v for k, v in level.items() if k != "resolved"}
+            rep["win_rate"] = round(rep["wins"] / rep["total_rounds"], 4)
+            reports[level_id] = {**rep, "partial": True}
+        return [reports[k] for k in sorted(reports)]
+
+    def metrics(self) -> dict:
+        """Equivalente ao metrics.json, marcado como recuperado do log (nunca conta como campanha completa)."""
+        return {
+            "campaign_completed": False,
+            "bottleneck_level": self.last_level or 0,
+            "is_human": False,
+            "recovered_from_log": True,
+            "level_reports": self.level_reports(),
+        }
+
+
+class DatabaseSubscriber:
+    """Grava os eventos na tabela sim_events em lotes (uma transação por lote)."""
+
+    def __init__(self, db_path: str, run_id: str, batch_size: int = 50):
+        from shared.db.telemetry_logger import init_telemetry_db
+        self.db_path = db_path
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.buffer = []
+        init_telemetry_db(db_path)
+
+    def __call__(self, event: TelemetryEvent):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.batch_size or event.kind in ("level_report", "game_over"):
+            self.flush()
+
+    def flush(self):
+        from shared.db.telemetry_logger import log_events
+        events, self.buffer = self.buffer, []
+        log_events(self.db_path, self.run_id, events)
+
+    close = flush
+
+
+class DashboardSubscriber:
+    """Estado da run em logs/sim_progress.json (lido pelo /dashboard/sim-progress), com escrita limitada."""
+
+    def __init__(self, progress_path: str, label: str, min_interval: float = 0.5):
+        from shared.ollama_client import file_progress_callback
+        self._write = file_progress_callback(progress_path, label, min_interval)
+        self.state = {"level_id": None, "attempt": 0, "wins": 0, "damage": 0, "timeouts": 0, "errors": 0,
+                      "levels_done": 0, "events": 0, "done": False}
+
+    def __call__(self, event: TelemetryEvent):
+        state = self.state
+        state["events"] += 1
+        if event.level_id is not None:
+            state["level_id"] = event.level_id
+        if event.attempt is not None:
+            state["attempt"] = event.attempt
+        if event.kind == "round_result" and event.data.get("win"):
+            state["wins"] += 1
+        elif event.kind in ("damage", "timeout", "error"):
+            state[{"damage": "damage", "timeout": "timeouts", "error": "errors"}[event.kind]] += 1
+        elif event.kind == "level_report":
+            state["levels_done"] += 1
+        elif event.kind == "watchdog":
+            state["watchdog"] = event.data.get("reason")
+        self._write(dict(state))
+
+    def close(self):
+        self.state["done"] = True
+        self._write(dict(self.state))
+
+
+class EarlyAbortPolicy:
+    """
+    Decide se vale a pena matar o Unity antes do fim: um nível preso em tentativas sem fim
+    ou um ciclo de exceções. 0 desliga cada regra.
+    """
+
+    def __init__(self, max_attempts_per_level: int = 0, max_errors: int = 0):
+        self.max_attempts_per_level = max_attempts_per_level
+        self.max_errors = max_errors
+        self.errors = 0
+        self.reason = None
+
+    def __call__(self, event: TelemetryEvent):
+        if self.reason:
+            return
+        if event.kind == "error":
+            self.errors += 1
+            if self.max_errors and self.errors >= self.max_errors:
+                self.reason = f"{self.errors} exceções no log (último nível: {event.level_id})"
+        elif event.kind == "level_start" and self.max_attempts_per_level and event.attempt > self.max_attempts_per_level:
+            self.reason = f"nível {event.level_id} passou de {self.max_attempts_per_level} tentativas"
+
+    @property
+    def should_abort(self) -> bool:
+        return self.reason is not None
+
+
+# ==========================================
+# MONTAGEM A PARTIR DO config.yaml
+# ==========================================
+DEFAULT_TELEMETRY = {"db": True, "dashboard": True, "abort_max_attempts": 0, "abort_max_errors": 25}
+
+
+def telemetry_settings(config: dict) -> dict:
+    """Settings de simulation.telemetry com os caminhos resolvidos (injetado pelo call_tool)."""
+    settings = {**DEFAULT_TELEMETRY, **config.get("simulation", {}).get("telemetry", {})}
+    paths = config.get("paths", {})
+    settings["db_path"] = os.path.join(paths.get("data", "workspace/data"), "evolution.db")
+    settings["progress_path"] = os.path.join(paths.get("logs", "workspace/logs"), "sim_progress.json")
+    return settings
+
+def build_telemetry(settings: Optional[dict], label: str = "main"):
+    """Devolve (parser, bus, rebuilder, abort_policy) prontos a ligar ao leitor do stdout."""
+    settings = {**DEFAULT_TELEMETRY, **(settings or {})}
+    rebuilder = ReportRebuilder()
+    policy = EarlyAbortPolicy(int(settings["abort_max_attempts"]), int(settings["abort_max_errors"]))
+    bus = TelemetryBus([rebuilder, policy])
+
+    run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}"
+    if settings["db"] and settings.get("db_path"):
+        bus.subscribe(DatabaseSubscriber(settings["db_path"], run_id))
+    if settings["dashboard"] and settings.get("progress_path"):
+        bus.subscribe(DashboardSubscriber(settings["progress_path"], label))
+    return UnityLogParser(), bus, rebuilder, policy
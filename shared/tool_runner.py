@@ -158,6 +158,15 @@ def call_tool(name: str, args: dict, config: dict, env_data: Optional[Dict[str,
 
     if name == "run_game_simulation" and "log_dir" not in args:
         args["log_dir"] = config.get("paths", {}).get("logs", "workspace/logs")
+    if name == "run_game_simulation" and "telemetry" not in args:
+        from shared.telemetry import telemetry_settings
+        args["telemetry"] = telemetry_settings(config)
+    if name == "run_game_simulation" and "watchdog" not in args:
+        from shared.watchdog import watchdog_settings
+        args["watchdog"] = watchdog_settings(config)
+    if name == "run_game_simulation" and "log" not in args:
+        from shared.log_sink import log_sink_settings
+        args["log"] = log_sink_settings(config)
 
     res = TOOLS[name](**args)
     return {"ok": res.ok, "output": res.output, "data": res.data}
\ No newline at end of file
@@ -122,14 +122,26 @@ def env_info() -> ToolResult:
     except Exception as e:
         return ToolResult(False, f"env_info error: {e}")
 
-def run_game_simulation(exe_path: str, metrics_path: str, args=None, log_dir: str = "workspace/logs", timeout: int = 120) -> ToolResult:
+def run_game_simulation(exe_path: str, metrics_path: str, args=None, log_dir: str = "workspace/logs", timeout: int = 120,
+                        workers: int = 1, worker_id: Optional[int] = None, telemetry: Optional[dict] = None,
+                        watchdog: Optional[dict] = None, log: Optional[dict] = None) -> ToolResult:
     """
     Executa o jogo Unity em modo Headless, escuta os logs em tempo real,
-    grava-os num ficheiro e lê o metrics.json.
+    grava-os num ficheiro por run (shared/log_sink.py) e lê o metrics.json.
+    Cada linha passa pelo parser de telemetria (shared/telemetry.py): os eventos vão para a BD,
+    o dashboard e a política de abort, e reconstroem os level_reports se o metrics.json faltar.
+    Um watchdog (shared/watchdog.py) mata a árvore de processos se o Unity pendurar.
+    Com workers > 1 lança várias instâncias em paralelo (ver run_simulation_pool).
     """
+    if workers and workers > 1 and worker_id is None:
+        return run_simulation_pool(exe_path, metrics_path, workers, args, log_dir, timeout, telemetry, watchdog, log)
+
     try:
         import subprocess, os, json
         from rich import print
+        from shared.telemetry import TelemetryEvent, build_telemetry
+        from shared.watchdog import DEFAULT_WATCHDOG, SimulationWatchdog, kill_process_tree, popen_group_kwargs
+        from shared.log_sink import DEFAULT_LOG_SINK, SimulationLogSink
 
         if not os.path.exists(exe_path):
             return ToolResult(False, f"Executable not found: {exe_path}")
@@ -142,54 +154,190 @@ def run_game_simulation(exe_path: str, metrics_path: str, args=None, log_dir: st
         if args:
             cmd.extend(args)
 
-        print(f"\n[bold cyan]🚀 A lançar o Unity QA Bot...[/bold cyan]")
-        print(f"[dim]A escutar a telemetria do motor em tempo real (Timeout: {timeout}s)...[/dim]\n")
+        # Em modo pool cada worker mostra só o resumo (nunca linha a linha), com prefixo
+        pooled = worker_id is not None
+        tag = f"W{worker_id} " if pooled else ""
+        label = "main" if worker_id is None else f"w{worker_id}"
+        sink_settings = {**DEFAULT_LOG_SINK, **(log or {})}
+        if pooled and sink_settings["console"] == "verbose":
+            sink_settings["console"] = "summary"
+
+        if not pooled and sink_settings["console"] != "quiet":
+            print(f"\n[bold cyan]🚀 A lançar o Unity QA Bot...[/bold cyan]")
+            dog_settings = {**DEFAULT_WATCHDOG, **(watchdog or {})}
+            print(f"[dim]A escutar a telemetria do motor em tempo real (watchdog: {dog_settings['wall_clock_seconds']}s total, "
+                  f"{dog_settings['stall_seconds']}s sem log, {dog_settings['no_progress_seconds']}s sem progresso)...[/dim]\n")
+
+        parser, bus, rebuilder, abort_policy = build_telemetry(telemetry, label)
+        sink = SimulationLogSink(log_dir, label, sink_settings, tag)
+        bus.subscribe(sink)
+
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, encoding="utf-8",
+                              errors="replace", **popen_group_kwargs()) as process:
+            dog = SimulationWatchdog(process, watchdog).start()
+            timed_out = False
+            try:
+                for line in process.stdout:
+                    dog.beat()
+                    clean_line = line.strip()
+                    if clean_line:
+                        # Linha crua para o ficheiro da run; a consola só recebe o resumo
+                        sink.write(clean_line)
+                        events = parser.feed(clean_line)
+                        if events:
+                            for event in events:
+                                if event.kind != "error":
+                                    dog.progress(event.level_id)
+                            bus.publish(events)
+                            if abort_policy.should_abort and process.poll() is None:
+                                if sink.console != "quiet":
+                                    print(f"[bold yellow]  ⛔ {tag}Abort antecipado: {abort_policy.reason}[/bold yellow]")
+                                kill_process_tree(process)
+                # O fim do stdout não é o fim do processo (o Unity pode fechar o pipe e pendurar no shutdown):
+                # o watchdog continua a vigiar até ao exit e o timeout mata a árvore aqui dentro,
+                # para o __exit__ do Popen (que espera sem prazo) nunca ficar preso
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+                    kill_process_tree(process)
+            finally:
+                if process.poll() is None:
+                    kill_process_tree(process)
+                dog.stop()
+
+        bus.publish(parser.flush())
+        if dog.fired:
+            if sink.console != "quiet":
+                print(f"[bold red]  ⏱️ {tag}Watchdog: Unity pendurado e morto — {dog.describe()}[/bold red]")
+            bus.publish([TelemetryEvent("watchdog", dog.level_id, parser.current_attempt, {"reason": dog.reason})])
+        # O bus fecha o sink (é subscritor); o close() é idempotente e devolve as partes da run
+        bus.close()
+        run_logs = sink.close()
+        # Só a cauda fica em memória (ring buffer); o log completo está nas partes de run_logs
+        stdout_str = sink.tail()
+
+        if timed_out:
+            return ToolResult(False, "A Simulação demorou demasiado tempo e foi cancelada (Timeout).",
+                              {"stdout": stdout_str, "log_paths": run_logs})
+
+        if not os.path.exists(metrics_path) or abort_policy.should_abort or dog.fired:
+            # Crash, abort ou watchdog: os níveis já resolvidos no log não se perdem
+            recovered = rebuilder.metrics()
+            reason = f"watchdog: {dog.describe()}" if dog.fired else abort_policy.reason or "metrics.json não foi gerado"
+            if dog.fired:
+                recovered["hung_level"] = dog.level_id
+            if recovered["level_reports"]:
+                if sink.console != "quiet":
+                    print(f"[yellow]  ♻️ {tag}{len(recovered['level_reports'])} níveis reconstruídos a partir do log ({reason}).[/yellow]")
+                return ToolResult(True, f"Simulation recovered from log ({reason})",
+                                  {"metrics": recovered, "stdout": stdout_str, "log_paths": run_logs})
+            if dog.fired:
+                return ToolResult(False, f"Simulação cancelada pelo watchdog ({dog.describe()}).",
+                                  {"stdout": stdout_str, "hung_level": dog.level_id, "log_paths": run_logs})
+            return ToolResult(False, "Simulação terminou mas o metrics.json não foi gerado. O jogo crashou?",
+                              {"stdout": stdout_str, "log_paths": run_logs})
 
-        captured_output = []
+        with open(metrics_path, "r", encoding="utf-8") as f:
+            metrics = json.load(f)
 
-        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1, encoding="utf-8", errors="replace") as process:
-            for line in process.stdout:
-                clean_line = line.strip()
-                if clean_line:
-                    # Colorir os logs no Terminal para ser mais fácil ler
-                    if "Exception" in clean_line or "Error" in clean_line or "Crash" in clean_line:
-                        print(f"[bold red]  [UNITY][/bold red] {clean_line}")
-                    elif "Warning" in clean_line:
-                        print(f"[yellow]  [UNITY][/yellow] {clean_line}")
-                    elif "BOT" in clean_line or "A iniciar Nível" in clean_line:
-                        print(f"[bold green]  [BOT][/bold green] {clean_line}")
-                    elif "[ROUND STATS]" in clean_line:
-                        msg = clean_line.split("[ROUND STATS]")[-1].strip()
-                        print(f"[bold cyan]  📊 {msg}[/bold cyan]")
-                    else:
-                        print(f"[dim]  [UNITY] {clean_line}[/dim]")
+        return ToolResult(True, "Simulation ok", {"metrics": metrics, "stdout": stdout_str, "log_paths": run_logs})
 
-                    # Guardar a linha original na nossa lista
-                    captured_output.append(clean_line)
+    except Exception as e:
+        return ToolResult(False, f"Simulation error: {e}")
 
-            process.wait(timeout=timeout)
 
-        stdout_str = "\n".join(captured_output)
+# ==========================================
+# POOL DE SIMULAÇÕES UNITY EM PARALELO
+# ==========================================
+POOL_DIRNAME = "_pool"
+POOL_OUTPUT_FILES = ("metrics.json", "player_save.json")
 
-        # 🚨 NOVO: GUARDAR O LOG COMPLETO NUM FICHEIRO FÍSICO!
-        os.makedirs(log_dir, exist_ok=True)
-        log_file_path = os.path.join(log_dir, "latest_simulation.log")
+def _prepare_worker_dir(builds_dir: str, worker_dir: str) -> None:
+    """
+    Cria uma cópia isolada da pasta Builds para um worker.
+    Os JSONs (campanha, roster, save...) são copiados a sério porque o Unity escreve neles;
+    o resto (exe, _Data, dlls) usa hardlinks para não duplicar o build em disco.
+    """
+    def _link_or_copy(src, dst):
+        if src.endswith(".json"):
+            return shutil.copy2(src, dst)
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            return shutil.copy2(src, dst)
+
+    if os.path.exists(worker_dir):
+        shutil.rmtree(worker_dir)
+    shutil.copytree(builds_dir, worker_dir, copy_function=_link_or_copy,
+                    ignore=shutil.ignore_patterns(POOL_DIRNAME, "metrics.json", "*.log"))
+
+def run_simulation_pool(exe_path: str, metrics_path: str, workers: int, args=None,
+                        log_dir: str = "workspace/logs", timeout: int = 120, telemetry: Optional[dict] = None,
+                        watchdog: Optional[dict] = None, log: Optional[dict] = None) -> ToolResult:
+    """
+    Lança N instâncias do Unity QA Bot em paralelo, cada uma na sua cópia da pasta Builds,
+    e agrega os level_reports num único metrics.json (win_rate ponderado pelas tentativas).
+    """
+    try:
+        import json
+        from concurrent.futures import ThreadPoolExecutor
+        from rich import print
+        from shared.metrics import merge_campaign_metrics
 
-        with open(log_file_path, "w", encoding="utf-8") as f_log:
-            f_log.write("=== LOG DA ÚLTIMA SIMULAÇÃO DO BOT ===\n\n")
-            f_log.write(stdout_str)
-            f_log.write("\n\n=== FIM DA SIMULAÇÃO ===")
+        if not os.path.exists(exe_path):
+            return ToolResult(False, f"Executable not found: {exe_path}")
 
-        if not os.path.exists(metrics_path):
-            return ToolResult(False, "Simulação terminou mas o metrics.json não foi gerado. O jogo crashou?", {"stdout": stdout_str})
+        builds_dir = os.path.dirname(os.path.abspath(exe_path))
+        pool_dir = os.path.join(builds_dir, POOL_DIRNAME)
+        exe_name = os.path.basename(exe_path)
+        metrics_rel = os.path.relpath(os.path.abspath(metrics_path), builds_dir)
 
-        with open(metrics_path, "r", encoding="utf-8") as f:
-            metrics = json.load(f)
+        if os.path.exists(metrics_path):
+            os.remove(metrics_path)
+
+        worker_dirs = []
+        for i in range(workers):
+            worker_dir = os.path.join(pool_dir, f"worker_{i}")
+            _prepare_worker_dir(builds_dir, worker_dir)
+            worker_dirs.append(worker_dir)
+
+        print(f"\n[bold cyan]🚀 A lançar {workers} instâncias do Unity QA Bot em paralelo...[/bold cyan]")
+        print(f"[dim]Pasta do pool: {pool_dir} (Timeout: {timeout}s por instância)[/dim]\n")
+
+        def _run(i: int) -> ToolResult:
+            worker_dir = worker_dirs[i]
+            return run_game_simulation(os.path.join(worker_dir, exe_name), os.path.join(worker_dir, metrics_rel),
+                                       args, log_dir, timeout, worker_id=i, telemetry=telemetry, watchdog=watchdog, log=log)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, range(workers)))
+
+        ok_idx = [i for i, r in enumerate(results) if r.ok]
+        for i, r in enumerate(results):
+            if not r.ok:
+                print(f"[yellow]⚠️ Worker {i} falhou: {r.output}[/yellow]")
+
+        if not ok_idx:
+            return ToolResult(False, f"Todas as instâncias do pool falharam. Primeiro erro: {results[0].output}")
+
+        metrics = merge_campaign_metrics([results[i].data["metrics"] for i in ok_idx])
+        metrics["workers"] = workers
+
+        with open(metrics_path, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2)
+
+        # O save mais avançado (campanha completa, se houver) volta para a pasta Builds original
+        best = next((i for i in ok_idx if results[i].data["metrics"].get("campaign_completed")), ok_idx[0])
+        for name in POOL_OUTPUT_FILES[1:]:
+            src = os.path.join(worker_dirs[best], name)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(builds_dir, name))
 
-        return ToolResult(True, "Simulation ok", {"metrics": metrics, "stdout": stdout_str})
+        stdout_str = "\n".join(f"=== WORKER {i} ===\n{results[i].data.get('stdout', '')}" for i in ok_idx)
+        return ToolResult(True, f"Simulation ok ({len(ok_idx)}/{workers} workers)",
+                          {"metrics": metrics, "stdout": stdout_str, "log_paths": [path for i in ok_idx for path in results[i].data.get("log_paths", [])]})
 
-    except subprocess.TimeoutExpired:
-        process.kill()
-        return ToolResult(False, "A Simulação demorou demasiado tempo e foi cancelada (Timeout).")
     except Exception as e:
-        return ToolResult(False, f"Simulation error: {e}")
\ No newline at end of file
+        return ToolResult(False, f"Simulation pool error: {e}")
@@ -0,0 +1,106 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+# ==========================================
+# 🚨 WATCHDOG DAS SIMULAÇÕES UNITY
+# ==========================================
+# Corre numa thread à parte do leitor do stdout: um Unity pendurado que mantém o pipe aberto
+# nunca devolve uma linha, por isso os prazos não podem depender do ciclo de leitura.
+#   - wall_clock_seconds: tempo total da instância
+#   - stall_seconds: sem nenhuma linha no log (heartbeat)
+#   - no_progress_seconds: sem eventos de jogo (nível, ronda, dano), mesmo que o log continue a escrever
+# 0 desliga cada prazo. Ao disparar mata a árvore de processos inteira (o Unity lança filhos).
+DEFAULT_WATCHDOG = {"wall_clock_seconds": 1800, "stall_seconds": 90, "no_progress_seconds": 240, "poll_seconds": 1.0}
+
+
+def watchdog_settings(config: dict) -> dict:
+    return {**DEFAULT_WATCHDOG, **config.get("simulation", {}).get("watchdog", {})}
+
+def popen_group_kwargs() -> dict:
+    """Argumentos do Popen para o processo ficar no seu próprio grupo (para matar a árvore toda)."""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+def kill_process_tree(process: subprocess.Popen):
+    if process.poll() is not None:
+        return
+    try:
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/PID", str(process.pid), "/T", "/F"], capture_output=True, timeout=30)
+        else:
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+    except Exception:
+        pass
+    if process.poll() is None:
+        process.kill()
+
+
+class SimulationWatchdog:
+    """
+    beat() a cada linha do log, progress(level_id) a cada evento de jogo.
+    Quando um prazo rebenta, reason diz qual e level_id diz em que nível o bot estava.
+    """
+
+    def __init__(self, process: subprocess.Popen, settings: Optional[dict] = None):
+        settings = {**DEFAULT_WATCHDOG, **(settings or {})}
+        self.process = process
+        self.wall_clock = float(settings["wall_clock_seconds"] or 0)
+        self.stall = float(settings["stall_seconds"] or 0)
+        self.no_progress = float(settings["no_progress_seconds"] or 0)
+        self.poll = float(settings["poll_seconds"])
+
+        self.started_at = self.last_beat = self.last_progress = time.monotonic()
+        self.level_id = None
+        self.reason = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"watchdog-{process.pid}", daemon=True)
+
+    def start(self) -> "SimulationWatchdog":
+        self._thread.start()
+        return self
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def progress(self, level_id: Optional[int] = None):
+        self.last_progress = time.monotonic()
+        if level_id is not None:
+            self.level_id = level_id
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    @property
+    def fired(self) -> bool:
+        return self.reason is not None
+
+    def _check(self, now: float) -> Optional[str]:
+        if self.wall_clock and now - self.started_at > self.wall_clock:
+            return f"tempo total excedido ({self.wall_clock:.0f}s)"
+        if self.stall and now - self.last_beat > self.stall:
+            return f"sem linhas no log há {now - self.last_beat:.0f}s"
+        if self.no_progress and now - self.last_progress > self.no_progress:
+            return f"sem progresso de jogo há {now - self.last_progress:.0f}s"
+        return None
+
+    def _run(self):
+        while not self._stop.wait(self.poll):
+            if self.process.poll() is not None:
+                return
+            reason = self._check(time.monotonic())
+            if reason:
+                self.reason = reason
+                kill_process_tree(self.process)
+                return
+
+    def describe(self) -> str:
+        level = f"nível {self.level_id}" if self.level_id is not None else "antes do primeiro nível"
+        return f"{self.reason} ({level})"
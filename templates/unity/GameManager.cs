@@ -418,6 +418,7 @@ public class GameManager : MonoBehaviour {
         if (reason.Contains("Inimigo")) livesLostCount++;
         else if (reason.Contains("TEMPO")) timeoutsCount++;
         currentPlayer.stats.currentLives--;
+        Debug.Log($"[DAMAGE] Nível: {currentLevel.level_id} | Tentativa: {currentLevelAttempts} | Motivo: {reason} | Vidas: {currentPlayer.stats.currentLives} | Tempo: {roundPlayTime:F1}s");
         currentPlayer.Save(Path.Combine(Application.dataPath, "..", "player_save.json"));
         if (userControl) {
             if (Camera.main != null) {
@@ -0,0 +1,65 @@
+import React, { useState, useEffect } from 'react';
+import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
+
+const COLORS = ['#FACC15', '#4ADE80', '#60A5FA', '#F87171', '#C084FC', '#FB923C', '#2DD4BF', '#F472B6'];
+
+export default function EconomyChart() {
+  const [economy, setEconomy] = useState({ snapshots: [], items: {}, inflation: null });
+
+  const fetchEconomy = () => {
+    fetch('http://localhost:8000/dashboard/economy?last=30')
+      .then(res => res.json())
+      .then(data => setEconomy(data))
+      .catch(err => console.error("Erro ao carregar a economia:", err));
+  };
+
+  useEffect(() => {
+    fetchEconomy();
+    const interval = setInterval(fetchEconomy, 15000);
+    return () => clearInterval(interval);
+  }, []);
+
+  if (economy.snapshots.length === 0) return null;
+
+  // As séries vêm compactas por item ({snapshot_ids, prices}); o Recharts quer uma linha por fotografia
+  const rows = economy.snapshots.map(snap => ({ snapshot: `#${snap.id}`, price_index: snap.price_index }));
+  const rowIndex = Object.fromEntries(economy.snapshots.map((snap, i) => [snap.id, i]));
+  const itemIds = Object.keys(economy.items);
+  itemIds.forEach(itemId => {
+    const series = economy.items[itemId];
+    series.snapshot_ids.forEach((snapId, i) => {
+      if (rowIndex[snapId] !== undefined) rows[rowIndex[snapId]][itemId] = series.prices[i];
+    });
+  });
+
+  // Inflação no mesmo cabaz de itens (itens novos não contam)
+  const pct = economy.inflation?.basket_pct;
+
+  return (
+    <div className="bg-gray-800 p-6 rounded-2xl border border-gray-700 shadow-xl">
+      <div className="flex justify-between items-center mb-6">
+        <h3 className="text-xl font-bold text-gray-300">💹 Inflação da Loja (Preços por Fotografia)</h3>
+        {pct !== null && pct !== undefined && (
+          <span className={`px-3 py-1 rounded text-sm font-bold ${pct > 0 ? 'bg-red-900/60 text-red-400' : 'bg-green-900/60 text-green-400'}`}>
+            {pct > 0 ? '▲' : '▼'} {(pct * 100).toFixed(1)}% vs sessão anterior
+          </span>
+        )}
+      </div>
+      <div className="h-80 w-full">
+        <ResponsiveContainer width="100%" height="100%">
+          <LineChart data={rows} margin={{ top: 5, right: 30, left: 20, bottom: 5 }}>
+            <CartesianGrid strokeDasharray="3 3" stroke="#374151" />
+            <XAxis dataKey="snapshot" stroke="#9CA3AF" fontSize={12} />
+            <YAxis stroke="#9CA3AF" />
+            <Tooltip contentStyle={{ backgroundColor: '#111827', border: '1px solid #374151' }} />
+            <Legend wrapperStyle={{ paddingTop: "20px" }} />
+            <Line type="monotone" dataKey="price_index" name="Preço médio" stroke="#FFFFFF" strokeWidth={3} dot={{ r: 3 }} />
+            {itemIds.map((itemId, i) => (
+              <Line key={itemId} type="monotone" dataKey={itemId} stroke={COLORS[i % COLORS.length]} strokeWidth={1.5} dot={false} connectNulls />
+            ))}
+          </LineChart>
+        </ResponsiveContainer>
+      </div>
+    </div>
+  );
+}
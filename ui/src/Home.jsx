@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import EconomyChart from './EconomyChart';
 
 export default function Home() {
   const [summary, setSummary] = useState({
@@ -89,6 +90,9 @@ export default function Home() {
 
       </div>
 
+      {/* GRÁFICO DA ECONOMIA (séries por item em /dashboard/economy) */}
+      <EconomyChart />
+
       {/* MENSAGEM DE ESTATUTO INFERIOR */}
       <div className="mt-8 bg-gray-900/80 border border-gray-700 p-6 rounded-xl text-center">
         <p className="text-gray-300 text-lg">